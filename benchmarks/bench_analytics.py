@@ -0,0 +1,89 @@
+# benchmarks/bench_analytics.py
+"""统计分析基准测试
+
+比较每次查询都遍历全部历史记录与增量统计（小时/日分桶计数器 + 分位数估计）
+在“最近24小时每小时收入”“最近24小时在场车辆曲线”“停留时长 p50/p95/p99”
+三类查询上的耗时，并给出分位数估计相对精确值的误差。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --sizes 100000 1000000
+"""
+
+import argparse
+import time
+
+from benchmarks.bench_history import make_records
+from core.analytics import HistoryAnalytics, local_hour
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def scan_revenue(records, start, end):
+    revenue = {}
+    for r in records:
+        if start <= r["exit_time"] < end:
+            hour = local_hour(r["exit_time"])
+            revenue[hour] = revenue.get(hour, 0.0) + r["fee"]
+    return revenue
+
+
+def scan_occupancy(records, start, end):
+    first, last = local_hour(start), local_hour(end)
+    present = [0] * (last - first + 1)
+    for r in records:
+        lo = max(first, local_hour(r["enter_time"]))
+        hi = min(last, local_hour(r["exit_time"]))
+        for hour in range(lo, hi + 1):
+            present[hour - first] += 1
+    return present
+
+
+def scan_percentiles(records):
+    dwell = sorted(r["exit_time"] - r["enter_time"] for r in records)
+    return [dwell[int(q * (len(dwell) - 1))] for q in QUANTILES]
+
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="统计分析基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=100, help="增量统计每类查询的重复次数")
+    args = parser.parse_args(argv)
+
+    print(f"{'记录数':>10}  {'方式':<6}{'建立(s)':>10}{'追加(us/条)':>13}{'每小时收入(ms)':>16}"
+          f"{'在场曲线(ms)':>14}{'分位数(ms)':>12}")
+    for size in args.sizes:
+        records = make_records(size)
+        end = records[-1]["exit_time"]
+        start = end - 24 * 3600
+
+        revenue_time, _ = timed(lambda: scan_revenue(records, start, end))
+        occupancy_time, _ = timed(lambda: scan_occupancy(records, start, end))
+        percentile_time, exact = timed(lambda: scan_percentiles(records))
+        print(f"{size:>10}  {'遍历':<6}{'-':>10}{'-':>13}{revenue_time * 1000:>16.2f}"
+              f"{occupancy_time * 1000:>14.2f}{percentile_time * 1000:>12.2f}")
+
+        build_time, analytics = timed(lambda: HistoryAnalytics.build(records[:-10000]))
+        append_time, _ = timed(lambda: analytics.add_many(records[-10000:]))
+        revenue_time, _ = timed(lambda: analytics.revenue_per_hour(start, end), args.repeat)
+        occupancy_time, _ = timed(lambda: analytics.occupancy_curve(start, end), args.repeat)
+        percentile_time, estimate = timed(lambda: analytics.dwell_percentiles(QUANTILES), args.repeat)
+        print(f"{size:>10}  {'增量':<6}{build_time:>10.2f}{append_time / 10000 * 1e6:>13.2f}"
+              f"{revenue_time * 1000:>16.3f}{occupancy_time * 1000:>14.3f}{percentile_time * 1000:>12.3f}")
+
+        errors = "  ".join(
+            f"p{int(q * 100)} {abs(estimate[q] - e) / e:.2%}" for q, e in zip(QUANTILES, exact))
+        print(f"{'':>10}  分位数估计误差: {errors}  分桶: {len(analytics.hours)} 小时 / "
+              f"{len(analytics.days)} 天 / {len(analytics.dwell.buckets)} 个时长桶")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_billing.py
+"""批量计费基准测试
+
+比较逐辆调用 Billing.calculate_fee/format_duration 与批量接口
+Billing.calculate_fees（NumPy向量化 / 纯Python）在 1万 / 10万 辆车时的耗时。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_billing
+    python -m benchmarks.bench_billing --sizes 10000 100000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+
+from core.billing import Billing, NUMPY_SUPPORTED
+from core.config import Config
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+
+def scalar_path(billing, durations):
+    """原有逐辆计算方式"""
+    return (
+        [billing.calculate_fee(d) for d in durations],
+        [billing.format_duration(d) for d in durations]
+    )
+
+
+def best_of(func, repeat):
+    """多次运行取最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量计费基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mode", default="per_minute", help="计费模式")
+    args = parser.parse_args(argv)
+
+    config = Config(history_file=None)
+    config.billing_mode = args.mode
+    billing = Billing(config)
+    rng = random.Random(0)
+
+    print(f"计费模式: {args.mode}  NumPy: {'可用' if NUMPY_SUPPORTED else '未安装'}")
+    print(f"{'车辆数':>10}{'逐辆(ms)':>12}{'批量Python(ms)':>16}{'批量NumPy(ms)':>16}{'加速比':>8}")
+    for size in args.sizes:
+        durations = [rng.uniform(0, 86400 * 3) for _ in range(size)]
+        scalar = best_of(lambda: scalar_path(billing, durations), args.repeat)
+        python = best_of(lambda: billing.calculate_fees(durations, use_numpy=False), args.repeat)
+        if NUMPY_SUPPORTED:
+            vector = best_of(lambda: billing.calculate_fees(durations), args.repeat)
+            vector_text = f"{vector * 1000:>16.2f}"
+        else:
+            vector = python
+            vector_text = f"{'-':>16}"
+        print(f"{size:>10}{scalar * 1000:>12.2f}{python * 1000:>16.2f}{vector_text}{scalar / vector:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_board.py
+"""状态看板刷新基准测试
+
+比较原有的整体重绘（清空文本控件后逐行插入全部车辆）与增量看板
+（ui.board.TextBoard：只增删变化的行，只更新可见行的时长与费用）
+在停车场有 1千 / 1万 辆车时每次刷新的耗时，分别测试“无车辆进出的
+定时刷新”和“一辆车离开、一辆车进入后的刷新”。需要图形界面环境。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_board
+    python -m benchmarks.bench_board --sizes 1000 10000 --repeat 20
+"""
+
+import argparse
+import sys
+import time
+import tkinter as tk
+
+from core.config import Config
+from core.parking import Car
+from models.user import User
+from ui.parking_ui import ParkingUI, ID_WIDTH, TIME_WIDTH, DURATION_WIDTH, FEE_WIDTH
+from utils.time_utils import timestamp_to_str
+
+DEFAULT_SIZES = [1_000, 10_000]
+
+
+def full_redraw(ui):
+    """原有刷新方式：清空文本控件后重新插入全部内容"""
+    text = ui.status_text
+    text.config(state=tk.NORMAL)
+    text.delete(1.0, tk.END)
+    state = ui.worker.state
+    text.insert(tk.END, f"停车场: {len(state['parking'])}/{ui.parking_lot.capacity} "
+                        f"便道: {len(state['waiting'])}/{ui.waiting_lane.capacity}\n\n")
+    current_time = time.time()
+    header = f'{"车牌号":<{ID_WIDTH}} {"时间":<{TIME_WIDTH}} {"时长":<{DURATION_WIDTH}} {"费用":<{FEE_WIDTH}}\n'
+    text.insert(tk.END, "停车场状态:\n" + header + "-" * (len(header) - 1) + "\n")
+    parking_state = ui.worker.state["parking"]
+    enter_times = [enter_time for _, enter_time in parking_state]
+    fees, durations = ui.billing.calculate_fees([current_time - t for t in enter_times], enter_times)
+    for (car_id, enter_time), formatted, fee in zip(parking_state, durations, fees):
+        text.insert(tk.END, f"{car_id:<{ID_WIDTH}} {timestamp_to_str(enter_time):<{TIME_WIDTH}} "
+                            f"{formatted:<{DURATION_WIDTH}} ¥{f'{fee:.2f}':<{FEE_WIDTH}}\n")
+    text.insert(tk.END, "\n便道等待区:\n" + header + "-" * (len(header) - 1) + "\n（空）\n")
+    text.config(state=tk.DISABLED)
+
+
+def timed(root, func, repeat):
+    """平均每次刷新耗时（秒），包含界面的空闲任务（重新布局、滚动条更新）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+        root.update_idletasks()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="状态看板刷新基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"无法创建窗口（需要图形界面环境）: {e}")
+        sys.exit(1)
+    root.withdraw()
+
+    print(f"{'车辆数':>10}  {'方式':<8}{'定时刷新(ms)':>14}{'进出后刷新(ms)':>16}")
+    for size in args.sizes:
+        config = Config(history_file=None)
+        config.parking_capacity = size
+        window = tk.Toplevel(root)
+        ui = ParkingUI(window, config, User("bench", "admin"))
+        # 引擎由命令处理线程独占，进出都提交给它执行，drain() 后状态副本已更新
+        ui.worker.submit(ui.engine.arrive_many, [Car(f"B{i:06d}") for i in range(size)])
+        ui.worker.drain()
+        serial = size
+
+        def churn(refresh):
+            # 中间一辆车离开（其后车辆让路后按原顺序返回），再进入一辆新车
+            nonlocal serial
+            ui.worker.submit(lambda: ui.engine.depart(ui.parking_lot.current_state()[size // 2][0]))
+            ui.worker.submit(ui.engine.arrive_many, [Car(f"B{serial:06d}")])
+            ui.worker.drain()
+            serial += 1
+            refresh()
+
+        # 先测增量看板：整体重绘会清空控件，之后看板的内容不再有效
+        for name, refresh in (("增量看板", ui.refresh_status), ("整体重绘", lambda: full_redraw(ui))):
+            refresh()
+            root.update_idletasks()
+            tick = timed(root, refresh, args.repeat)
+            change = timed(root, lambda: churn(refresh), args.repeat)
+            print(f"{size:>10}  {name:<8}{tick * 1000:>14.2f}{change * 1000:>16.2f}")
+        window.destroy()
+        ui.worker.close()
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
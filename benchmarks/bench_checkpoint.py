@@ -0,0 +1,104 @@
+# benchmarks/bench_checkpoint.py
+"""停车场状态检查点基准测试：二进制检查点与 JSON 快照对比
+
+分别在单门与双门系统中停满指定数量的车辆（便道另排 10%），测量：
+复制状态（在处理闸口命令的线程上执行，即闸口被占用的时间）、写入（编码 + fsync +
+原子替换）、加载（读取 + 解码）的耗时与文件大小，并校验加载结果与原状态一致。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_checkpoint
+    python -m benchmarks.bench_checkpoint --cars 100000 --modes single --repeat 10
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from core.billing import Billing
+from core.checkpoint import read_checkpoint, write_checkpoint
+from core.config import Config
+from core.engine import ParkingEngine
+from core.journal import DualJournalTarget, SingleJournalTarget
+from core.parking import Car
+from extension.dual_exit.adapter import DualSystemAdapter
+
+DEFAULT_CARS = [1000, 10000]
+
+
+def new_target(mode, cars):
+    config = Config(history_file=None)
+    config.parking_capacity = cars
+    config.waiting_capacity = max(1, cars // 10)
+    plates = [f"京A{i:06d}" for i in range(cars + config.waiting_capacity)]
+    if mode == "single":
+        engine = ParkingEngine(config)
+        engine.arrive_many([Car(car_id, 1.7e9 + i) for i, car_id in enumerate(plates)])
+        return SingleJournalTarget(engine)
+    adapter = DualSystemAdapter(config, billing=Billing(config), log_callback=lambda msg, level: None)
+    for i, car_id in enumerate(plates):
+        adapter.enter(Car(car_id, 1.7e9 + i))
+    return DualJournalTarget(adapter)
+
+
+def write_json(path, seq, state):
+    tmp_path = path + ".tmp"
+    data = json.dumps({"seq": seq, "time": time.time(), "state": state}, ensure_ascii=False, separators=(",", ":"))
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["state"]
+
+
+def best(func, repeat):
+    """重复执行取最短耗时（秒），返回 (耗时, 最后一次的结果)"""
+    elapsed, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="二进制检查点与 JSON 快照对比")
+    parser.add_argument("--cars", type=int, nargs="+", default=DEFAULT_CARS, help="停车场车辆数")
+    parser.add_argument("--modes", nargs="+", default=["single", "dual"], help="系统模式: single / dual")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数（取最短耗时）")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="bench_checkpoint_")
+    try:
+        print(f"{'模式':<8}{'车辆数':>8}{'格式':>8}{'复制(ms)':>10}{'写入(ms)':>10}{'加载(ms)':>10}{'大小(KB)':>10}{'一致':>6}")
+        for mode in args.modes:
+            for cars in args.cars:
+                target = new_target(mode, cars)
+                capture, state = best(target.snapshot, args.repeat)
+                total = len(state["lot"]) + len(state["lane"])
+                binary_path = os.path.join(directory, f"{mode}_{cars}.ckpt")
+                json_path = os.path.join(directory, f"{mode}_{cars}.json")
+                formats = (
+                    ("二进制", binary_path, lambda: write_checkpoint(binary_path, mode, 1, state),
+                     lambda: read_checkpoint(binary_path)[3]),
+                    ("JSON", json_path, lambda: write_json(json_path, 1, state), lambda: read_json(json_path))
+                )
+                for name, path, write, read in formats:
+                    write_time, _ = best(write, args.repeat)
+                    read_time, loaded = best(read, args.repeat)
+                    print(f"{mode:<8}{total:>8}{name:>8}{capture * 1000:>10.2f}{write_time * 1000:>10.2f}"
+                          f"{read_time * 1000:>10.2f}{os.path.getsize(path) / 1024:>10.0f}"
+                          f"{'是' if loaded == state else '否':>6}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# benchmarks/bench_concurrent.py
+"""多闸口并发压力测试
+
+1. 正确性：每轮多个闸口线程同时让同一辆车进入、再同时让它离开（模拟两台
+   相机同时识别到同一辆车），分别直接调用双门系统适配器和通过
+   core.concurrent.ConcurrentDualSystem 调用，统计重复进入/离开与残留车辆。
+2. 吞吐：多个闸口线程通过 ConcurrentEngine 进出，另一个线程定时读取完整
+   状态，比较无锁快照读取与加锁读取时写操作的吞吐与延迟。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_concurrent
+    python -m benchmarks.bench_concurrent --threads 8 --rounds 10000 --capacity 50000
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from core.billing import Billing
+from core.concurrent import ConcurrentDualSystem, ConcurrentEngine
+from core.config import Config
+from core.engine import ParkingEngine
+from core.parking import Car
+from extension.dual_exit.adapter import DualSystemAdapter
+
+
+def new_config(capacity, waiting):
+    config = Config(history_file=None)
+    config.parking_capacity = capacity
+    config.waiting_capacity = waiting
+    return config
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def dual_stress(wrapped, threads, rounds):
+    """每轮所有闸口线程同时让同一辆新车进入，再同时让它离开
+
+    正确时每轮恰好一次进入成功、一次离开成功，结束后停车场为空。
+    返回 (耗时, 重复进入的轮数, 重复离开的轮数, 剩余车辆数, 计数错误, 操作异常数)。
+    """
+    config = new_config(rounds + threads, threads)
+    adapter = DualSystemAdapter(config, billing=Billing(config), log_callback=lambda msg, level: None)
+    system = ConcurrentDualSystem(adapter)
+    barrier = threading.Barrier(threads)
+    admitted = [[0] * rounds for _ in range(threads)]
+    departed = [[0] * rounds for _ in range(threads)]
+    errors = [0] * threads
+
+    def gate(index):
+        for r in range(rounds):
+            car_id = f"R{r:06d}"
+            barrier.wait()
+            status = (system.admit(car_id) if wrapped else adapter.enter(Car(car_id, adapter.clock())))[0]
+            admitted[index][r] = status in ("PARKED", "IN_SIDE_ROAD")
+            errors[index] += status == "ERROR"
+            barrier.wait()
+            status = (system.depart(car_id) if wrapped else adapter.leave(car_id))[0]
+            departed[index][r] = status == "SUCCESS"
+            errors[index] += status == "ERROR"
+
+    elapsed = run_threads(threads, gate)
+    lot = adapter.parking_lot
+    double_admit = sum(sum(column) > 1 for column in zip(*admitted))
+    double_depart = sum(sum(column) > 1 for column in zip(*departed))
+    remaining = len(lot.north_stack) + len(lot.south_stack) + adapter.waiting_lane.get_waiting_count()
+    miscount = abs(lot.occupied - len(lot.north_stack) - len(lot.south_stack))
+    return elapsed, double_admit, double_depart, remaining, miscount, sum(errors)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def throughput(threads, ops, capacity, read_mode, read_interval):
+    """read_mode: none（无读取线程）/ snapshot（无锁快照）/ locked（加锁读取）
+
+    读取线程每隔 read_interval 秒读取一次完整状态（模拟状态显示），
+    返回 (写入次/秒, 读取次数, 写操作延迟列表, 包装对象)。
+    """
+    config = new_config(capacity, capacity // 10)
+    system = ConcurrentEngine(ParkingEngine(config))
+    system.admit_many([f"F{i:06d}" for i in range(capacity // 2)])
+    stop = threading.Event()
+    reads = [0]
+    latencies = [[] for _ in range(threads)]
+
+    def reader():
+        while not stop.wait(read_interval):
+            if read_mode == "snapshot":
+                system.snapshot()
+            else:
+                with system.lock:
+                    system.read_state()
+            reads[0] += 1
+
+    def gate(index):
+        record = latencies[index].append
+        clock = time.perf_counter
+        for i in range(ops):
+            car_id = f"G{index:02d}-{i:06d}"
+            start = clock()
+            system.admit(car_id)
+            system.depart(car_id)
+            record(clock() - start)
+
+    reader_thread = None
+    if read_mode != "none":
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+    elapsed = run_threads(threads, gate)
+    stop.set()
+    if reader_thread:
+        reader_thread.join()
+    merged = sorted(value for values in latencies for value in values)
+    return threads * ops * 2 / elapsed, reads[0], merged, system
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多闸口并发压力测试")
+    parser.add_argument("--threads", type=int, default=4, help="闸口线程数")
+    parser.add_argument("--rounds", type=int, default=3000, help="正确性测试轮数")
+    parser.add_argument("--ops", type=int, default=20000, help="吞吐测试每个线程的进出次数")
+    parser.add_argument("--capacity", type=int, default=10000, help="吞吐测试的停车场容量")
+    parser.add_argument("--read-interval", type=float, default=0.002, help="状态读取间隔（秒）")
+    args = parser.parse_args(argv)
+
+    # 缩短线程切换间隔，让检查与修改之间更容易被其他线程打断
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        print(f"正确性（双门系统，{args.threads} 个闸口同时处理同一辆车 × {args.rounds} 轮）")
+        print(f"{'方式':<10}{'耗时(s)':>10}{'重复进入':>10}{'重复离开':>10}{'剩余车辆':>10}{'计数错误':>10}{'操作异常':>10}")
+        for name, wrapped in (("直接调用", False), ("加锁包装", True)):
+            elapsed, *counts = dual_stress(wrapped, args.threads, args.rounds)
+            print(f"{name:<10}{elapsed:>10.2f}" + "".join(f"{count:>10}" for count in counts))
+    finally:
+        sys.setswitchinterval(interval)
+
+    print(f"\n吞吐（单门引擎，{args.threads} 线程，每次进入后离开，停车场 {args.capacity // 2}/{args.capacity}，"
+          f"每 {args.read_interval * 1000:.0f}ms 读取一次状态）")
+    print(f"{'读取方式':<12}{'进出(次/秒)':>14}{'读取次数':>10}{'p50(us)':>10}{'p99(us)':>10}{'最大(ms)':>10}{'读取重试':>10}")
+    for name, mode in (("无读取", "none"), ("无锁快照", "snapshot"), ("加锁读取", "locked")):
+        writes, reads, latencies, system = throughput(args.threads, args.ops, args.capacity, mode, args.read_interval)
+        print(f"{name:<12}{writes:>14.0f}{reads:>10}{percentile(latencies, 0.5) * 1e6:>10.1f}"
+              f"{percentile(latencies, 0.99) * 1e6:>10.1f}{latencies[-1] * 1000:>10.2f}{system.read_retries:>10}")
+
+
+if __name__ == "__main__":
+    main()
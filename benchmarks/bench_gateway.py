@@ -0,0 +1,149 @@
+# benchmarks/bench_gateway.py
+"""闸口 HTTP 服务延迟/吞吐基准测试
+
+在子进程中启动闸口服务（历史记录只保存在内存中），本进程作为负载生成
+客户端：开启多个连接，每个连接保持 depth 个未响应的流水线请求，
+循环发送“进入 → 查询位置 → 离开 → 查询状态”，统计每秒完成的请求数
+与请求延迟分位数。depth 为 1 时相当于不使用流水线。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_gateway
+    python -m benchmarks.bench_gateway --mode dual --connections 16 --depths 1 8 32 --requests 40000
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+from collections import deque
+
+DEFAULT_DEPTHS = [1, 16]
+
+
+def run_server(conn, mode, capacity, waiting):
+    """子进程：启动服务并把实际端口发回父进程"""
+    from core.config import Config
+    from gateway.gate import create_gate
+    from gateway.server import GateServer
+
+    async def main():
+        config = Config(history_file=None)
+        config.parking_capacity = capacity
+        config.waiting_capacity = waiting
+        server = await GateServer(create_gate(config, mode), port=0).start()
+        conn.send(server.port)
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def encode(method, path, body=None):
+    data = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else b""
+    return (f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n").encode("latin-1") + data
+
+
+def workload(client, count):
+    """某个连接的请求序列：每辆车依次进入、查询位置、离开，再查询一次状态"""
+    requests = []
+    i = 0
+    while len(requests) < count:
+        car_id = f"C{client:02d}-{i:06d}"
+        requests += [
+            encode("POST", "/arrive", {"car_id": car_id}),
+            encode("GET", f"/locate?car_id={car_id}"),
+            encode("POST", "/depart", {"car_id": car_id}),
+            encode("GET", "/status")
+        ]
+        i += 1
+    return requests[:count]
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line[:15].lower() == b"content-length:":
+            length = int(line[15:])
+    await reader.readexactly(length)
+    return status
+
+
+async def run_client(port, requests, depth, latencies, errors):
+    """按滑动窗口发送请求：最多 depth 个请求未收到响应"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    window = asyncio.Semaphore(depth)
+    sent = deque()
+
+    async def send():
+        for request in requests:
+            await window.acquire()
+            sent.append(time.perf_counter())
+            writer.write(request)
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    for _ in requests:
+        status = await read_response(reader)
+        latencies.append(time.perf_counter() - sent.popleft())
+        if status != 200:
+            errors.append(status)
+        window.release()
+    await sender
+    writer.close()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def measure(port, connections, depth, total):
+    per_client = total // connections
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(port, workload(c, per_client), depth, latencies, errors)
+                           for c in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, latencies, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="闸口 HTTP 服务延迟/吞吐基准测试")
+    parser.add_argument("--mode", choices=["single", "dual"], default="single")
+    parser.add_argument("--capacity", type=int, default=1000, help="停车场容量")
+    parser.add_argument("--waiting", type=int, default=100, help="便道容量")
+    parser.add_argument("--connections", type=int, default=8, help="并发连接数")
+    parser.add_argument("--depths", type=int, nargs="+", default=DEFAULT_DEPTHS, help="每个连接的流水线深度")
+    parser.add_argument("--requests", type=int, default=20000, help="每轮请求总数")
+    args = parser.parse_args(argv)
+
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=run_server, args=(child, args.mode, args.capacity, args.waiting),
+                                      daemon=True)
+    process.start()
+    try:
+        if not parent.poll(30):
+            print("闸口服务启动超时")
+            return
+        port = parent.recv()
+        # 预热：建立连接、加载模块
+        asyncio.run(measure(port, 1, 1, 200))
+
+        print(f"模式: {args.mode}  连接数: {args.connections}  每轮请求: {args.requests}")
+        print(f"{'流水线深度':>10}{'请求/秒':>12}{'p50(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}{'错误':>6}")
+        for depth in args.depths:
+            rate, latencies, errors = asyncio.run(measure(port, args.connections, depth, args.requests))
+            print(f"{depth:>10}{rate:>12.0f}{percentile(latencies, 0.5) * 1000:>10.2f}"
+                  f"{percentile(latencies, 0.99) * 1000:>10.2f}{latencies[-1] * 1000:>10.2f}{len(errors):>6}")
+    finally:
+        process.terminate()
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/bench_history.py
+"""历史记录持久化基准测试
+
+在已有 N 条历史记录（默认100万条）的情况下，比较旧的 JSON 数组格式
+（每次离开重写整个文件）、JSON Lines 追加格式与 SQLite 格式的单次离开
+写入延迟（同步写入与后台组提交写入）、启动时加载历史记录的耗时，
+以及按车牌号查询历史的耗时。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_history
+    python -m benchmarks.bench_history --sizes 10000 1000000 --departures 200
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from core.config import Config
+from core.history import JsonlHistoryStore, SqliteHistoryStore
+
+DEFAULT_SIZES = [1_000_000]
+
+
+def make_records(count, seed=0):
+    """生成测试用历史记录"""
+    rng = random.Random(seed)
+    t = 1750000000.0
+    records = []
+    for i in range(count):
+        t += rng.uniform(1, 60)
+        stay = rng.uniform(60, 86400)
+        records.append({
+            "car_id": f"京A{rng.randint(0, 99999):05d}",
+            "enter_time": t - stay,
+            "exit_time": t,
+            "fee": round(stay / 60.0, 2)
+        })
+    return records
+
+
+def write_fixtures(directory, records):
+    """写入三种格式的历史记录文件"""
+    json_path = os.path.join(directory, "history.json")
+    jsonl_path = os.path.join(directory, "history.jsonl")
+    sqlite_path = os.path.join(directory, "history.db")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    JsonlHistoryStore(jsonl_path).rewrite(records)
+    store = SqliteHistoryStore(sqlite_path)
+    store.append(records)
+    store.close()
+    return {"json": json_path, "jsonl": jsonl_path, "sqlite": sqlite_path}
+
+
+def measure(backend, path, departures, flush_ms=0):
+    """返回 (加载耗时, 离开写入延迟列表, 按车牌查询耗时, 组提交次数)
+
+    flush_ms 为0时每次离开同步写入；大于0时交给后台写入线程，
+    离开延迟只包含入队，查询前等待后台写入完成。
+    """
+    start = time.perf_counter()
+    config = Config(history_file=path, history_backend=backend)
+    config.set_history_flush_ms(flush_ms)
+    load_time = time.perf_counter() - start
+    latencies = []
+    now = time.time()
+    for i in range(departures):
+        start = time.perf_counter()
+        config.add_history(f"BENCH{i}", now - 600, now, 10.0)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    config.find_history("京A12345")
+    lookup_time = time.perf_counter() - start
+    stats = config.history_stats()
+    config.close_history()
+    return load_time, latencies, lookup_time, stats["commits"] if stats else departures
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="历史记录持久化基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--departures", type=int, default=1000, help="JSON Lines / SQLite 格式的离开次数")
+    parser.add_argument("--json-departures", type=int, default=3, help="旧 JSON 格式的离开次数（每次重写整个文件，较慢）")
+    parser.add_argument("--flush-ms", type=int, default=50, help="后台写入的最大延迟（毫秒）")
+    args = parser.parse_args(argv)
+
+    print(f"{'记录数':>10}  {'格式':<12}{'加载(s)':>10}{'离开p50(ms)':>14}{'离开p99(ms)':>14}"
+          f"{'离开max(ms)':>14}{'车牌查询(ms)':>14}{'写入次数':>10}")
+    for size in args.sizes:
+        directory = tempfile.mkdtemp(prefix="bench_history_")
+        try:
+            paths = write_fixtures(directory, make_records(size))
+            runs = (
+                ("jsonl", "jsonl", args.departures, 0),
+                ("jsonl+后台", "jsonl", args.departures, args.flush_ms),
+                ("sqlite", "sqlite", args.departures, 0),
+                ("sqlite+后台", "sqlite", args.departures, args.flush_ms),
+                ("json", "json", args.json_departures, 0)
+            )
+            for label, backend, departures, flush_ms in runs:
+                load_time, latencies, lookup_time, writes = measure(backend, paths[backend], departures, flush_ms)
+                print(f"{size:>10}  {label:<12}{load_time:>10.2f}"
+                      f"{percentile(latencies, 0.5) * 1000:>14.3f}"
+                      f"{percentile(latencies, 0.99) * 1000:>14.3f}"
+                      f"{max(latencies) * 1000:>14.3f}"
+                      f"{lookup_time * 1000:>14.3f}"
+                      f"{writes:>10}")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
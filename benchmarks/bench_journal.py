@@ -0,0 +1,98 @@
+# benchmarks/bench_journal.py
+"""操作日志记录与恢复基准测试
+
+用随机进出驱动单门停车场引擎，直到产生指定数量的变化事件（默认 100 万条），
+比较不记录日志与记录日志时的处理速度，再分别测量只用日志全量重放与
+“快照 + 日志尾部”两种方式恢复状态的耗时，并校验恢复结果与原状态一致。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_journal
+    python -m benchmarks.bench_journal --events 200000 --engine fenwick --snapshot-every 20000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from core.config import Config
+from core.engine import ParkingEngine
+from core.journal import OperationLog, SingleJournalTarget
+from core.parking import Car
+
+
+def new_engine(args):
+    config = Config(history_file=None)
+    config.parking_capacity = args.capacity
+    config.waiting_capacity = args.waiting
+    config.parking_engine = args.engine
+    return ParkingEngine(config)
+
+
+def drive(engine, events, seed):
+    """随机进出直到停车场与便道累计产生 events 个变化事件，返回耗时"""
+    count = [0]
+    engine.events.subscribe(lambda event: count.__setitem__(0, count[0] + 1))
+    rng = random.Random(seed)
+    plates = [f"J{i:06d}" for i in range(engine.parking_lot.capacity * 2)]
+    now = 0.0
+    start = time.perf_counter()
+    while count[0] < events:
+        now += 1.0
+        car_id = plates[rng.randrange(len(plates))]
+        if rng.random() < 0.5:
+            engine.arrive(Car(car_id, now))
+        else:
+            engine.depart(car_id, now)
+    return time.perf_counter() - start
+
+
+def state(engine):
+    return list(engine.parking_lot.current_state()), list(engine.waiting_lane.current_state())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="操作日志记录与恢复基准测试")
+    parser.add_argument("--events", type=int, default=1_000_000, help="变化事件数")
+    parser.add_argument("--engine", default="stack", help="停车场引擎: stack / fenwick / compact")
+    parser.add_argument("--capacity", type=int, default=1000, help="停车场容量")
+    parser.add_argument("--waiting", type=int, default=100, help="便道容量")
+    parser.add_argument("--snapshot-every", type=int, default=50_000, help="快照间隔（操作数）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="bench_journal_")
+    try:
+        baseline = drive(new_engine(args), args.events, args.seed)
+        print(f"{args.events} 个事件，引擎 {args.engine}，停车场 {args.capacity}，便道 {args.waiting}")
+        print(f"{'方式':<20}{'记录耗时(s)':>12}{'事件/秒':>12}{'日志(MB)':>10}{'恢复耗时(s)':>12}{'重放条数':>10}{'一致':>6}")
+        print(f"{'不记录日志':<20}{baseline:>12.2f}{args.events / baseline:>12.0f}")
+
+        for name, snapshot_every in (("仅日志（全量重放）", args.events * 2), ("快照 + 日志尾部", args.snapshot_every)):
+            path = os.path.join(directory, f"journal_{snapshot_every}.log")
+            engine = new_engine(args)
+            # 只按操作数生成快照，结果不受运行速度影响
+            journal = OperationLog(path, SingleJournalTarget(engine), snapshot_every, float("inf"))
+            journal.start(engine.events)
+            elapsed = drive(engine, args.events, args.seed)
+            expected = state(engine)
+            # 模拟崩溃：不调用 close()，只保留已写入的日志与快照
+            journal.file.flush()
+            journal.wait_snapshot()
+            size = sum(os.path.getsize(name) for name in (path, journal.old_path, journal.snapshot_path)
+                       if os.path.exists(name))
+
+            recovered = new_engine(args)
+            stats = OperationLog(path, SingleJournalTarget(recovered), snapshot_every).recover()
+            consistent = state(recovered) == expected
+            print(f"{name:<20}{elapsed:>12.2f}{args.events / elapsed:>12.0f}{size / 1e6:>10.1f}"
+                  f"{stats['elapsed']:>12.3f}{stats['replayed']:>10}{'是' if consistent else '否':>6}")
+            journal.file.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_lots.py
+"""多停车场协调器基准测试
+
+1. 吞吐：多个停车场同时进行批量进出，比较不同工作进程数下每秒处理的车辆进出次数
+   （吞吐随进程数增加的前提是机器有对应数量的 CPU 核）。
+2. 隔离：其中一个停车场不停执行耗时的全量状态查询，测量其他停车场定位查询的延迟，
+   比较所有停车场在同一进程与每个停车场独立进程两种部署方式。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_lots
+    python -m benchmarks.bench_lots --lots 8 --processes 1 2 4 8 --commands 400
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from gateway.lots import LotCoordinator
+
+DEFAULT_PROCESSES = [1, 2, 4]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def prefill(coordinator, lot_id, count, batch=1000):
+    futures = [coordinator.submit(lot_id, "arrive", [f"{lot_id}-F{i:07d}" for i in range(start, min(count, start + batch))])
+               for start in range(0, count, batch)]
+    for future in futures:
+        future.result()
+
+
+def throughput(lots, processes, commands, batch, parked):
+    """每个停车场先停入 parked 辆车，再交替执行 commands 次批量进入与批量离开"""
+    specs = [{"lot_id": f"L{i}", "capacity": parked + batch, "waiting": batch} for i in range(lots)]
+    coordinator = LotCoordinator(specs, processes)
+    try:
+        for spec in specs:
+            prefill(coordinator, spec["lot_id"], parked)
+        start = time.perf_counter()
+        futures = []
+        for n in range(commands):
+            for spec in specs:
+                car_ids = [f"{spec['lot_id']}-C{n:05d}-{k:03d}" for k in range(batch)]
+                futures.append(coordinator.submit(spec["lot_id"], "arrive", car_ids))
+                futures.append(coordinator.submit(spec["lot_id"], "depart", car_ids))
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+    finally:
+        coordinator.close()
+    return lots * commands * batch * 2 / elapsed
+
+
+def isolation(lots, processes, slow_cars, probes):
+    """L0 停入 slow_cars 辆车并不停查询含全部车辆费用的状态，测量其余停车场的定位延迟"""
+    specs = [{"lot_id": "L0", "capacity": slow_cars}] + [{"lot_id": f"L{i}"} for i in range(1, lots)]
+    coordinator = LotCoordinator(specs, processes)
+    latencies = []
+    try:
+        prefill(coordinator, "L0", slow_cars)
+        for spec in specs[1:]:
+            coordinator.arrive(spec["lot_id"], [f"{spec['lot_id']}-P"])
+        stop = threading.Event()
+
+        def slow_lot():
+            while not stop.is_set():
+                coordinator.call("L0", "status", True)
+
+        slow = threading.Thread(target=slow_lot)
+        slow.start()
+        time.sleep(0.2)
+        for n in range(probes):
+            lot_id = specs[1 + n % (lots - 1)]["lot_id"]
+            start = time.perf_counter()
+            coordinator.locate(lot_id, f"{lot_id}-P")
+            latencies.append(time.perf_counter() - start)
+        stop.set()
+        slow.join()
+    finally:
+        coordinator.close()
+    latencies.sort()
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多停车场协调器基准测试")
+    parser.add_argument("--lots", type=int, default=4, help="停车场数")
+    parser.add_argument("--processes", type=int, nargs="+", default=DEFAULT_PROCESSES, help="工作进程数")
+    parser.add_argument("--commands", type=int, default=200, help="每个停车场的批量进出次数")
+    parser.add_argument("--batch", type=int, default=50, help="每次进出的车辆数")
+    parser.add_argument("--parked", type=int, default=2000, help="每个停车场预先停入的车辆数")
+    parser.add_argument("--slow-cars", type=int, default=100000, help="隔离测试中慢停车场的车辆数")
+    parser.add_argument("--probes", type=int, default=200, help="隔离测试的定位查询次数")
+    args = parser.parse_args(argv)
+
+    print(f"CPU 核数: {os.cpu_count()}  停车场数: {args.lots}")
+    print(f"\n吞吐（每次进出 {args.batch} 辆车，每个停车场 {args.commands} 次）")
+    print(f"{'进程数':>8}{'进出(次/秒)':>16}")
+    for processes in args.processes:
+        rate = throughput(args.lots, processes, args.commands, args.batch, args.parked)
+        print(f"{processes:>8}{rate:>16.0f}")
+
+    print(f"\n隔离（L0 有 {args.slow_cars} 辆车并不停查询全量状态，其余停车场定位查询）")
+    print(f"{'部署方式':<12}{'p50(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}")
+    for name, processes in (("同一进程", 1), ("独立进程", args.lots)):
+        latencies = isolation(args.lots, processes, args.slow_cars, args.probes)
+        print(f"{name:<12}{percentile(latencies, 0.5) * 1000:>10.2f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.2f}{latencies[-1] * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
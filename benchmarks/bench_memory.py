@@ -0,0 +1,61 @@
+# benchmarks/bench_memory.py
+"""停车场存储内存基准测试
+
+使用 tracemalloc 统计不同引擎在 10万 / 100万 辆车时的内存占用，
+用于估算多停车场主机的内存需求。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --sizes 100000 1000000 --engines stack compact
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from core.parking import Car, create_parking_lot, create_waiting_lane
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+DEFAULT_ENGINES = ["stack", "fenwick", "compact"]
+
+
+def make_plate(i):
+    """生成测试车牌号"""
+    return f"京A{i:07d}"
+
+
+def measure(engine, size):
+    """返回 (停车场字节数, 便道字节数)，均为车辆全部进入后的常驻内存"""
+    results = []
+    for factory in (create_parking_lot, create_waiting_lane):
+        gc.collect()
+        tracemalloc.start()
+        structure = factory(size, engine)
+        add = structure.arrive if hasattr(structure, "arrive") else structure.enqueue
+        for i in range(size):
+            add(Car(make_plate(i), 1750000000.0 + i))
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append(current)
+        del structure, add
+    return tuple(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="停车场存储内存基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--engines", nargs="+", default=DEFAULT_ENGINES)
+    args = parser.parse_args(argv)
+
+    print(f"{'引擎':<10}{'车辆数':>10}{'停车场(MB)':>14}{'字节/车':>10}{'便道(MB)':>12}{'字节/车':>10}")
+    for size in args.sizes:
+        for engine in args.engines:
+            lot_bytes, lane_bytes = measure(engine, size)
+            print(f"{engine:<10}{size:>10}"
+                  f"{lot_bytes / 2**20:>14.1f}{lot_bytes / size:>10.0f}"
+                  f"{lane_bytes / 2**20:>12.1f}{lane_bytes / size:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_metrics.py
+"""操作耗时统计的开销基准测试
+
+用随机进出驱动单门停车场引擎，比较关闭计时、开启计时、再次关闭计时三种情况下
+每秒处理的进出次数，并列出开启期间各操作的耗时分位数（微秒）。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_metrics
+    python -m benchmarks.bench_metrics --ops 500000 --engine fenwick
+"""
+
+import argparse
+import random
+import time
+
+from core.config import Config
+from core.engine import ParkingEngine
+from core.metrics import metrics
+from core.parking import Car
+
+
+def drive(args):
+    """随机进出 args.ops 次（有离开时写历史与计费），返回每秒操作数"""
+    config = Config(history_file=None)
+    config.parking_capacity = args.capacity
+    config.waiting_capacity = args.capacity // 10
+    config.parking_engine = args.engine
+    engine = ParkingEngine(config)
+    rng = random.Random(args.seed)
+    plates = [f"M{i:06d}" for i in range(args.capacity * 2)]
+    start = time.perf_counter()
+    for n in range(args.ops):
+        car_id = plates[rng.randrange(len(plates))]
+        if rng.random() < 0.5:
+            engine.arrive(Car(car_id, float(n)))
+        else:
+            engine.depart(car_id, float(n))
+    return args.ops / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="操作耗时统计的开销基准测试")
+    parser.add_argument("--ops", type=int, default=200_000, help="进出次数")
+    parser.add_argument("--engine", default="stack", help="停车场引擎: stack / fenwick / compact")
+    parser.add_argument("--capacity", type=int, default=1000, help="停车场容量")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    metrics.disable()
+    metrics.reset()
+    print(f"{args.ops} 次随机进出，引擎 {args.engine}，停车场 {args.capacity}")
+    print(f"{'计时':<12}{'操作/秒':>12}")
+    print(f"{'关闭':<12}{drive(args):>12.0f}")
+    metrics.enable()
+    print(f"{'开启':<12}{drive(args):>12.0f}")
+    metrics.disable()
+    print(f"{'再次关闭':<12}{drive(args):>12.0f}")
+
+    print(f"\n{'操作':<28}{'次数':>10}{'平均':>8}{'p50':>8}{'p99':>8}{'p99.9':>8}{'最大':>10}")
+    for name, summary in metrics.query().items():
+        if summary["count"]:
+            print(f"{name:<28}{summary['count']:>10}{summary['mean_us']:>8.1f}{summary['p50_us']:>8.1f}"
+                  f"{summary['p99_us']:>8.1f}{summary['p99.9_us']:>8.1f}{summary['max_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
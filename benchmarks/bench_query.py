@@ -0,0 +1,96 @@
+# benchmarks/bench_query.py
+"""历史记录查询基准测试
+
+比较逐条遍历历史记录与内存二级索引（车牌号 → 记录下标、按离开时间排序的
+下标数组）在“某车牌的全部停车记录”和“某时间段内离开的全部记录”两类查询上
+的耗时，分别测试内存列表与 JSON Lines 分页视图两种历史记录形式。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_query
+    python -m benchmarks.bench_query --sizes 1000000 2000000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.bench_history import make_records
+from core.config import Config
+from core.history import JsonlHistoryStore
+
+DEFAULT_SIZES = [1_000_000]
+
+
+def run_queries(config, plates, windows):
+    """返回 (车牌查询平均耗时, 时间段查询平均耗时)，单位秒"""
+    start = time.perf_counter()
+    for plate in plates:
+        config.find_history(plate)
+    plate_time = (time.perf_counter() - start) / len(plates)
+    start = time.perf_counter()
+    for t1, t2 in windows:
+        config.history_between(t1, t2)
+    range_time = (time.perf_counter() - start) / len(windows)
+    return plate_time, range_time
+
+
+def scan_queries(history, plates, windows):
+    """逐条遍历历史记录的对照组"""
+    start = time.perf_counter()
+    for plate in plates:
+        [r for r in history if r["car_id"] == plate]
+    plate_time = (time.perf_counter() - start) / len(plates)
+    start = time.perf_counter()
+    for t1, t2 in windows:
+        sorted((r for r in history if t1 <= r["exit_time"] < t2), key=lambda r: r["exit_time"])
+    range_time = (time.perf_counter() - start) / len(windows)
+    return plate_time, range_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="历史记录查询基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--queries", type=int, default=200, help="每类查询的次数")
+    parser.add_argument("--scan-queries", type=int, default=3, help="遍历对照组每类查询的次数")
+    args = parser.parse_args(argv)
+
+    print(f"{'记录数':>10}  {'历史记录':<8}{'方式':<8}{'建索引(s)':>10}{'车牌查询(ms)':>14}{'1小时离开(ms)':>15}")
+    for size in args.sizes:
+        records = make_records(size)
+        rng = random.Random(1)
+        plates = [rng.choice(records)["car_id"] for _ in range(args.queries)]
+        first, last = records[0]["exit_time"], records[-1]["exit_time"]
+        windows = []
+        for _ in range(args.queries):
+            t1 = rng.uniform(first, last)
+            windows.append((t1, t1 + 3600))
+
+        directory = tempfile.mkdtemp(prefix="bench_query_")
+        try:
+            path = os.path.join(directory, "history.jsonl")
+            JsonlHistoryStore(path).rewrite(records)
+            memory = Config(history_file=None)
+            memory.history = records
+            jsonl = Config(history_file=path)
+
+            for name, config in (("内存列表", memory), ("jsonl", jsonl)):
+                plate_time, range_time = scan_queries(
+                    config.history, plates[:args.scan_queries], windows[:args.scan_queries])
+                print(f"{size:>10}  {name:<8}{'遍历':<8}{'-':>10}"
+                      f"{plate_time * 1000:>14.3f}{range_time * 1000:>15.3f}")
+                start = time.perf_counter()
+                config.get_history_index()
+                build_time = time.perf_counter() - start
+                plate_time, range_time = run_queries(config, plates, windows)
+                print(f"{size:>10}  {name:<8}{'索引':<8}{build_time:>10.2f}"
+                      f"{plate_time * 1000:>14.3f}{range_time * 1000:>15.3f}")
+            jsonl.close_history()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
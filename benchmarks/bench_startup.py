@@ -0,0 +1,82 @@
+# benchmarks/bench_startup.py
+"""启动/登录耗时基准测试
+
+在不同历史记录规模下，比较一次性加载全部历史记录（旧的 JSON 数组格式与
+JSON Lines 全量加载）与按需分页视图的启动耗时，以及打开历史记录窗口时
+读取最近一页、再翻一页记录的耗时。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --sizes 10000 100000 1000000 --page 500
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from itertools import islice
+
+from benchmarks.bench_history import make_records
+from core.config import Config
+from core.history import JsonlHistoryStore
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def recent_page(history, size):
+    """历史记录窗口的第一页：最近 size 条，按时间倒序"""
+    return list(islice(reversed(history), size))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动/登录耗时基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--page", type=int, default=500, help="历史记录窗口每页记录数")
+    args = parser.parse_args(argv)
+
+    print(f"{'记录数':>10}  {'方式':<14}{'启动(ms)':>12}{'首页(ms)':>12}{'再次翻页(ms)':>14}")
+    for size in args.sizes:
+        directory = tempfile.mkdtemp(prefix="bench_startup_")
+        try:
+            records = make_records(size)
+            json_path = os.path.join(directory, "history.json")
+            jsonl_path = os.path.join(directory, "history.jsonl")
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+            JsonlHistoryStore(jsonl_path).rewrite(records)
+            del records
+
+            rows = []
+            startup, config = timed(lambda: Config(history_file=json_path, history_backend="json"))
+            first, _ = timed(lambda: recent_page(config.history, args.page))
+            rows.append(("json 全量", startup, first, first))
+
+            startup, history = timed(lambda: JsonlHistoryStore(jsonl_path).load())
+            first, _ = timed(lambda: recent_page(history, args.page))
+            rows.append(("jsonl 全量", startup, first, first))
+            del history
+
+            startup, config = timed(lambda: Config(history_file=jsonl_path, history_backend="jsonl"))
+            newest_first = reversed(config.history)
+            first, _ = timed(lambda: list(islice(newest_first, args.page)))
+            again, _ = timed(lambda: list(islice(newest_first, args.page)))
+            rows.append(("jsonl 分页视图", startup, first, again))
+            count, _ = timed(lambda: len(config.history))
+
+            for name, startup, first, again in rows:
+                print(f"{size:>10}  {name:<14}{startup * 1000:>12.1f}{first * 1000:>12.1f}{again * 1000:>14.2f}")
+            print(f"{'':>10}  分页视图首次 len()（建立行偏移索引）: {count * 1000:.1f} ms")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
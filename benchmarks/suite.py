@@ -0,0 +1,394 @@
+# benchmarks/suite.py
+"""基准测试套件：停车场核心、双门扩展与历史记录路径
+
+每个用例在固定随机种子下构造数据（不计时），再计时执行若干次同类操作，重复
+--repeat 次取每次操作耗时（纳秒）的中位数与最小值。结果可保存为 JSON；
+给出 --baseline 时与保存的基线逐项比较（默认比较最小值，受机器负载的干扰
+比中位数小），变慢超过 --threshold 的用例记为回归，有回归时退出码为 1，
+可在部署前的检查中使用。基线与本次应在同一台空闲的机器上运行。
+
+用例:
+    parking_depart     ParkingLot.depart：不同引擎、容量与目标车辆深度（距栈顶的车辆数）
+    lane_churn         WaitingLane 半满时入队 + 出队
+    dual_find_car      DualExitParkingLot.find_car
+    dual_leave         DualExitParkingLot.leave
+    dual_lane_dequeue  DualWaitingLane.dequeue（两侧交替）
+    optimize           ExitOptimizer.optimize_system（两侧不平衡）
+    add_history        Config.add_history（同步写入，已有不同数量的历史记录）
+    load_history       Config.load_history（加载并建立行索引）
+    billing_fee        Billing.calculate_fee + format_duration（逐辆计算费用并格式化时长）
+    billing_fees       Billing.calculate_fees（批量计算费用并格式化时长）
+
+用法（在项目根目录执行）:
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json --output current.json
+    python -m benchmarks.suite --filter parking_depart lane --quick --repeat 3
+    python -m benchmarks.suite --list
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_history import make_records
+from core.billing import Billing, NUMPY_SUPPORTED
+from core.config import Config
+from core.history import JsonlHistoryStore, SqliteHistoryStore
+from core.parking import Car, create_parking_lot, create_waiting_lane
+from extension.dual_exit.lane import DualWaitingLane
+from extension.dual_exit.optimizer import ExitOptimizer
+from extension.dual_exit.parking import DualExitParkingLot
+
+# 结果文件格式版本
+RESULT_VERSION = 1
+# 默认的回归阈值：比基线慢 15% 以上
+DEFAULT_THRESHOLD = 0.15
+# 比较时使用的统计量
+STATISTICS = {"min": "min_ns", "median": "median_ns"}
+
+
+def case_id(name, **params):
+    return name + "[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]"
+
+
+def plates(count, prefix="B"):
+    return [f"{prefix}{i:07d}" for i in range(count)]
+
+
+def parking_depart(quick):
+    """每次离开深度为 depth 的车辆（上方 depth 辆车让路），离开后该深度由下一辆车补上"""
+    ops = 100 if quick else 200
+    for engine in ("stack", "fenwick", "compact"):
+        for capacity in ((1000,) if quick else (1000, 10000)):
+            for depth_name, depth in (("top", 0), ("middle", capacity // 2), ("bottom", capacity - ops)):
+                def setup(engine=engine, capacity=capacity, depth=depth):
+                    lot = create_parking_lot(capacity, engine)
+                    ids = plates(capacity)
+                    for i, car_id in enumerate(ids):
+                        lot.arrive(Car(car_id, float(i)))
+                    # 车辆由北向南为 ids[0..capacity-1]，深度 depth 的车辆依次为 ids[capacity-1-depth], ids[capacity-2-depth], ...
+                    targets = ids[capacity - 1 - depth - ops + 1:capacity - depth][::-1]
+                    depart = lot.depart
+
+                    def run():
+                        # 与引擎一样只取离开结果，不遍历让路车辆视图
+                        for car_id in targets:
+                            depart(car_id)
+                    return run, None
+                yield case_id("parking_depart", engine=engine, capacity=capacity, depth=depth_name), ops, setup
+
+
+def lane_churn(quick):
+    ops = 5000 if quick else 20000
+    for engine in ("stack", "compact"):
+        for capacity in (100, 10000):
+            def setup(engine=engine, capacity=capacity):
+                lane = create_waiting_lane(capacity, engine)
+                for i, car_id in enumerate(plates(capacity // 2, "W")):
+                    lane.enqueue(Car(car_id, float(i)))
+                cars = [Car(car_id, float(i)) for i, car_id in enumerate(plates(ops, "X"))]
+                enqueue, dequeue = lane.enqueue, lane.dequeue
+
+                def run():
+                    for car in cars:
+                        enqueue(car)
+                        dequeue()
+                return run, None
+            yield case_id("lane_churn", engine=engine, capacity=capacity), ops, setup
+
+
+def dual_lot(capacity):
+    lot = DualExitParkingLot(capacity)
+    ids = plates(capacity, "D")
+    for i, car_id in enumerate(ids):
+        lot.enter(Car(car_id, float(i)), float(i))
+    return lot, ids
+
+
+def dual_find_car(quick):
+    ops = 200 if quick else 1000
+    for capacity in ((1000,) if quick else (1000, 10000)):
+        def setup(capacity=capacity):
+            lot, ids = dual_lot(capacity)
+            rng = random.Random(capacity)
+            targets = [ids[rng.randrange(capacity)] for _ in range(ops)]
+            find_car = lot.find_car
+
+            def run():
+                for car_id in targets:
+                    find_car(car_id)
+            return run, None
+        yield case_id("dual_find_car", capacity=capacity), ops, setup
+
+
+def dual_leave(quick):
+    ops = 200 if quick else 500
+    for capacity in ((1000,) if quick else (1000, 10000)):
+        def setup(capacity=capacity):
+            lot, ids = dual_lot(capacity)
+            targets = random.Random(capacity).sample(ids, ops)
+            leave = lot.leave
+
+            def run():
+                for car_id in targets:
+                    leave(car_id, 1e9)
+            return run, None
+        yield case_id("dual_leave", capacity=capacity), ops, setup
+
+
+def dual_lane_dequeue(quick):
+    for capacity in ((1000,) if quick else (1000, 10000)):
+        def setup(capacity=capacity):
+            lane = DualWaitingLane(capacity)
+            for i, car_id in enumerate(plates(capacity, "Q")):
+                lane.enqueue(Car(car_id, float(i)), float(i))
+            dequeue = lane.dequeue
+
+            def run():
+                for i in range(capacity):
+                    dequeue("north" if i % 2 else "south")
+            return run, None
+        yield case_id("dual_lane_dequeue", capacity=capacity), capacity, setup
+
+
+def optimize(quick):
+    """南侧车辆全部离开后反复优化（每次最多移动 3 辆车），跳过 30 秒的频率限制"""
+    ops = 100 if quick else 300
+    for capacity in ((1000,) if quick else (1000, 10000)):
+        def setup(capacity=capacity):
+            lot, ids = dual_lot(capacity)
+            while lot.south_stack:
+                lot.leave(lot.south_stack[-1]["car"].car_id, 1e9)
+            optimizer = ExitOptimizer(lot, DualWaitingLane(10), clock=lambda: 1e9)
+
+            def run():
+                for _ in range(ops):
+                    optimizer.last_optimize_time = float("-inf")
+                    optimizer.optimize_system()
+            return run, None
+        yield case_id("optimize", capacity=capacity), ops, setup
+
+
+def history_fixture(directory, backend, size, cache):
+    """已有 size 条记录的历史记录文件（同一规模只生成一次，每次计时前复制一份）"""
+    source = os.path.join(directory, f"fixture_{size}.{backend}")
+    if source not in cache:
+        records = make_records(size)
+        if backend == "jsonl":
+            JsonlHistoryStore(source).rewrite(records)
+        else:
+            store = SqliteHistoryStore(source)
+            store.append(records)
+            store.close()
+        cache[source] = True
+    cache["runs"] = cache.get("runs", 0) + 1
+    path = os.path.join(directory, f"run_{cache['runs']}.{backend}")
+    shutil.copyfile(source, path)
+    return path
+
+
+def close_config(config):
+    """关闭后台写入线程与 SQLite 连接（删除临时目录前调用）"""
+    config.close_history()
+    if isinstance(config.store, SqliteHistoryStore):
+        config.store.close()
+
+
+def history_sizes(quick):
+    return (0, 10_000) if quick else (0, 10_000, 100_000)
+
+
+def add_history(quick, directory, cache):
+    ops = 100 if quick else 300
+    for backend in ("jsonl", "sqlite"):
+        for size in history_sizes(quick):
+            def setup(backend=backend, size=size):
+                path = history_fixture(directory, backend, size, cache)
+                config = Config(history_file=path, history_backend=backend)
+                config.set_history_flush_ms(0)  # 同步写入，计入实际落盘开销
+                add = config.add_history
+
+                def run():
+                    for i in range(ops):
+                        add(f"H{i:05d}", 1e9, 1e9 + 600, 10.0)
+                return run, lambda: close_config(config)
+            yield case_id("add_history", backend=backend, size=size), ops, setup
+
+
+def load_history(quick, directory, cache):
+    for backend in ("jsonl", "sqlite"):
+        for size in history_sizes(quick)[1:]:
+            def setup(backend=backend, size=size):
+                path = history_fixture(directory, backend, size, cache)
+                config = Config(history_file=None, history_backend=backend)
+                config.history_file = path
+
+                def run():
+                    history = config.load_history()
+                    len(history)  # jsonl 建立行偏移索引，sqlite 查询记录数
+                return run, lambda: close_config(config)
+            yield case_id("load_history", backend=backend, size=size), 1, setup
+
+
+def billing_cases(quick):
+    count = 10_000 if quick else 100_000
+    rng = random.Random(7)
+    durations = [rng.uniform(60, 3 * 86400) for _ in range(count)]
+    enter_times = [1.75e9 + rng.uniform(0, 86400 * 30) for _ in range(count)]
+    billing = Billing(Config(history_file=None))
+
+    # 两个用例做同样的工作（费用与格式化的时长），逐辆与批量的结果可以直接比较
+    def setup_fee():
+        fee, format_duration = billing.calculate_fee, billing.format_duration
+        return (lambda: [(fee(d, t), format_duration(d)) for d, t in zip(durations, enter_times)]), None
+    yield case_id("billing_fee", cars=count), count, setup_fee
+
+    for use_numpy in ((False, True) if NUMPY_SUPPORTED else (False,)):
+        def setup_fees(use_numpy=use_numpy):
+            return (lambda: billing.calculate_fees(durations, enter_times, use_numpy=use_numpy)), None
+        yield case_id("billing_fees", cars=count, numpy=use_numpy), count, setup_fees
+
+
+def all_cases(quick, directory):
+    cache = {}
+    yield from parking_depart(quick)
+    yield from lane_churn(quick)
+    yield from dual_find_car(quick)
+    yield from dual_leave(quick)
+    yield from dual_lane_dequeue(quick)
+    yield from optimize(quick)
+    yield from add_history(quick, directory, cache)
+    yield from load_history(quick, directory, cache)
+    yield from billing_cases(quick)
+
+
+def measure(ops, setup, repeat):
+    """重复 repeat 次（另有一次不计入的预热），返回每次操作耗时（纳秒）列表"""
+    samples = []
+    for i in range(repeat + 1):
+        run, cleanup = setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            run()
+            elapsed = time.perf_counter_ns() - start
+        finally:
+            gc.enable()
+            if cleanup:
+                cleanup()
+        if i:
+            samples.append(elapsed / ops)
+    return samples
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": NUMPY_SUPPORTED
+    }
+
+
+def compare(results, baseline, threshold, key="min_ns"):
+    """按统计量 key 与基线比较，打印对比表，返回回归的用例名列表"""
+    base = baseline["results"]
+    if baseline.get("environment") != results["environment"]:
+        print("注意: 基线的运行环境与本次不同，对比结果仅供参考")
+    if baseline.get("quick") != results["quick"]:
+        print("注意: 基线与本次的 --quick 设置不同，部分用例的数据规模不一致")
+    print(f"\n{'用例':<62}{'基线(ns)':>12}{'本次(ns)':>12}{'变化':>9}  结论")
+    regressions = []
+    for name, current in results["results"].items():
+        if name not in base:
+            print(f"{name:<62}{'-':>12}{current[key]:>12.0f}{'':>9}  新增")
+            continue
+        before = base[name][key]
+        change = current[key] / before - 1 if before else 0.0
+        if change > threshold:
+            verdict = "回归"
+            regressions.append(name)
+        elif change < -threshold:
+            verdict = "改进"
+        else:
+            verdict = "持平"
+        print(f"{name:<62}{before:>12.0f}{current[key]:>12.0f}{change:>+9.1%}  {verdict}")
+    for name in base:
+        if name not in results["results"] and not results["filter"]:
+            print(f"{name:<62}{base[name][key]:>12.0f}{'-':>12}{'':>9}  缺失")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="停车场核心、双门扩展与历史记录基准测试套件")
+    parser.add_argument("--filter", nargs="+", default=None, help="只运行名称包含任一关键字的用例")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的重复次数（取中位数）")
+    parser.add_argument("--quick", action="store_true", help="缩小数据规模，快速检查")
+    parser.add_argument("--output", default=None, help="把结果保存为 JSON 文件（可作为之后的基线）")
+    parser.add_argument("--baseline", default=None, help="与保存的基线结果比较")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="判定回归的变慢比例")
+    parser.add_argument("--statistic", choices=list(STATISTICS), default="min", help="与基线比较的统计量")
+    parser.add_argument("--list", action="store_true", help="只列出用例")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != RESULT_VERSION:
+            parser.error(f"不支持的基线文件版本: {baseline.get('version')}")
+
+    directory = tempfile.mkdtemp(prefix="bench_suite_")
+    results = {
+        "version": RESULT_VERSION,
+        "time": time.time(),
+        "environment": environment(),
+        "quick": args.quick,
+        "repeat": args.repeat,
+        "filter": args.filter,
+        "results": {}
+    }
+    try:
+        if not args.list:
+            print(f"{'用例':<62}{'操作数':>8}{'中位数(ns)':>12}{'最小(ns)':>12}")
+        for name, ops, setup in all_cases(args.quick, directory):
+            if args.filter and not any(keyword in name for keyword in args.filter):
+                continue
+            if args.list:
+                print(name)
+                continue
+            samples = measure(ops, setup, args.repeat)
+            median = statistics.median(samples)
+            results["results"][name] = {"ops": ops, "median_ns": median, "min_ns": min(samples), "samples_ns": samples}
+            print(f"{name:<62}{ops:>8}{median:>12.0f}{min(samples):>12.0f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    if args.list:
+        return 0
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, STATISTICS[args.statistic])
+        if regressions:
+            print(f"\n{len(regressions)} 个用例比基线慢 {args.threshold:.0%} 以上")
+            return 1
+        print("\n没有发现回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# core/analytics.py
+
+import math
+
+from utils.time_utils import local_offset, local_to_timestamp
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 86400
+# 每日停留时长分位数估计保留的天数（统计分析窗口只查询当天）
+DWELL_RETENTION_DAYS = 7
+
+def local_hour(timestamp):
+    """时间戳所在的本地小时序号"""
+    return int((timestamp + local_offset(timestamp)) // HOUR_SECONDS)
+
+def local_day(timestamp):
+    """时间戳所在的本地日序号"""
+    return int((timestamp + local_offset(timestamp)) // DAY_SECONDS)
+
+def hour_start(hour):
+    """本地小时序号对应的起始时间戳"""
+    return local_to_timestamp(hour * HOUR_SECONDS)
+
+def day_start(day):
+    """本地日序号对应的零点时间戳"""
+    return local_to_timestamp(day * DAY_SECONDS)
+
+class QuantileSketch:
+    """固定内存的流式分位数估计（对数分桶）
+
+    大于 min_value 的值 x 落入第 ceil(log(x) / log(gamma)) 个桶，
+    gamma = (1 + a) / (1 - a)，用桶的中点估计分位数时相对误差不超过 a。
+    桶数只与数值范围有关（相对误差 1% 时 1 秒到 1 年约 850 个桶），与记录数无关；
+    超过 max_buckets 时合并最小的桶，只影响最低端的分位数。两个估计可以合并。
+    """
+    def __init__(self, relative_accuracy=0.01, min_value=1.0, max_buckets=2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.max_buckets = max_buckets
+        self.buckets = {}       # 桶序号 → 计数
+        self.low_count = 0      # 不大于 min_value 的值的个数
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, count=1):
+        if value <= self.min_value:
+            self.low_count += count
+        else:
+            key = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + count
+            if len(self.buckets) > self.max_buckets:
+                self.collapse()
+        self.count += count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def collapse(self):
+        """合并最小的两个桶，保持桶数不超过上限"""
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other):
+        """合并另一个相同精度的估计"""
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            self.collapse()
+        self.low_count += other.low_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantiles(self, qs):
+        """返回各分位数的估计值列表，qs 取值在 [0, 1]；无数据时返回 None"""
+        if not self.count:
+            return [None] * len(qs)
+        keys = sorted(self.buckets)
+        results = []
+        for q in qs:
+            rank = q * (self.count - 1)
+            if rank < self.low_count:
+                results.append(self.min)
+                continue
+            cumulative = self.low_count
+            value = self.max
+            for key in keys:
+                cumulative += self.buckets[key]
+                if cumulative > rank:
+                    value = 2 * self.gamma ** key / (self.gamma + 1)
+                    break
+            results.append(min(max(value, self.min), self.max))
+        return results
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+class HistoryAnalytics:
+    """停车历史的增量统计
+
+    随记录追加增量维护按本地小时/日分桶的计数器和停留时长分位数估计，
+    查询只遍历分桶（与小时数、天数成正比），与记录数无关：
+        hours  小时序号 → [收入, 到达数, 离开数]（收入与离开计入离开所在小时）
+        days   日序号 → [收入, 离开数, 停留总秒数]
+        dwell / daily_dwell  全部 / 每日的停留时长分位数估计
+    daily_dwell 只保留最近 dwell_days 天（以出现过的最晚离开日为准），
+    更早的每日估计被丢弃，内存不随运行天数增长。
+    统计只包含已离开车辆的历史记录。
+    """
+    def __init__(self, relative_accuracy=0.01, dwell_days=DWELL_RETENTION_DAYS):
+        self.relative_accuracy = relative_accuracy
+        self.dwell_days = dwell_days
+        self.hours = {}
+        self.days = {}
+        self.dwell = QuantileSketch(relative_accuracy)
+        self.daily_dwell = {}
+        self.last_dwell_day = None  # daily_dwell 中最晚的离开日
+        self.count = 0
+        self.revenue = 0.0
+        self.offsets = {}  # UTC小时序号 → 本地时区偏移（偏移只在整点变化）
+
+    @classmethod
+    def build(cls, records, relative_accuracy=0.01, dwell_days=DWELL_RETENTION_DAYS):
+        """由已有历史记录一次性建立统计"""
+        analytics = cls(relative_accuracy, dwell_days)
+        analytics.add_many(records)
+        return analytics
+
+    def local_time(self, timestamp):
+        """本地时间秒数（时间戳加时区偏移），按UTC小时缓存偏移以避免逐条调用 localtime"""
+        key = int(timestamp // HOUR_SECONDS)
+        offset = self.offsets.get(key)
+        if offset is None:
+            offset = self.offsets[key] = local_offset(timestamp)
+        return timestamp + offset
+
+    def add(self, record):
+        """加入一条历史记录"""
+        enter_time = record["enter_time"]
+        exit_time = record["exit_time"]
+        fee = record["fee"]
+        dwell = exit_time - enter_time
+
+        hours = self.hours
+        exit_local = self.local_time(exit_time)
+        exit_hour = int(exit_local // HOUR_SECONDS)
+        bucket = hours.get(exit_hour)
+        if bucket is None:
+            bucket = hours[exit_hour] = [0.0, 0, 0]
+        bucket[0] += fee
+        bucket[2] += 1
+        enter_hour = int(self.local_time(enter_time) // HOUR_SECONDS)
+        bucket = hours.get(enter_hour)
+        if bucket is None:
+            bucket = hours[enter_hour] = [0.0, 0, 0]
+        bucket[1] += 1
+
+        day = int(exit_local // DAY_SECONDS)
+        bucket = self.days.get(day)
+        if bucket is None:
+            bucket = self.days[day] = [0.0, 0, 0.0]
+        bucket[0] += fee
+        bucket[1] += 1
+        bucket[2] += dwell
+        sketch = self.daily_dwell.get(day)
+        if sketch is None:
+            sketch = self.new_daily_dwell(day)
+        if sketch is not None:
+            sketch.add(dwell)
+        self.dwell.add(dwell)
+
+        self.count += 1
+        self.revenue += fee
+
+    def new_daily_dwell(self, day):
+        """为离开日 day 建立每日估计并丢弃保留天数之前的估计；day 已在保留天数之前时返回 None"""
+        if self.last_dwell_day is None or day > self.last_dwell_day:
+            self.last_dwell_day = day
+            first = day - self.dwell_days + 1
+            for old in [old for old in self.daily_dwell if old < first]:
+                del self.daily_dwell[old]
+        elif day <= self.last_dwell_day - self.dwell_days:
+            return None
+        sketch = self.daily_dwell[day] = QuantileSketch(self.relative_accuracy)
+        return sketch
+
+    def add_many(self, records):
+        for record in records:
+            self.add(record)
+
+    def hour_range(self, start, end):
+        """[start, end) 覆盖的小时序号范围，未指定时取有数据的首末小时"""
+        if not self.hours:
+            return range(0)
+        first = local_hour(start) if start is not None else min(self.hours)
+        last = local_hour(end - 1e-6) if end is not None else max(self.hours)
+        return range(first, last + 1)
+
+    def day_range(self, start, end):
+        if not self.days:
+            return range(0)
+        first = local_day(start) if start is not None else min(self.days)
+        last = local_day(end - 1e-6) if end is not None else max(self.days)
+        return range(first, last + 1)
+
+    def revenue_per_hour(self, start=None, end=None):
+        """每小时收入，返回 [(小时起始时间戳, 收入, 离开数)]，包含没有记录的小时"""
+        result = []
+        for hour in self.hour_range(start, end):
+            revenue, _, departures = self.hours.get(hour, (0.0, 0, 0))
+            result.append((hour_start(hour), revenue, departures))
+        return result
+
+    def occupancy_curve(self, start=None, end=None):
+        """在场车辆曲线，返回 [(小时起始时间戳, 在场车辆数, 到达数, 离开数)]
+
+        在场车辆数为该小时内曾停放的车辆数：此前（含本小时）到达、且未在本小时之前离开。
+        """
+        hours = self.hour_range(start, end)
+        if not hours:
+            return []
+        # 起点之前的累计到达与离开
+        present = 0
+        for hour, (_, arrivals, departures) in self.hours.items():
+            if hour < hours.start:
+                present += arrivals - departures
+        result = []
+        for hour in hours:
+            _, arrivals, departures = self.hours.get(hour, (0.0, 0, 0))
+            present += arrivals
+            result.append((hour_start(hour), present, arrivals, departures))
+            present -= departures
+        return result
+
+    def daily_summary(self, start=None, end=None):
+        """每日汇总，返回 [(零点时间戳, 收入, 离开数, 平均停留秒数)]"""
+        result = []
+        for day in self.day_range(start, end):
+            revenue, departures, dwell_total = self.days.get(day, (0.0, 0, 0.0))
+            average = dwell_total / departures if departures else 0.0
+            result.append((day_start(day), revenue, departures, average))
+        return result
+
+    def dwell_percentiles(self, qs=(0.5, 0.95, 0.99), start=None, end=None):
+        """停留时长分位数（秒），返回 {分位数: 估计值}
+
+        指定 [start, end) 时按离开日合并对应天的估计（以天为粒度），
+        只包含保留的最近 dwell_days 天。
+        """
+        if start is None and end is None:
+            sketch = self.dwell
+        else:
+            sketch = QuantileSketch(self.relative_accuracy)
+            for day in self.day_range(start, end):
+                if day in self.daily_dwell:
+                    sketch.merge(self.daily_dwell[day])
+        return dict(zip(qs, sketch.quantiles(qs)))
@@ -1,16 +1,212 @@
 # core/billing.py
 
+import copy
+from bisect import bisect_right
 from datetime import timedelta
+from core.clock import system_clock
 from core.config import Config
+from utils.time_utils import offset_transitions
 
-# core/billing.py
+# NumPy为可选依赖，未安装时批量计费使用纯Python实现
+try:
+    import numpy as np
+    NUMPY_SUPPORTED = True
+except ImportError:
+    np = None
+    NUMPY_SUPPORTED = False
+
+# 批量格式化时长用的查找表：小时（0-99）与 ":MM:SS"（0-3599秒）
+_HOUR_TEXT = [f"{h:02d}" for h in range(100)]
+_MINUTE_SECOND_TEXT = [f":{s // 60:02d}:{s % 60:02d}" for s in range(3600)]
+
+DAY_SECONDS = 86400
+
+def parse_clock(text):
+    """将 "HH:MM" 解析为当天的秒数"""
+    hours, minutes = text.split(":")
+    return (int(hours) * 60 + int(minutes)) * 60
+
+def format_clock(seconds):
+    """将当天的秒数格式化为 HH:MM"""
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+class Tariff:
+    """分时段计费规则
+
+    由 Config.tariff 编译而成：
+        free_minutes  免费时长（分钟），停留不超过该时长免费，超过则全程计费
+        periods       [["HH:MM", 每小时费率], ...]，每个时段持续到下一个时段开始，按天循环
+        daily_cap     每24小时封顶金额，0为不封顶
+    编译时预先计算一天内各时段起点的累计费用，任意 [进入, 离开) 区间的费用
+    只需两次二分查找，与停留天数无关。
+    """
+    def __init__(self, definition):
+        self.free_seconds = float(definition.get("free_minutes", 0)) * 60
+        self.daily_cap = float(definition.get("daily_cap", 0) or 0)
+
+        periods = sorted((parse_clock(start), float(rate)) for start, rate in definition.get("periods", []))
+        if not periods:
+            periods = [(0, 0.0)]
+        labels = [
+            f"{format_clock(start)}-{format_clock(periods[(i + 1) % len(periods)][0])}"
+            for i, (start, _) in enumerate(periods)
+        ]
+        if periods[0][0] != 0:
+            # 零点之前的时段沿用前一天最后一个时段的费率
+            periods.insert(0, (0, periods[-1][1]))
+            labels.insert(0, labels[-1])
+
+        self.starts = [start for start, _ in periods]       # 各时段起点（当天秒数）
+        self.rates = [rate / 3600.0 for _, rate in periods]  # 各时段每秒费率
+        self.labels = labels                                # 各时段显示文本
+        self.cumulative = [0.0]  # 零点到各时段起点的累计费用
+        for i in range(1, len(self.starts)):
+            span = self.starts[i] - self.starts[i - 1]
+            self.cumulative.append(self.cumulative[-1] + span * self.rates[i - 1])
+        self.day_cost = self.cumulative[-1] + (DAY_SECONDS - self.starts[-1]) * self.rates[-1]
+
+    def cost_until(self, local_seconds):
+        """从本地纪元零点到 local_seconds 的累计费用"""
+        days, second = divmod(local_seconds, DAY_SECONDS)
+        i = bisect_right(self.starts, second) - 1
+        return days * self.day_cost + self.cumulative[i] + (second - self.starts[i]) * self.rates[i]
+
+    def transitions(self, start, end):
+        """[start, end] 内的时区偏移切换表: (各切换时刻, 各段偏移, 各段累计跳变)
+
+        切换时刻本地时间跳变（春季拨快时跳过一小时，秋季拨回时重复一小时），
+        cost_until(本地时间) 随之跳变；第 i 段的累计跳变为前 i 个切换点处
+        cost_until 跳变之和，减去后即为按实际经过的秒数计算的累计费用。
+        """
+        bounds, offsets = offset_transitions(start, end)
+        jumps = [0.0]
+        for bound, before, after in zip(bounds, offsets, offsets[1:]):
+            jumps.append(jumps[-1] + self.cost_until(bound + after) - self.cost_until(bound + before))
+        return bounds, offsets, jumps
+
+    def elapsed_cost(self, timestamp, table):
+        """按实际经过的秒数、各时刻的本地费率累计到 timestamp 的费用（起点由 table 决定）"""
+        bounds, offsets, jumps = table
+        i = bisect_right(bounds, timestamp)
+        return self.cost_until(timestamp + offsets[i]) - jumps[i]
+
+    def raw_cost(self, enter_time, exit_time, table=None):
+        """不考虑免费时长与封顶的区间费用，夏令时切换时按实际停留的秒数计费"""
+        if table is None:
+            table = self.transitions(enter_time, exit_time)
+        return self.elapsed_cost(exit_time, table) - self.elapsed_cost(enter_time, table)
+
+    def fee(self, enter_time, exit_time):
+        """计算停车费用"""
+        duration = exit_time - enter_time
+        if duration <= self.free_seconds:
+            return 0.0
+        table = self.transitions(enter_time, exit_time)
+        if not self.daily_cap:
+            return self.raw_cost(enter_time, exit_time, table)
+        # 不含时区切换的完整24小时费用相同（时段按天循环），含切换的窗口与不足24小时的部分查表
+        full_days = int(duration // DAY_SECONDS)
+        rest_start = enter_time + full_days * DAY_SECONDS
+        total = full_days * min(self.daily_cap, self.day_cost)
+        for day in sorted({int((bound - enter_time) // DAY_SECONDS) for bound in table[0]}):
+            if day < full_days:
+                window_start = enter_time + day * DAY_SECONDS
+                total += (min(self.daily_cap, self.raw_cost(window_start, window_start + DAY_SECONDS, table))
+                          - min(self.daily_cap, self.day_cost))
+        return total + min(self.daily_cap, self.raw_cost(rest_start, exit_time, table))
+
+    def fees(self, enter_times, exit_times):
+        """NumPy批量计算费用，结果与逐辆调用 fee() 一致（包括跨夏令时切换的停留）"""
+        starts = np.asarray(self.starts, dtype=np.float64)
+        rates = np.asarray(self.rates)
+        cumulative = np.asarray(self.cumulative)
+        if not enter_times.size:
+            return np.zeros(0)
+        bounds, offsets, jumps = self.transitions(float(enter_times.min()), float(exit_times.max()))
+        bounds = np.asarray(bounds, dtype=np.float64)
+        offsets = np.asarray(offsets, dtype=np.float64)
+        jumps = np.asarray(jumps)
+
+        def elapsed_cost(timestamps):
+            i = np.searchsorted(bounds, timestamps, side="right")
+            days, second = np.divmod(timestamps + offsets[i], DAY_SECONDS)
+            j = np.searchsorted(starts, second, side="right") - 1
+            return days * self.day_cost + cumulative[j] + (second - starts[j]) * rates[j] - jumps[i]
+
+        durations = exit_times - enter_times
+        if self.daily_cap:
+            day_fee = min(self.daily_cap, self.day_cost)
+            full_days = np.floor(durations / DAY_SECONDS)
+            rest_start = enter_times + full_days * DAY_SECONDS
+            rest = elapsed_cost(exit_times) - elapsed_cost(rest_start)
+            fees = full_days * day_fee + np.minimum(self.daily_cap, rest)
+            # 含时区切换的完整24小时窗口单独计算（两次切换相隔远超过24小时）
+            for bound in bounds.tolist():
+                day = np.floor((bound - enter_times) / DAY_SECONDS)
+                rows = np.nonzero((day >= 0) & (day < full_days))[0]
+                if rows.size:
+                    window_start = enter_times[rows] + day[rows] * DAY_SECONDS
+                    window = elapsed_cost(window_start + DAY_SECONDS) - elapsed_cost(window_start)
+                    fees[rows] += np.minimum(self.daily_cap, window) - day_fee
+        else:
+            fees = elapsed_cost(exit_times) - elapsed_cost(enter_times)
+        return np.where(durations <= self.free_seconds, 0.0, fees)
+
+    def breakdown(self, enter_time, exit_time):
+        """逐时段拆分费用（按实际经过的秒数，夏令时切换处按切换后的本地时间继续）
+
+        返回 (各时段 [(时段, 每小时费率, 秒数, 费用)], 各24小时窗口 [(原始费用, 计费)])。
+        """
+        bounds, offsets, _ = self.transitions(enter_time, exit_time)
+        items = {}
+        windows = []
+        window_start = enter_time
+        while window_start < exit_time:
+            window_end = min(exit_time, window_start + DAY_SECONDS)
+            t = window_start
+            raw = 0.0
+            while t < window_end:
+                k = bisect_right(bounds, t)
+                piece_end = min(window_end, bounds[k]) if k < len(bounds) else window_end
+                local = t + offsets[k]
+                day_start = local - local % DAY_SECONDS
+                i = bisect_right(self.starts, local - day_start) - 1
+                next_start = day_start + (self.starts[i + 1] if i + 1 < len(self.starts) else DAY_SECONDS)
+                segment = min(piece_end - t, next_start - local)
+                cost = segment * self.rates[i]
+                label = self.labels[i]
+                rate, seconds, total = items.get(label, (self.rates[i] * 3600, 0.0, 0.0))
+                items[label] = (rate, seconds + segment, total + cost)
+                raw += cost
+                t += segment
+            charged = min(self.daily_cap, raw) if self.daily_cap else raw
+            windows.append((raw, charged))
+            window_start = window_end
+        return [(label,) + item for label, item in items.items()], windows
 
 class Billing:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, clock=None):
         self.config = config
+        self.clock = clock or system_clock  # 时钟，未提供进入时间时按"现在离开"推算，可注入虚拟时钟
+        self.tariff = None
+        self.tariff_definition = None
+
+    def get_tariff(self):
+        """返回编译后的分时段费率，配置变化时重新编译"""
+        if self.tariff is None or self.tariff_definition != self.config.tariff:
+            self.tariff = Tariff(self.config.tariff)
+            self.tariff_definition = copy.deepcopy(self.config.tariff)
+        return self.tariff
 
-    def calculate_fee(self, seconds):
-        """计算费用，返回浮点数"""
+    def calculate_fee(self, seconds, enter_time=None):
+        """计算费用，返回浮点数
+
+        分时段计费（tariff）需要知道进入时间，未提供时按"现在离开"推算。
+        """
+        if self.config.billing_mode == "tariff":
+            if enter_time is None:
+                enter_time = self.clock() - seconds
+            return self.get_tariff().fee(enter_time, enter_time + seconds)
         if self.config.billing_mode == "per_minute":
             # 使用浮点数计算
             return (seconds / 60.0) * self.config.fee_per_minute
@@ -28,9 +224,80 @@ class Billing:
         minutes, seconds = divmod(remainder, 60)
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
+    def calculate_fees(self, durations, enter_times=None, use_numpy=True):
+        """批量计算费用与格式化时长
+
+        durations 为停留秒数序列，计费模式只解析一次；安装了NumPy时整批
+        向量化计算，否则使用纯Python实现。分时段计费时 enter_times 为对应的
+        进入时间（未提供时按"现在离开"推算）。返回 (费用列表, 时长字符串列表)。
+        """
+        if self.config.billing_mode == "tariff":
+            return self.calculate_tariff_fees(durations, enter_times, use_numpy)
+
+        if use_numpy and NUMPY_SUPPORTED:
+            seconds = np.asarray(durations, dtype=np.float64)
+            if self.config.billing_mode == "per_minute":
+                fees = seconds * (self.config.fee_per_minute / 60.0)
+            elif self.config.billing_mode == "per_hour":
+                fees = seconds * (self.config.fee_per_hour / 3600.0)
+            elif self.config.billing_mode == "fixed":
+                fees = np.full(seconds.shape, float(self.config.fixed_fee))
+            else:
+                fees = np.zeros(seconds.shape)
+            return fees.tolist(), self.format_durations(seconds, use_numpy)
+
+        if self.config.billing_mode == "per_minute":
+            rate = self.config.fee_per_minute / 60.0
+            fees = [seconds * rate for seconds in durations]
+        elif self.config.billing_mode == "per_hour":
+            rate = self.config.fee_per_hour / 3600.0
+            fees = [seconds * rate for seconds in durations]
+        elif self.config.billing_mode == "fixed":
+            fees = [float(self.config.fixed_fee)] * len(durations)
+        else:
+            fees = [0.0] * len(durations)
+        return fees, self.format_durations(durations, use_numpy)
+
+    def calculate_tariff_fees(self, durations, enter_times=None, use_numpy=True):
+        """分时段计费的批量计算，参数与返回值同 calculate_fees"""
+        tariff = self.get_tariff()
+        now = self.clock()
+        if use_numpy and NUMPY_SUPPORTED:
+            seconds = np.asarray(durations, dtype=np.float64)
+            if enter_times is None:
+                enters = now - seconds
+            else:
+                enters = np.asarray(enter_times, dtype=np.float64)
+            fees = tariff.fees(enters, enters + seconds)
+            return fees.tolist(), self.format_durations(seconds, use_numpy)
+
+        if enter_times is None:
+            enter_times = [now - seconds for seconds in durations]
+        fees = [tariff.fee(enter, enter + seconds) for seconds, enter in zip(durations, enter_times)]
+        return fees, self.format_durations(durations, use_numpy)
+
+    def format_durations(self, durations, use_numpy=True):
+        """批量格式化时长为 HH:MM:SS（与 format_duration 结果一致）"""
+        if use_numpy and NUMPY_SUPPORTED:
+            hours, remainder = np.divmod(np.asarray(durations, dtype=np.float64).astype(np.int64), 3600)
+            pairs = zip(hours.tolist(), remainder.tolist())
+        else:
+            pairs = (divmod(int(seconds), 3600) for seconds in durations)
+        hour_text = _HOUR_TEXT
+        minute_second_text = _MINUTE_SECOND_TEXT
+        return [
+            (hour_text[h] if 0 <= h < 100 else f"{h:02d}") + minute_second_text[r]
+            for h, r in pairs
+        ]
+
     
-    def detailed_calculation(self, seconds):
+    def detailed_calculation(self, seconds, enter_time=None):
         """返回详细的计费计算过程"""
+        if self.config.billing_mode == "tariff":
+            if enter_time is None:
+                enter_time = self.clock() - seconds
+            return self.detailed_tariff_calculation(seconds, enter_time)
+
         if self.config.billing_mode == "per_minute":
             minutes = seconds / 60.0
             fee = minutes * self.config.fee_per_minute
@@ -59,4 +326,27 @@ class Billing:
                 f"固定费用: ¥{self.config.fixed_fee}"
             )
         
-        return "未知计费模式"
\ No newline at end of file
+        return "未知计费模式"
+
+    def detailed_tariff_calculation(self, seconds, enter_time):
+        """返回分时段计费的分项明细"""
+        tariff = self.get_tariff()
+        lines = [
+            "计费模式: 分时段计费",
+            f"停留时长: {self.format_duration(seconds)}",
+        ]
+        if seconds <= tariff.free_seconds:
+            lines.append(f"免费时长 {tariff.free_seconds / 60:.0f} 分钟内，免费")
+            lines.append("费用: ¥0.00")
+            return "\n".join(lines)
+
+        items, windows = tariff.breakdown(enter_time, enter_time + seconds)
+        for label, rate, period_seconds, cost in items:
+            hours = period_seconds / 3600.0
+            lines.append(f"{label} ¥{rate}/小时: {hours:.2f} × {rate} = ¥{cost:.2f}")
+        if tariff.daily_cap:
+            for i, (raw, charged) in enumerate(windows, 1):
+                if charged < raw:
+                    lines.append(f"第{i}个24小时: ¥{raw:.2f} 超过封顶，按 ¥{charged:.2f} 计")
+        lines.append(f"费用: ¥{tariff.fee(enter_time, enter_time + seconds):.2f}")
+        return "\n".join(lines)
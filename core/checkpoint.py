@@ -0,0 +1,137 @@
+# core/checkpoint.py
+
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+# 文件头: 标识, 版本, 系统模式, 日志序号, 写入时间, 车牌数, 车牌表字节数, 停车场车辆数, 便道车辆数, 校验和
+# 文件头之后依次为车牌表（UTF-8，以 \0 分隔）与车辆记录（从 8 字节对齐处开始）
+MAGIC = b"PKCP"
+VERSION = 1
+HEADER = struct.Struct("<4sHBxQdIIIII4x")
+MODES = {"single": 0, "dual": 1}
+MODE_NAMES = {code: mode for mode, code in MODES.items()}
+# 单门系统每辆车: 车牌编号, 进入时间
+SINGLE_RECORD = struct.Struct("<I4xd")
+# 双门系统每辆车: 车牌编号, 南北侧, 车位/排队序号, 车辆进入时间, 进入停车场/便道的时间
+DUAL_RECORD = struct.Struct("<Ic3xI4xdd")
+# 记录按小端序存放，大端机器上按列读写时交换字节序
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+class CheckpointError(Exception):
+    """检查点文件格式错误或已损坏"""
+
+def write_column(values, start, step, items, typecode):
+    """把一列数值写入定长记录中的对应字段（values 为按字段类型转换的记录视图）"""
+    column = array(typecode, items)
+    if not LITTLE_ENDIAN:
+        column.byteswap()
+    values[start::step] = column
+
+def read_column(values, start, step):
+    column = values[start::step]
+    if LITTLE_ENDIAN:
+        return column.tolist()
+    column = array(values.format, column)
+    column.byteswap()
+    return column.tolist()
+
+def encode_checkpoint(mode, seq, state):
+    """把停车场状态（格式同 OperationLog 的快照）编码为二进制检查点
+
+    车牌号集中存放在车牌表中（每个车牌只存一次），车辆记录为定长结构，只引用车牌编号。
+    写入与读取都按列整块处理（带步长的内存视图），不逐条打包/解析。
+    """
+    plates = {}
+    cars = state["lot"] + state["lane"]
+    indexes = [plates.setdefault(car[0], len(plates)) for car in cars]
+    text = "\0".join(plates)
+    if text.count("\0") != max(0, len(plates) - 1):
+        raise ValueError("车牌号不能包含 \\0 字符")
+    blob = text.encode("utf-8")
+    record = SINGLE_RECORD if mode == "single" else DUAL_RECORD
+    records = bytearray(record.size * len(cars))
+    step = record.size // 4
+    with memoryview(records) as rows, rows.cast("I") as words, rows.cast("d") as numbers:
+        write_column(words, 0, step, indexes, "I")
+        if mode == "single":
+            write_column(numbers, 1, 2, [car[1] for car in cars], "d")
+        else:
+            # 停车场位置为 N3 / S1，便道位置为 NQ1 / SQ1
+            rows[4::record.size] = "".join(car[1][:1] for car in cars).encode()
+            numbers_column = [int(car[1][1:]) for car in state["lot"]] + [int(car[1][2:]) for car in state["lane"]]
+            write_column(words, 2, step, numbers_column, "I")
+            write_column(numbers, 2, 4, [car[2] for car in cars], "d")
+            write_column(numbers, 3, 4, [car[3] for car in cars], "d")
+    body = b"".join([blob, bytes(-(HEADER.size + len(blob)) % 8), records])
+    header = HEADER.pack(MAGIC, VERSION, MODES[mode], seq, time.time(), len(plates), len(blob),
+                         len(state["lot"]), len(state["lane"]), zlib.crc32(body))
+    return header + body
+
+def decode_checkpoint(buffer):
+    """解码二进制检查点（bytes 或 mmap），返回 (系统模式, 日志序号, 写入时间, 状态)"""
+    if len(buffer) < HEADER.size:
+        raise CheckpointError("检查点文件不完整")
+    magic, version, mode, seq, saved_time, plate_count, blob_size, lot_count, lane_count, crc = \
+        HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise CheckpointError("不是停车场检查点文件")
+    if version != VERSION or mode not in MODE_NAMES:
+        raise CheckpointError(f"不支持的检查点版本: {version}")
+    mode = MODE_NAMES[mode]
+    record = SINGLE_RECORD if mode == "single" else DUAL_RECORD
+    blob_end = HEADER.size + blob_size
+    records_start = blob_end + (-blob_end % 8)
+    if len(buffer) != records_start + record.size * (lot_count + lane_count):
+        raise CheckpointError("检查点文件不完整")
+    with memoryview(buffer) as view:
+        if zlib.crc32(view[HEADER.size:]) != crc:
+            raise CheckpointError("检查点校验失败")
+        plates = str(view[HEADER.size:blob_end], "utf-8").split("\0") if plate_count else []
+        if len(plates) != plate_count:
+            raise CheckpointError("检查点车牌表不完整")
+        step = record.size // 4
+        with view[records_start:] as rows, rows.cast("I") as words, rows.cast("d") as numbers:
+            indexes = read_column(words, 0, step)
+            if mode == "single":
+                columns = (read_column(numbers, 1, 2),)
+            else:
+                columns = (bytes(rows[4::record.size]).decode(), read_column(words, 2, step),
+                           read_column(numbers, 2, 4), read_column(numbers, 3, 4))
+    if mode == "single":
+        cars = list(map(list, zip(map(plates.__getitem__, indexes), *columns)))
+        return mode, seq, saved_time, {"lot": cars[:lot_count], "lane": cars[lot_count:]}
+    cars = list(zip(map(plates.__getitem__, indexes), *columns))
+    lot = [[car_id, f"{side}{number}", car_time, entry_time]
+           for car_id, side, number, car_time, entry_time in cars[:lot_count]]
+    lane = [[car_id, f"{side}Q{number}", car_time, arrival_time]
+            for car_id, side, number, car_time, arrival_time in cars[lot_count:]]
+    return mode, seq, saved_time, {"lot": lot, "lane": lane}
+
+def write_checkpoint(path, mode, seq, state):
+    """写入检查点：先写临时文件并 fsync，再原子替换，返回写入的字节数"""
+    data = encode_checkpoint(mode, seq, state)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
+
+def read_checkpoint(path):
+    """以内存映射方式读取检查点，返回 (系统模式, 日志序号, 写入时间, 状态)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise CheckpointError("检查点文件不完整")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return decode_checkpoint(buffer)
+
+def is_checkpoint(path):
+    """文件是否为二进制检查点（旧版本的快照为 JSON）"""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
@@ -0,0 +1,28 @@
+# core/clock.py
+
+import time
+
+def system_clock():
+    """系统时钟，返回当前时间戳"""
+    return time.time()
+
+class VirtualClock:
+    """虚拟时钟，用于仿真与回放
+
+    与 system_clock 一样以无参调用的方式返回当前时间戳，但时间只在
+    调用 advance()/set() 时前进，因此可以比真实时间更快地回放车流。
+    """
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """时间前进指定秒数"""
+        self.now += seconds
+
+    def set(self, timestamp):
+        """将时间设置到指定时间戳（不允许倒退）"""
+        if timestamp > self.now:
+            self.now = float(timestamp)
@@ -0,0 +1,161 @@
+# core/concurrent.py
+
+import threading
+import time
+from core.parking import Car
+
+# 乐观读取失败（读取期间有写入）后的重试次数，超过后加锁读取
+READ_RETRIES = 8
+
+class LockedSystem:
+    """多闸口并发访问的同步基类
+
+    写操作（进入、离开及其补位）在同一把锁内完整执行，复合操作对其他线程
+    是原子的；临界区内只做数据结构修改，车辆对象在加锁前创建。
+
+    读操作不加锁，使用顺序锁（seqlock）方式校验：写操作开始与结束时各把
+    序号加1（写入中为奇数），读取前后序号相同且为偶数则说明读取期间没有
+    写入，结果一致；否则重试，多次失败后才加锁读取。因此状态显示等读取
+    不会阻塞写入，写入也不必为读取复制数据。
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = 0          # 写入序号，奇数表示写入进行中
+        self.cached = None    # (序号, 状态副本)
+        self.read_retries = 0  # 乐观读取失败次数（统计）
+        self.locked_reads = 0  # 退化为加锁读取的次数（统计）
+
+    def write(self, func, *args):
+        """在锁内执行写操作 func(*args)"""
+        with self.lock:
+            self.seq += 1
+            try:
+                return func(*args)
+            finally:
+                self.seq += 1
+
+    def read(self, func, *args):
+        """无锁执行只读操作 func(*args)，读取期间有写入时重试"""
+        for _ in range(READ_RETRIES):
+            seq = self.seq
+            if not seq & 1:
+                try:
+                    result = func(*args)
+                except Exception:
+                    # 读取期间结构被修改可能引发异常（如字典大小变化），序号未变时才是真正的错误
+                    if self.seq == seq:
+                        raise
+                else:
+                    if self.seq == seq:
+                        return result
+            self.read_retries += 1
+            time.sleep(0)  # 让出 CPU，等待写入完成
+        self.locked_reads += 1
+        with self.lock:
+            return func(*args)
+
+    def snapshot(self):
+        """返回一致的状态副本；没有新的写入时直接返回上一份副本"""
+        cached = self.cached
+        if cached is not None and cached[0] == self.seq:
+            return cached[1]
+        seq, state = self.read(lambda: (self.seq, self.read_state()))
+        self.cached = (seq, state)
+        return state
+
+    def read_state(self):
+        raise NotImplementedError
+
+class ConcurrentEngine(LockedSystem):
+    """单门停车场引擎（ParkingEngine）的线程安全包装
+
+    admit（进入停车场或便道）与 depart（离开、计费、写历史并补位）均为
+    原子操作，多个闸口线程可直接调用；snapshot / locate 为无锁读取。
+    """
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+
+    def admit(self, car_id):
+        """车辆到达：已存在则返回 EXISTS，否则停入停车场或进入便道（原子操作）"""
+        return self.write(self.engine.arrive, self.engine.new_car(car_id))
+
+    def admit_many(self, car_ids):
+        """批量到达，整批只加一次锁"""
+        cars = [self.engine.new_car(car_id) for car_id in car_ids]
+        return self.write(self.engine.arrive_many, cars)
+
+    def depart(self, car_id, exit_time=None):
+        """车辆离开并从便道补位（原子操作）"""
+        return self.write(self._depart, car_id, exit_time)
+
+    def _depart(self, car_id, exit_time):
+        result = self.engine.depart(car_id, exit_time)
+        if "moved_cars" in result:
+            # 树状数组引擎的让路车辆为惰性视图，离开锁后停车场可能继续变化，在锁内固化
+            result["moved_cars"] = list(result["moved_cars"])
+        return result
+
+    def depart_many(self, car_ids, exit_time=None):
+        return self.write(self._depart_many, car_ids, exit_time)
+
+    def _depart_many(self, car_ids, exit_time):
+        results, entered = self.engine.depart_many(car_ids, exit_time)
+        for result in results:
+            if "moved_cars" in result:
+                result["moved_cars"] = list(result["moved_cars"])
+        return results, entered
+
+    def locate(self, car_id):
+        """返回 ("PARKING" / "IN_SIDE_ROAD", 下标, 进入时间)，不存在时返回 None"""
+        return self.read(self._locate, car_id)
+
+    def _locate(self, car_id):
+        for area, structure in (("PARKING", self.engine.parking_lot), ("IN_SIDE_ROAD", self.engine.waiting_lane)):
+            slot = structure.locate(car_id)
+            if slot is not None:
+                return area, slot, structure.current_state()[slot][1]
+        return None
+
+    def read_state(self):
+        return {
+            "parking": list(self.engine.parking_lot.current_state()),
+            "waiting": list(self.engine.waiting_lane.current_state())
+        }
+
+class ConcurrentDualSystem(LockedSystem):
+    """双门系统（DualSystemAdapter）的线程安全包装
+
+    适配器的 enter 先检查车牌是否存在再进入，leave 离开后从便道补位，
+    两个闸口同时操作时检查与修改之间可能被打断；这里整段在锁内执行。
+    """
+    def __init__(self, adapter):
+        super().__init__()
+        self.adapter = adapter
+
+    def admit(self, car_id):
+        """车辆到达：返回 (状态, 位置, 时间)，与 DualSystemAdapter.enter 相同"""
+        return self.write(self.adapter.enter, Car(car_id, self.adapter.clock()))
+
+    def depart(self, car_id):
+        """车辆离开并补位：车辆在便道中时返回 ("IN_SIDE_ROAD", None)"""
+        return self.write(self._depart, car_id)
+
+    def _depart(self, car_id):
+        if self.adapter.waiting_lane.is_car_exists(car_id):
+            return "IN_SIDE_ROAD", None
+        return self.adapter.leave(car_id)
+
+    def optimize(self):
+        return self.write(self.adapter.optimize_system)
+
+    def locate(self, car_id):
+        """返回 (出口侧, 下标, 车位信息副本)，不存在时返回 (None, -1, None)"""
+        return self.read(self._locate, car_id)
+
+    def _locate(self, car_id):
+        side, index, spot = self.adapter.parking_lot.find_car(car_id)
+        return side, index, spot.copy() if spot else None
+
+    def read_state(self):
+        return self.adapter.get_status()
@@ -1,16 +1,52 @@
 import os
 import json
+import math
+import threading
+from array import array
+from core.analytics import HistoryAnalytics
+from core.history import (HistoryIndex, HistoryResult, HistoryWriter, JsonlHistoryStore, JsonlHistoryView,
+                          SqliteHistoryResult, SqliteHistoryStore, SqliteHistoryView, fetch_records,
+                          migrate_json_history)
+
+# 旧版本使用的 JSON 数组格式历史记录文件
+LEGACY_HISTORY_FILE = "parking_history.json"
+# 各存储格式的默认历史记录文件
+HISTORY_FILES = {
+    "jsonl": "parking_history.jsonl",
+    "sqlite": "parking_history.db",
+    "json": LEGACY_HISTORY_FILE
+}
 
 class Config:
-    def __init__(self):
+    def __init__(self, history_file="parking_history.jsonl", history_backend="jsonl"):
         self.parking_capacity = 10  # 默认停车场容量
         self.waiting_capacity = 5   # 默认便道容量
+        self.parking_engine = "stack"  # 停车场引擎: stack(栈模拟) / fenwick(树状数组) / compact(紧凑存储)
         self.billing_mode = "per_minute"
         self.fee_per_minute = 1.0
         self.fee_per_hour = 30.0
         self.fixed_fee = 50.0
-        self.history_file = "parking_history.json"
+        # 分时段计费（billing_mode 为 "tariff" 时生效）
+        self.tariff = {
+            "free_minutes": 15,                         # 免费时长（分钟）
+            "periods": [["07:00", 6.0], ["22:00", 2.0]],  # 时段起点与每小时费率
+            "daily_cap": 60.0                           # 每24小时封顶，0为不封顶
+        }
+        self.history_file = history_file  # 为None时历史记录只保存在内存中（用于仿真）
+        self.history_backend = history_backend  # 历史记录格式: jsonl(追加写入) / sqlite(数据库) / json(旧格式，整体重写)
+        self.history_flush_ms = 50  # 后台写入的最大延迟（毫秒），0 为每次离开同步写入
+        self.store = None
+        self.writer = None  # 后台写入线程，首次写入时创建
+        self.writer_lock = threading.Lock()
+        self.history_index = None  # 车牌/离开时间二级索引，首次查询时建立（sqlite 格式使用数据库索引）
+        self.history_index_file = None  # 建立索引时 JSON Lines 文件的 inode，文件被替换后重建
+        self.analytics = None  # 增量统计，首次查询时由已有历史记录建立
         self.history = self.load_history()
+        # 停车场状态操作日志（关闭窗口或崩溃后恢复在场车辆），仅内存历史记录时不启用
+        self.journal_file = "parking_journal.log" if history_file else None
+        self.journal_snapshot_every = 50000  # 每记录多少条操作生成一次快照
+        self.journal_checkpoint_interval = 20.0  # 有新操作时至少每隔多少秒生成一次快照
+        self.metrics_enabled = False  # 是否记录各操作耗时（core.metrics）
         self.enable_dual_exit = False
         self.dual_exit_settings = {
             "north_waiting_capacity": 10,
@@ -34,11 +70,110 @@ class Config:
             self.fee_per_hour = amount
         elif mode == "fixed":
             self.fixed_fee = amount
+    
+    def set_tariff(self, free_minutes, periods, daily_cap):
+        """设置分时段计费规则，periods 为 [("HH:MM", 每小时费率), ...]"""
+        self.billing_mode = "tariff"
+        self.tariff = {
+            "free_minutes": free_minutes,
+            "periods": [[start, rate] for start, rate in periods],
+            "daily_cap": daily_cap
+        }
 
      
+    def history_store(self):
+        """返回当前格式对应的历史记录存储（jsonl / sqlite）"""
+        store_class = SqliteHistoryStore if self.history_backend == "sqlite" else JsonlHistoryStore
+        if not isinstance(self.store, store_class) or self.store.path != self.history_file:
+            if isinstance(self.store, SqliteHistoryStore):
+                self.store.close()
+            self.store = store_class(self.history_file)
+        return self.store
+    
+    def history_writer(self):
+        """返回后台写入线程（按需创建，使用独立的存储实例）"""
+        with self.writer_lock:
+            if self.writer is None:
+                store = type(self.history_store())(self.history_file)
+                self.writer = HistoryWriter(store, max_latency=self.history_flush_ms / 1000.0)
+            return self.writer
+    
+    def flush_history(self, timeout=None):
+        """等待后台写入线程写完已提交的记录，返回是否全部写入成功"""
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout)
+    
+    def close_history(self):
+        """写完剩余记录并关闭后台写入线程（返回主菜单、退出程序时调用），返回是否全部写入成功"""
+        with self.writer_lock:
+            writer, self.writer = self.writer, None
+        if writer is None:
+            return True
+        return writer.close()
+    
+    def history_stats(self):
+        """返回后台写入的计数器（队列深度、提交耗时等），未启用时返回 None"""
+        return self.writer.get_stats() if self.writer else None
+    
+    def set_history_flush_ms(self, flush_ms):
+        """设置后台写入的最大延迟（毫秒），0 为同步写入"""
+        if flush_ms != self.history_flush_ms:
+            self.close_history()
+            self.history_flush_ms = flush_ms
+    
+    def set_history_backend(self, backend):
+        """切换历史记录存储格式并重新加载（使用默认文件时一并切换文件）"""
+        if backend == self.history_backend:
+            return
+        self.close_history()
+        if self.history_file == HISTORY_FILES.get(self.history_backend):
+            self.history_file = HISTORY_FILES.get(backend, self.history_file)
+        self.history_backend = backend
+        self.history = self.load_history()
+    
+    def import_existing_history(self, store):
+        """新建数据库时导入已有的 JSON Lines 或旧 JSON 格式历史记录"""
+        try:
+            if os.path.exists(HISTORY_FILES["jsonl"]):
+                store.append(JsonlHistoryStore(HISTORY_FILES["jsonl"]).iter_records())
+            elif os.path.exists(LEGACY_HISTORY_FILE):
+                with open(LEGACY_HISTORY_FILE, 'r', encoding='utf-8') as f:
+                    store.append(json.load(f))
+        except Exception as e:
+            print(f"导入历史记录失败: {str(e)}")
+    
     def load_history(self):
-        """加载停车历史记录"""
-        if not os.path.exists(self.history_file):
+        """加载停车历史记录
+
+        jsonl / sqlite 格式返回按需分页读取的只读视图，启动和登录时不读取任何记录；
+        旧 json 格式与仅内存模式返回记录列表。重新加载后二级索引与统计在下次查询时重建。
+        """
+        self.history_index = None
+        self.analytics = None
+        if self.history_file and self.history_backend == "sqlite":
+            is_new = not os.path.exists(self.history_file)
+            store = self.history_store()
+            if is_new:
+                self.import_existing_history(store)
+            return SqliteHistoryView(store)
+        
+        if self.history_file and self.history_backend == "jsonl":
+            store = self.history_store()
+            # 首次使用追加格式时，从旧的 JSON 数组文件迁移
+            if not store.exists() and os.path.exists(LEGACY_HISTORY_FILE):
+                try:
+                    migrate_json_history(LEGACY_HISTORY_FILE, self.history_file)
+                except Exception as e:
+                    print(f"迁移历史记录失败: {str(e)}")
+            try:
+                # 先补齐上次中断留下的半行，保证索引中的记录下标与之后追加的行一致
+                store.check_tail()
+            except OSError:
+                pass
+            return JsonlHistoryView(store)
+        
+        if not self.history_file or not os.path.exists(self.history_file):
             return []
         
         try:
@@ -49,6 +184,15 @@ class Config:
     
     def save_history(self):
         """保存停车历史记录"""
+        if not self.history_file or not isinstance(self.history, list):
+            # jsonl / sqlite 视图每次追加即已写入
+            return True
+        if self.history_backend == "jsonl":
+            try:
+                self.history_store().rewrite(self.history)
+                return True
+            except Exception:
+                return False
         try:
             with open(self.history_file, 'w', encoding='utf-8') as f:
                 json.dump(self.history, f, ensure_ascii=False, indent=2)
@@ -58,18 +202,195 @@ class Config:
     
     def add_history(self, car_id, enter_time, exit_time, fee):
         """添加停车记录"""
-        self.history.append({
-            "car_id": car_id,
-            "enter_time": enter_time,
-            "exit_time": exit_time,
-            "fee": fee
-        })
-        self.save_history()
+        self.add_history_many([(car_id, enter_time, exit_time, fee)])
+    
+    def add_history_many(self, records):
+        """批量添加停车记录，records 为 (车牌号, 进入时间, 离开时间, 费用) 列表，只保存一次"""
+        new_records = [
+            {
+                "car_id": car_id,
+                "enter_time": enter_time,
+                "exit_time": exit_time,
+                "fee": fee
+            }
+            for car_id, enter_time, exit_time, fee in records
+        ]
+        if isinstance(self.history, list):
+            self.history.extend(new_records)
+        if self.history_index is not None:
+            for record in new_records:
+                self.history_index.add(record)
+        if self.analytics is not None:
+            self.analytics.add_many(new_records)
+        return self.persist_history(new_records)
+    
+    def persist_history(self, new_records):
+        """持久化新增的记录：jsonl/sqlite 只写新增记录，旧格式重写整个文件
+
+        jsonl/sqlite 格式在 history_flush_ms 大于0时交给后台写入线程，调用方不等待磁盘。
+        """
+        if not self.history_file:
+            return True
+        if self.history_backend in ("jsonl", "sqlite"):
+            if self.history_flush_ms > 0:
+                self.history_writer().submit(new_records)
+                return True
+            try:
+                self.history_store().append(new_records)
+                return True
+            except Exception:
+                return False
+        return self.save_history()
     
     def clear_history(self):
         """清空停车历史记录"""
-        self.history = []
-        self.save_history()
+        if self.history_file and self.history_backend in ("jsonl", "sqlite"):
+            self.flush_history()
+            self.history_store().clear()
+        else:
+            self.history = []
+            self.save_history()
+        self.history_index = None if self.history_backend == "sqlite" else HistoryIndex()
+        self.analytics = HistoryAnalytics()
+    
+    def query_history(self, plate_prefix=None, start=None, end=None, sort="ordinal", descending=True, car_id=None):
+        """按索引字段筛选与排序历史记录，返回可按页读取的结果（len() 与 page(偏移, 行数)）
+
+        car_id 为完整车牌号，plate_prefix 为车牌号前缀，[start, end) 为离开时间范围，
+        各条件同时生效；sort 取值 ordinal（写入顺序）/ car_id（车牌号）/ exit_time（离开时间）。
+        sqlite 格式交给数据库索引；其余格式使用内存二级索引，只有筛选或
+        非写入顺序排序时才建立索引，结果只保存记录下标，不读取记录。
+        """
+        self.flush_history()
+        if self.history_file and self.history_backend == "sqlite":
+            conditions, params = [], []
+            if car_id is not None:
+                conditions.append("car_id = ?")
+                params.append(car_id)
+            if plate_prefix:
+                # 前缀匹配写成范围条件，可以使用车牌号索引
+                conditions.append("car_id >= ? AND car_id < ?")
+                params += [plate_prefix, plate_prefix + "\uffff"]
+            if start is not None:
+                conditions.append("exit_time >= ?")
+                params.append(start)
+            if end is not None:
+                conditions.append("exit_time < ?")
+                params.append(end)
+            where = "WHERE " + " AND ".join(conditions) if conditions else ""
+            order = {"ordinal": "id", "car_id": "car_id, id", "exit_time": "exit_time, id"}[sort]
+            if descending:
+                order = ", ".join(column + " DESC" for column in order.split(", "))
+            return SqliteHistoryResult(self.history_store(), where, params, order)
+        
+        if car_id is None and not plate_prefix and start is None and end is None:
+            if sort == "ordinal":
+                return HistoryResult(self.history, range(len(self.history)), descending)
+            index = self.get_history_index()
+            ordinals = index.exit_order if sort == "exit_time" else index.ordered_by_plate()
+            return HistoryResult(self.history, ordinals, descending)
+        
+        index = self.get_history_index()
+        if car_id is not None:
+            matches_prefix = not plate_prefix or car_id.startswith(plate_prefix)
+            ordinals = index.by_plate(car_id) if matches_prefix else array('q')
+        elif plate_prefix:
+            ordinals = index.by_plate_prefix(plate_prefix)
+        else:
+            ordinals = None
+        if start is not None or end is not None:
+            exited = index.exited_between(-math.inf if start is None else start,
+                                          math.inf if end is None else end)
+            if ordinals is None:
+                ordinals = exited
+            else:
+                matched = set(ordinals)
+                ordinals = array('q', filter(matched.__contains__, exited))
+        # 按所需顺序排列筛选结果
+        if sort == "ordinal":
+            ordinals = array('q', sorted(ordinals))
+        elif sort == "exit_time" and (start is None and end is None):
+            matched = set(ordinals)
+            ordinals = array('q', filter(matched.__contains__, index.exit_order))
+        elif sort == "car_id":
+            matched = set(ordinals)
+            ordinals = array('q', filter(matched.__contains__, index.ordered_by_plate()))
+        return HistoryResult(self.history, ordinals, descending)
+    
+    def history_snapshot(self):
+        """返回可在其他线程中遍历的历史记录序列（用于后台导出等）
+
+        jsonl / sqlite 格式返回独立打开的只读视图，内存列表返回副本；先等待后台写入完成。
+        """
+        self.flush_history()
+        if self.history_file and self.history_backend == "sqlite":
+            return SqliteHistoryView(SqliteHistoryStore(self.history_file))
+        if isinstance(self.history, JsonlHistoryView):
+            return JsonlHistoryView(JsonlHistoryStore(self.history_file))
+        return list(self.history)
+    
+    def history_reader(self):
+        """返回在其他线程中查询历史记录用的只读 Config，内存或旧 json 格式返回 None
+
+        只读副本使用独立打开的 JSON Lines 视图或数据库连接与自己的二级索引，
+        查询（query_history / find_history）不触及本对象的视图与索引，
+        可以与本对象的写入同时进行；副本自身从不写入文件。
+        """
+        if not self.history_file or self.history_backend not in ("jsonl", "sqlite"):
+            return None
+        reader = Config(history_file=None)
+        reader.history_file = self.history_file
+        reader.history_backend = self.history_backend
+        store = reader.history_store()
+        reader.history = SqliteHistoryView(store) if self.history_backend == "sqlite" else JsonlHistoryView(store)
+        return reader
+    
+    def get_history_index(self):
+        """返回历史记录二级索引
+
+        尚未建立时遍历一次历史记录建立，之后随写入增量更新；记录数多于索引
+        （其他写入方追加了记录，如只读副本）时只索引新增的记录，记录数少于
+        索引或文件被替换（清空等）时重建。
+        """
+        history = self.history
+        size = len(history)
+        file_id = history.file_id if isinstance(history, JsonlHistoryView) else None
+        index = self.history_index
+        if index is None or index.size > size or file_id != self.history_index_file:
+            items = history.enumerate_records() if isinstance(history, JsonlHistoryView) else enumerate(history)
+            self.history_index = HistoryIndex.build(items, size)
+            self.history_index_file = file_id
+        elif index.size < size:
+            if isinstance(history, JsonlHistoryView):
+                index.extend(history.enumerate_records(index.size), size)
+            else:
+                index.extend(enumerate(history[index.size:], index.size), size)
+        return self.history_index
+    
+    def get_analytics(self):
+        """返回历史记录增量统计，尚未建立时由已有历史记录一次性建立，之后随写入增量更新"""
+        if self.analytics is None:
+            self.flush_history()
+            self.analytics = HistoryAnalytics.build(self.history)
+        return self.analytics
+    
+    def find_history(self, car_id):
+        """查询指定车牌号的全部历史记录（按写入顺序）"""
+        self.flush_history()
+        if self.history_file and self.history_backend == "sqlite":
+            return self.history_store().find_by_car(car_id)
+        return fetch_records(self.history, self.get_history_index().by_plate(car_id))
+    
+    def history_between(self, start, end, field="exit_time"):
+        """查询 field（enter_time / exit_time）在 [start, end) 内的历史记录，按该时间升序"""
+        self.flush_history()
+        if self.history_file and self.history_backend == "sqlite":
+            return self.history_store().between(start, end, field)
+        if field == "exit_time":
+            return fetch_records(self.history, self.get_history_index().exited_between(start, end))
+        records = [record for record in self.history if start <= record[field] < end]
+        records.sort(key=lambda record: record[field])
+        return records
 
     
     def save_to_file(self, filename="config.json"):
@@ -77,11 +398,19 @@ class Config:
         config_data = {
             "parking_capacity": self.parking_capacity,
             "waiting_capacity": self.waiting_capacity,
+            "parking_engine": self.parking_engine,
             "billing_mode": self.billing_mode,
             "fee_per_minute": self.fee_per_minute,
             "fee_per_hour": self.fee_per_hour,
             "fixed_fee": self.fixed_fee,
+            "tariff": self.tariff,
             "enable_dual_exit": self.enable_dual_exit,
+            "history_backend": self.history_backend,
+            "history_flush_ms": self.history_flush_ms,
+            "journal_file": self.journal_file,
+            "journal_snapshot_every": self.journal_snapshot_every,
+            "journal_checkpoint_interval": self.journal_checkpoint_interval,
+            "metrics_enabled": self.metrics_enabled,
             "dual_exit_settings": self.dual_exit_settings
         }
         
@@ -105,11 +434,20 @@ class Config:
             # 更新配置
             self.parking_capacity = config_data.get("parking_capacity", 10)
             self.waiting_capacity = config_data.get("waiting_capacity", 5)
+            self.parking_engine = config_data.get("parking_engine", "stack")
             self.billing_mode = config_data.get("billing_mode", "per_minute")
             self.fee_per_minute = config_data.get("fee_per_minute", 1.0)
             self.fee_per_hour = config_data.get("fee_per_hour", 30.0)
             self.fixed_fee = config_data.get("fixed_fee", 50.0)
+            self.tariff = config_data.get("tariff", self.tariff)
             self.enable_dual_exit = config_data.get("enable_dual_exit", False)
+            self.set_history_backend(config_data.get("history_backend", self.history_backend))
+            self.set_history_flush_ms(config_data.get("history_flush_ms", self.history_flush_ms))
+            self.journal_file = config_data.get("journal_file", self.journal_file)
+            self.journal_snapshot_every = config_data.get("journal_snapshot_every", self.journal_snapshot_every)
+            self.journal_checkpoint_interval = config_data.get("journal_checkpoint_interval",
+                                                               self.journal_checkpoint_interval)
+            self.metrics_enabled = config_data.get("metrics_enabled", self.metrics_enabled)
             self.dual_exit_settings = config_data.get("dual_exit_settings", {
                 "north_waiting_capacity": 10,
                 "south_waiting_capacity": 10,
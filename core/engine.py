@@ -0,0 +1,124 @@
+# core/engine.py
+
+from core.clock import system_clock
+from core.parking import Car, create_parking_lot, create_waiting_lane
+from core.billing import Billing
+from core.events import EventBus
+
+class ParkingEngine:
+    """单门停车场引擎：组合停车场、便道与计费，不依赖界面"""
+    def __init__(self, config, parking_lot=None, waiting_lane=None, billing=None, clock=None, events=None):
+        self.config = config
+        self.clock = clock or system_clock  # 时钟，可注入虚拟时钟用于仿真
+        if parking_lot is None:
+            parking_lot = create_parking_lot(config.parking_capacity, config.parking_engine)
+        if waiting_lane is None:
+            waiting_lane = create_waiting_lane(config.waiting_capacity, config.parking_engine)
+        self.parking_lot = parking_lot
+        self.waiting_lane = waiting_lane
+        self.billing = billing or Billing(config, self.clock)
+        # 停车场与便道的变化通知，界面、导出与统计可订阅后只在真正变化时响应
+        self.events = events or EventBus()
+        parking_lot.attach(self.events)
+        waiting_lane.attach(self.events)
+
+    def is_car_exists(self, car_id):
+        """检查车牌号是否已存在（停车场或便道）"""
+        return self.parking_lot.contains(car_id) or self.waiting_lane.contains(car_id)
+
+    def new_car(self, car_id):
+        """按引擎时钟创建到达车辆"""
+        return Car(car_id, self.clock())
+
+    def arrive(self, car: Car):
+        """车辆到达：优先停入停车场，已满则进入便道
+
+        返回结果字典，status 取值:
+        PARKED（停入停车场）/ IN_SIDE_ROAD（便道等待）/ EXISTS（车牌已存在）/ REJECTED（均已满）
+        """
+        result = {"car_id": car.car_id, "car": car, "position": None}
+        if self.is_car_exists(car.car_id):
+            result["status"] = "EXISTS"
+        elif self.parking_lot.arrive(car):
+            result["status"] = "PARKED"
+            result["position"] = len(self.parking_lot.stack)
+        elif self.waiting_lane.enqueue(car):
+            result["status"] = "IN_SIDE_ROAD"
+            result["position"] = len(self.waiting_lane.queue)
+        else:
+            result["status"] = "REJECTED"
+        return result
+
+    def arrive_many(self, cars):
+        """批量到达，按顺序处理，返回每辆车的结果列表"""
+        return [self.arrive(car) for car in cars]
+
+    def _depart(self, car_id, exit_time):
+        """车辆离开停车场并计费，不补位、不写历史"""
+        result = {"car_id": car_id}
+        if self.waiting_lane.contains(car_id):
+            result["status"] = "IN_SIDE_ROAD"
+            return result
+
+        car, moved_cars = self.parking_lot.depart(car_id)
+        if not car:
+            result["status"] = "NOT_FOUND"
+            return result
+
+        duration = exit_time - car.enter_time
+        result.update({
+            "status": "SUCCESS",
+            "car": car,
+            "enter_time": car.enter_time,
+            "exit_time": exit_time,
+            "duration": duration,
+            "fee": self.billing.calculate_fee(duration, car.enter_time),
+            "moved_cars": moved_cars
+        })
+        return result
+
+    def refill(self, enter_time):
+        """从便道依次补位直到停车场满或便道空，返回 [(车辆, 车位)]"""
+        entered = []
+        while not self.parking_lot.is_full():
+            next_car = self.waiting_lane.dequeue()
+            if not next_car:
+                break
+            # 车辆从便道进入停车场时开始计费
+            next_car.update_enter_time(enter_time)
+            self.parking_lot.arrive(next_car)
+            entered.append((next_car, len(self.parking_lot.stack)))
+        return entered
+
+    def depart(self, car_id, exit_time=None):
+        """车辆离开：计费、写入历史并从便道补位
+
+        返回结果字典，status 取值:
+        SUCCESS（已离开）/ IN_SIDE_ROAD（车辆在便道中）/ NOT_FOUND（未找到）；
+        成功时包含 fee、duration、moved_cars（让路车辆）和 entered（补位车辆）。
+        """
+        if exit_time is None:
+            exit_time = self.clock()
+        result = self._depart(car_id, exit_time)
+        if result["status"] == "SUCCESS":
+            self.config.add_history(car_id, result["enter_time"], exit_time, result["fee"])
+            result["entered"] = self.refill(exit_time)
+        return result
+
+    def depart_many(self, car_ids, exit_time=None):
+        """批量离开：依次离开所有车辆，最后一次性补位并写入历史
+
+        与逐辆调用 depart 不同，补位在整批离开之后进行，因此本批次中
+        后离开的车辆不会因刚补入的车辆而多出让路车辆。
+        返回 (每辆车的结果列表, 补位车辆列表)。
+        """
+        if exit_time is None:
+            exit_time = self.clock()
+        results = [self._depart(car_id, exit_time) for car_id in car_ids]
+        records = [
+            (r["car_id"], r["enter_time"], exit_time, r["fee"])
+            for r in results if r["status"] == "SUCCESS"
+        ]
+        if records:
+            self.config.add_history_many(records)
+        return results, self.refill(exit_time)
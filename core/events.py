@@ -0,0 +1,78 @@
+# core/events.py
+
+import threading
+
+# 事件类型
+ARRIVE = "ARRIVE"  # 车辆进入停车场或便道
+DEPART = "DEPART"  # 车辆离开停车场或便道（离开、补位出队）
+MOVE = "MOVE"      # 车辆在停车场内换位（如双门系统的负载均衡）
+
+class Event:
+    """一次状态变化
+
+    source 为发生变化的数据结构，version 为其变化后的版本号，
+    position 为相关车位或排队位置（没有时为 None）。
+    """
+    __slots__ = ("kind", "source", "version", "car_id", "position")
+
+    def __init__(self, kind, source, version, car_id, position=None):
+        self.kind = kind
+        self.source = source
+        self.version = version
+        self.car_id = car_id
+        self.position = position
+
+    def __repr__(self):
+        return f"Event({self.kind}, {self.car_id}, v{self.version}, {self.position})"
+
+class EventBus:
+    """变化通知总线
+
+    数据结构发生变化时发布 Event，订阅者按事件类型过滤后同步收到通知。
+    订阅者在发布者的线程中被调用，应只做轻量工作（如标记需要刷新），
+    界面订阅者需自行切换到界面线程。单个订阅者出错不影响其他订阅者。
+    """
+    def __init__(self):
+        self.subscribers = ()  # (回调, 事件类型集合或None)，发布时无需加锁遍历
+        self.lock = threading.Lock()
+        self.version = 0       # 总线上已发布的事件数
+
+    def subscribe(self, callback, kinds=None):
+        """订阅事件，kinds 为关心的事件类型（默认全部），返回 callback 便于取消"""
+        with self.lock:
+            self.subscribers += ((callback, frozenset(kinds) if kinds else None),)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s[0] != callback)
+
+    def publish(self, event):
+        self.version += 1
+        for callback, kinds in self.subscribers:
+            if kinds is None or event.kind in kinds:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"事件处理失败 {event}: {e}")
+
+class Observable:
+    """带版本号与变化通知的数据结构基类
+
+    每次变化版本号加1，读取方比较版本号即可判断内容是否变化；
+    attach() 到总线后，变化同时作为事件发布；未连接总线或总线没有订阅者时
+    只增加版本号，不创建事件对象。
+    """
+    version = 0
+    bus = None
+
+    def attach(self, bus):
+        """连接到事件总线（None 表示断开）"""
+        self.bus = bus
+        return self
+
+    def notify(self, kind, car_id, position=None):
+        self.version += 1
+        bus = self.bus
+        if bus is not None and bus.subscribers:
+            bus.publish(Event(kind, self, self.version, car_id, position))
@@ -0,0 +1,220 @@
+# core/export.py
+
+import argparse
+import csv
+import gzip
+import os
+import threading
+import time
+from itertools import islice
+
+from utils.time_utils import TimestampFormatter
+
+EXPORT_HEADER = ["类型", "车牌号", "进入时间", "停留时长", "状态", "费用"]
+# 每块导出的行数
+CHUNK_ROWS = 5000
+
+class ExportCancelled(Exception):
+    """导出被取消"""
+
+def export_chunks(parking_state, waiting_state, history, billing, now, chunk_rows=CHUNK_ROWS, on_skip=None):
+    """生成导出数据，每次产生一块行
+
+    parking_state / waiting_state 为 (车牌号, 进入时间) 序列（应为快照），
+    history 为支持 len() 与切片的历史记录序列。三部分都按 chunk_rows 行分块，
+    所有行使用同一个导出时刻 now，费用与时长按块批量计算。历史记录中损坏的行
+    （JSON Lines 视图切片中的 None）不导出，在产生该块之前以跳过的行数调用 on_skip。
+    """
+    format_time = TimestampFormatter()
+
+    # 停车场数据，按块批量计算费用与时长
+    parking_state = iter(parking_state)
+    while True:
+        chunk = list(islice(parking_state, chunk_rows))
+        if not chunk:
+            break
+        enter_times = [enter_time for _, enter_time in chunk]
+        fees, durations = billing.calculate_fees([now - enter_time for enter_time in enter_times], enter_times)
+        yield [
+            ["停车场", car_id, format_time(enter_time), formatted, "停放中", f"{fee:.2f}"]
+            for (car_id, enter_time), formatted, fee in zip(chunk, durations, fees)
+        ]
+
+    # 便道数据，按块格式化时长
+    waiting_state = iter(waiting_state)
+    while True:
+        chunk = list(islice(waiting_state, chunk_rows))
+        if not chunk:
+            break
+        durations = billing.format_durations([now - enter_time for _, enter_time in chunk])
+        yield [
+            ["便道", car_id, format_time(enter_time), formatted, "等待中", "0.00"]
+            for (car_id, enter_time), formatted in zip(chunk, durations)
+        ]
+
+    # 历史数据，按块读取（导出开始时的记录数）
+    for start in range(0, len(history), chunk_rows):
+        records = history[start:start + chunk_rows]
+        chunk = [r for r in records if r is not None]
+        if on_skip and len(chunk) < len(records):
+            on_skip(len(records) - len(chunk))
+        if not chunk:
+            continue
+        durations = billing.format_durations([r["exit_time"] - r["enter_time"] for r in chunk])
+        yield [
+            ["历史记录", r["car_id"], format_time(r["enter_time"]), formatted, "已完成", f"{r['fee']:.2f}"]
+            for r, formatted in zip(chunk, durations)
+        ]
+
+def open_output(path, compress=None):
+    """打开导出文件，compress 为 None 时按扩展名 .gz 决定是否 gzip 压缩"""
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+def write_csv(path, chunks, total=None, compress=None, progress=None, cancel_event=None):
+    """逐块写入 CSV，返回写入的数据行数
+
+    先写入 path + ".part"，完成后原子替换为目标文件；progress(已写行数, 总行数)
+    在每块写入后调用；cancel_event 被设置时删除未完成的文件并抛出 ExportCancelled。
+    """
+    temp_path = path + ".part"
+    rows = 0
+    try:
+        with open_output(temp_path, compress if compress is not None else path.endswith(".gz")) as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_HEADER)
+            for chunk in chunks:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ExportCancelled()
+                writer.writerows(chunk)
+                rows += len(chunk)
+                if progress:
+                    progress(rows, total)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return rows
+
+def export_csv(path, parking_state, waiting_state, history, billing, now=None,
+               compress=None, progress=None, cancel_event=None, on_skip=None):
+    """导出停车场、便道与历史记录到 CSV（可 gzip），返回写入的数据行数
+
+    progress(已写行数, 总行数) 中的总行数不含已跳过的损坏历史记录行，导出完成时
+    两者相等；on_skip(行数) 在跳过损坏的行时调用。
+    """
+    if now is None:
+        now = time.time()
+    total = len(parking_state) + len(waiting_state) + len(history)
+
+    def skip(count):
+        nonlocal total
+        total -= count
+        if on_skip:
+            on_skip(count)
+
+    def report(rows, _):
+        progress(rows, total)
+
+    chunks = export_chunks(parking_state, waiting_state, history, billing, now, on_skip=skip)
+    return write_csv(path, chunks, total, compress, report if progress else None, cancel_event)
+
+class ExportJob:
+    """在后台线程中运行 export_csv
+
+    status 取值: RUNNING / DONE / CANCELLED / FAILED；rows、total 为当前进度，
+    skipped 为跳过的损坏历史记录行数，界面线程可轮询读取，不在后台线程中操作界面。
+    """
+    def __init__(self, path, parking_state, waiting_state, history, billing, now=None, compress=None):
+        self.path = path
+        self.args = (path, parking_state, waiting_state, history, billing, now, compress)
+        self.cancel_event = threading.Event()
+        self.status = "RUNNING"
+        self.rows = 0
+        self.total = None
+        self.skipped = 0
+        self.error = None
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.thread = threading.Thread(target=self.run, name="csv-export", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+        return self.status
+
+    def update(self, rows, total):
+        self.rows = rows
+        self.total = total
+
+    def skip(self, count):
+        self.skipped += count
+
+    def run(self):
+        try:
+            self.rows = export_csv(*self.args, progress=self.update, cancel_event=self.cancel_event,
+                                   on_skip=self.skip)
+            self.status = "DONE"
+        except ExportCancelled:
+            self.status = "CANCELLED"
+        except Exception as e:
+            self.error = e
+            self.status = "FAILED"
+        self.elapsed = time.perf_counter() - self.started
+
+def main(argv=None):
+    """无界面导出历史记录（用于定时任务），例如:
+        python -m core.export parking_history.csv.gz --since-hours 24
+    """
+    from core.billing import Billing
+    from core.config import Config
+
+    parser = argparse.ArgumentParser(description="导出停车历史记录到 CSV")
+    parser.add_argument("output", help="输出文件，扩展名为 .gz 时自动 gzip 压缩")
+    parser.add_argument("--config", default=None, help="配置文件（config.json），用于计费与历史记录格式")
+    parser.add_argument("--history-file", default=None, help="历史记录文件，默认使用配置中的文件")
+    parser.add_argument("--backend", choices=["jsonl", "sqlite", "json"], default=None, help="历史记录格式")
+    parser.add_argument("--since-hours", type=float, default=None, help="只导出最近 N 小时内离开的记录")
+    parser.add_argument("--gzip", action="store_true", help="强制 gzip 压缩")
+    args = parser.parse_args(argv)
+
+    config = Config()
+    if args.config:
+        config.load_from_file(args.config)
+    if args.backend:
+        config.set_history_backend(args.backend)
+    if args.history_file:
+        config.history_file = args.history_file
+        config.history = config.load_history()
+
+    now = time.time()
+    history = config.history
+    if args.since_hours is not None:
+        history = config.history_between(now - args.since_hours * 3600, now + 1)
+
+    def report(rows, total):
+        print(f"\r已导出 {rows}/{total} 行", end="", flush=True)
+
+    skipped = []
+    start = time.perf_counter()
+    rows = export_csv(args.output, [], [], history, Billing(config), now,
+                      compress=True if args.gzip else None, progress=report, on_skip=skipped.append)
+    print(f"\n导出完成: {args.output}，{rows} 行，用时 {time.perf_counter() - start:.2f} 秒")
+    if skipped:
+        print(f"跳过 {sum(skipped)} 行损坏的历史记录")
+    config.close_history()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,712 @@
+# core/history.py
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, compress, islice, repeat
+from operator import add
+
+# 流式读取时每批解析的行数
+LOAD_BATCH_LINES = 4096
+# 建立行偏移索引时每次读取的字节数
+INDEX_CHUNK_BYTES = 1 << 20
+# 倒序读取时每次读取的字节数
+REVERSE_CHUNK_BYTES = 1 << 16
+
+class JsonlHistoryStore:
+    """追加写入的历史记录文件（JSON Lines，每行一条记录）
+
+    每次离开只追加一行，耗时与历史记录总数无关；加载时逐行流式读取，
+    损坏的行（例如写入中途断电留下的半行）会被跳过。
+    """
+    def __init__(self, path):
+        self.path = path
+        self.tail_checked = False
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def iter_records(self):
+        """逐条读取历史记录
+
+        按批读取若干行并一次性解析，某批中有损坏的行时再逐行解析该批。
+        """
+        if not self.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            while True:
+                batch = list(islice(f, LOAD_BATCH_LINES))
+                if not batch:
+                    break
+                lines = [line for line in batch if line.strip()]
+                if lines:
+                    yield from parse_lines(lines)
+
+    def load(self):
+        """加载全部历史记录"""
+        return list(self.iter_records())
+
+    def check_tail(self):
+        """首次追加前检查文件末尾，若上次写入中断留下半行则补上换行，避免与新记录粘连"""
+        self.tail_checked = True
+        if not self.exists() or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def append(self, records, sync=False):
+        """追加若干条记录，sync 为 True 时写入后 fsync 落盘
+
+        写入或 fsync 中途失败时把文件截回写入前的长度再抛出异常，
+        调用方重试整批记录时不会重复写入已写出的行。
+        """
+        if not self.tail_checked:
+            self.check_tail()
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            start = os.lseek(fd, 0, os.SEEK_END)
+            try:
+                remaining = memoryview(data)
+                while remaining:
+                    remaining = remaining[os.write(fd, remaining):]
+                if sync:
+                    os.fsync(fd)
+            except OSError:
+                os.ftruncate(fd, start)
+                raise
+        finally:
+            os.close(fd)
+
+    def rewrite(self, records):
+        """用给定记录重写整个文件（先写临时文件再原子替换）"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        """清空全部记录"""
+        self.rewrite([])
+
+def parse_lines(lines):
+    """一次性解析若干行 JSON，有损坏的行时逐行解析并跳过损坏的行"""
+    try:
+        return json.loads("[" + ",".join(lines) + "]")
+    except ValueError:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+def parse_lines_aligned(lines):
+    """一次性解析若干行 JSON，返回与行一一对应的列表，损坏的行对应 None
+
+    损坏的半行与下一行拼接后可能恰好仍是合法 JSON，因此整体解析的条数
+    与行数不一致时也逐行解析。
+    """
+    try:
+        records = json.loads("[" + ",".join(lines) + "]")
+        if len(records) == len(lines):
+            return records
+    except ValueError:
+        pass
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            records.append(None)
+    return records
+
+class JsonlHistoryView:
+    """JSON Lines 历史记录的只读分页序列视图
+
+    提供与列表相同的 len()/遍历/reversed()/下标与切片访问。创建时不读取文件；
+    倒序遍历从文件末尾按块读取，只读取并解析实际遍历到的最近若干条记录；
+    len() 与下标访问首次使用时扫描一遍字节建立行偏移索引（不解析 JSON），
+    之后只读取所访问的那一页。文件追加新记录后索引增量更新，文件被重写
+    （清空等）后重新建立索引。损坏的行（如断电留下的半行）计入长度并保留
+    下标：下标与切片访问在该位置返回 None，使其后各记录的下标保持不变；
+    遍历（正序与倒序）跳过损坏的行。
+    """
+    def __init__(self, store, page_size=LOAD_BATCH_LINES):
+        self.store = store
+        self.page_size = page_size
+        self.offsets = array('q')  # 每条记录所在行的起始字节偏移
+        self.indexed_size = 0      # 已建立索引的字节数（总在行尾处）
+        self.file_id = None        # 文件 inode，文件被替换时重建索引
+
+    def sync(self):
+        """将新追加的完整行加入索引"""
+        try:
+            stat = os.stat(self.store.path)
+        except OSError:
+            stat = None
+        file_id = stat.st_ino if stat else None
+        size = stat.st_size if stat else 0
+        if file_id != self.file_id or size < self.indexed_size:
+            self.offsets = array('q')
+            self.indexed_size = 0
+            self.file_id = file_id
+        if size <= self.indexed_size:
+            return
+        with open(self.store.path, 'rb') as f:
+            f.seek(self.indexed_size)
+            pending = b""
+            while True:
+                chunk = f.read(INDEX_CHUNK_BYTES)
+                if not chunk:
+                    break
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()  # 最后一段尚未遇到换行
+                # 各行起始偏移 = 前面各行长度加换行符的累计和，空行不计入
+                starts = accumulate(map(add, map(len, lines), repeat(1)), initial=self.indexed_size)
+                self.offsets.extend(compress(starts, map(bytes.strip, lines)))
+                self.indexed_size += sum(map(len, lines)) + len(lines)
+
+    def __len__(self):
+        self.sync()
+        return len(self.offsets)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def read_lines(self, start, stop):
+        """读取下标 [start, stop) 的原始行，返回的行与下标一一对应"""
+        self.sync()
+        start, stop, _ = slice(start, stop).indices(len(self.offsets))
+        if start >= stop:
+            return []
+        end = self.offsets[stop] if stop < len(self.offsets) else self.indexed_size
+        with open(self.store.path, 'rb') as f:
+            f.seek(self.offsets[start])
+            data = f.read(end - self.offsets[start])
+        return [line.decode('utf-8', errors='replace') for line in data.split(b"\n") if line.strip()]
+
+    def page(self, start, stop):
+        """读取下标 [start, stop) 的记录，与下标一一对应，损坏的行为 None"""
+        return parse_lines_aligned(self.read_lines(start, stop))
+
+    def enumerate_records(self, first=0):
+        """从下标 first 起按顺序逐条返回 (下标, 记录)，跳过损坏的行，下标与 view[下标] 一致"""
+        stop = len(self)
+        for start in range(first, stop, self.page_size):
+            for i, record in enumerate(self.page(start, min(stop, start + self.page_size)), start):
+                if record is not None:
+                    yield i, record
+
+    def __iter__(self):
+        """按顺序逐条返回记录，跳过损坏的行"""
+        for _, record in self.enumerate_records():
+            yield record
+
+    def __reversed__(self):
+        """从文件末尾向前按块读取，只读取实际遍历到的部分，不需要行偏移索引"""
+        try:
+            position = os.path.getsize(self.store.path)
+        except OSError:
+            return
+        tail = b""            # 已读部分开头尚不完整的行
+        skip_unterminated = True  # 文件末尾换行之后的部分（空或未写完的半行）不计入
+        while position > 0:
+            size = min(REVERSE_CHUNK_BYTES, position)
+            position -= size
+            # 每块单独打开文件，遍历中途不持有文件句柄
+            with open(self.store.path, 'rb') as f:
+                f.seek(position)
+                lines = (f.read(size) + tail).split(b"\n")
+            tail = lines.pop(0) if position > 0 else b""
+            if skip_unterminated:
+                if not lines:
+                    continue
+                lines.pop()
+                skip_unterminated = False
+            lines = [line.decode('utf-8', errors='replace') for line in lines if line.strip()]
+            yield from reversed(parse_lines(lines))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return self.page(0, len(self))[i]
+            return self.page(start, stop)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("历史记录下标越界")
+        return self.page(i, i + 1)[0]
+
+def migrate_json_history(json_path, jsonl_path):
+    """将旧的 JSON 数组格式历史记录迁移为 JSON Lines 格式，返回迁移条数
+
+    原文件保持不变；目标文件先写入临时文件再原子替换，迁移中断不会留下半个文件。
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    JsonlHistoryStore(jsonl_path).rewrite(records)
+    return len(records)
+
+class HistoryIndex:
+    """历史记录的内存二级索引
+
+    plates 为车牌号 → 记录下标数组；exit_times/exit_order 为按离开时间排序的
+    离开时间与对应记录下标，用二分查找做时间范围查询。下标即记录在
+    Config.history 中的位置，新记录按写入顺序依次编号。
+    """
+    def __init__(self):
+        self.size = 0              # 已编号的记录数（含损坏而未被索引的行）
+        self.plates = {}
+        self.exit_times = array('d')
+        self.exit_order = array('q')
+        self.sorted_plates = None   # 排序后的车牌号列表，新车牌加入时失效
+        self.plate_order = None     # 按车牌号排序的记录下标，新记录加入时失效
+
+    @classmethod
+    def build(cls, items, size):
+        """由 (下标, 记录) 序列建立索引，size 为记录总数"""
+        index = cls()
+        index.size = size
+        plates = index.plates
+        exit_times = array('d')
+        ordinals = array('q')
+        for i, record in items:
+            plate_ordinals = plates.get(record["car_id"])
+            if plate_ordinals is None:
+                plate_ordinals = plates[record["car_id"]] = array('q')
+            plate_ordinals.append(i)
+            ordinals.append(i)
+            exit_times.append(record["exit_time"])
+        # 历史记录通常已按离开时间写入，排序在有序输入上接近线性
+        order = sorted(range(len(exit_times)), key=exit_times.__getitem__)
+        index.exit_times = array('d', map(exit_times.__getitem__, order))
+        index.exit_order = array('q', map(ordinals.__getitem__, order))
+        return index
+
+    def add(self, record):
+        """为新追加的记录编号并加入索引"""
+        i = self.size
+        self.size += 1
+        ordinals = self.plates.get(record["car_id"])
+        if ordinals is None:
+            ordinals = self.plates[record["car_id"]] = array('q')
+            self.sorted_plates = None
+        ordinals.append(i)
+        self.plate_order = None
+        exit_time = record["exit_time"]
+        if not self.exit_times or exit_time >= self.exit_times[-1]:
+            self.exit_times.append(exit_time)
+            self.exit_order.append(i)
+        else:
+            # 离开时间早于已有记录（如导入旧数据），插入到有序位置
+            pos = bisect_right(self.exit_times, exit_time)
+            self.exit_times.insert(pos, exit_time)
+            self.exit_order.insert(pos, i)
+
+    def extend(self, items, size):
+        """加入 (下标, 记录) 序列中新追加的记录（下标不小于当前 size），size 为新的记录总数"""
+        for i, record in items:
+            self.size = i  # 跳过的下标为损坏的行
+            self.add(record)
+        self.size = size
+
+    def by_plate(self, car_id):
+        """返回指定车牌号的记录下标（按写入顺序）"""
+        return self.plates.get(car_id, ())
+
+    def by_plate_prefix(self, prefix):
+        """返回车牌号以 prefix 开头的记录下标（按写入顺序）"""
+        if self.sorted_plates is None:
+            self.sorted_plates = sorted(self.plates)
+        plates = self.sorted_plates
+        matched = []
+        for i in range(bisect_left(plates, prefix), len(plates)):
+            if not plates[i].startswith(prefix):
+                break
+            matched.extend(self.plates[plates[i]])
+        return array('q', sorted(matched))
+
+    def exited_between(self, start, end):
+        """返回离开时间在 [start, end) 内的记录下标（按离开时间升序）"""
+        lo = bisect_left(self.exit_times, start)
+        hi = bisect_left(self.exit_times, end, lo)
+        return self.exit_order[lo:hi]
+
+    def ordered_by_plate(self):
+        """返回按车牌号（同一车牌按写入顺序）排序的全部记录下标"""
+        if self.plate_order is None:
+            if self.sorted_plates is None:
+                self.sorted_plates = sorted(self.plates)
+            order = array('q')
+            for plate in self.sorted_plates:
+                order.extend(self.plates[plate])
+            self.plate_order = order
+        return self.plate_order
+
+class HistoryResult:
+    """历史记录查询结果：按显示顺序排列的记录下标，按页读取记录
+
+    ordinals 可以是 range（不占内存）或下标数组；descending 为 True 时倒序显示。
+    range 中可能包含 JSON Lines 文件里损坏的行，读取时跳过，该页返回的行数相应减少。
+    """
+    def __init__(self, history, ordinals, descending=False):
+        self.history = history
+        self.ordinals = ordinals
+        self.descending = descending
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def page(self, offset, limit):
+        """返回第 offset 行起最多 limit 行，每行为 (记录下标, 记录)"""
+        count = len(self.ordinals)
+        if self.descending:
+            ordinals = self.ordinals[max(0, count - offset - limit):max(0, count - offset)][::-1]
+        else:
+            ordinals = self.ordinals[offset:offset + limit]
+        return [(i, record) for i, record in zip(ordinals, fetch_records(self.history, ordinals))
+                if record is not None]
+
+def fetch_records(history, ordinals):
+    """按下标读取记录，保持 ordinals 的顺序
+
+    连续的下标合并为一次切片读取，分页视图只读取涉及的行。
+    损坏的行或已不存在的下标对应 None。
+    """
+    if isinstance(history, list):
+        return [history[i] for i in ordinals]
+    found = {}
+    run_start = run_stop = None
+    for i in sorted(ordinals):
+        if i == run_stop:
+            run_stop += 1
+            continue
+        if run_start is not None:
+            found.update(zip(range(run_start, run_stop), history[run_start:run_stop]))
+        run_start, run_stop = i, i + 1
+    if run_start is not None:
+        found.update(zip(range(run_start, run_stop), history[run_start:run_stop]))
+    return [found.get(i) for i in ordinals]
+
+def row_to_record(cursor, row):
+    """将查询结果行转换为与 JSON 格式一致的记录字典"""
+    return {"car_id": row[0], "enter_time": row[1], "exit_time": row[2], "fee": row[3]}
+
+class SqliteHistoryStore:
+    """SQLite 历史记录存储
+
+    车牌号、进入时间、离开时间均建有索引，按车牌搜索和按时间范围查询
+    走索引，无需把全部记录读入内存；使用 WAL 日志模式，写入不阻塞读取。
+    """
+    COLUMNS = "car_id, enter_time, exit_time, fee"
+    INSERT = "INSERT INTO history (car_id, enter_time, exit_time, fee) VALUES (?, ?, ?, ?)"
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY,
+                car_id TEXT NOT NULL,
+                enter_time REAL NOT NULL,
+                exit_time REAL NOT NULL,
+                fee REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_car_id ON history (car_id);
+            CREATE INDEX IF NOT EXISTS idx_history_enter_time ON history (enter_time);
+            CREATE INDEX IF NOT EXISTS idx_history_exit_time ON history (exit_time);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def append(self, records, sync=False):
+        """追加若干条记录（同一条预编译语句批量执行，一个事务提交）
+
+        sync 为 True 时本次提交以 synchronous=FULL 执行，提交时 fsync 日志落盘。
+        """
+        if sync:
+            self.conn.execute("PRAGMA synchronous=FULL")
+        try:
+            with self.conn:
+                self.conn.executemany(self.INSERT, (
+                    (r["car_id"], r["enter_time"], r["exit_time"], r["fee"]) for r in records
+                ))
+        finally:
+            if sync:
+                self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def rewrite(self, records):
+        """用给定记录替换全部内容"""
+        with self.conn:
+            self.conn.execute("DELETE FROM history")
+            self.conn.executemany(self.INSERT, (
+                (r["car_id"], r["enter_time"], r["exit_time"], r["fee"]) for r in records
+            ))
+
+    def clear(self):
+        """清空全部记录"""
+        with self.conn:
+            self.conn.execute("DELETE FROM history")
+
+    def query(self, where="", params=(), order="id"):
+        """执行查询并返回记录字典游标"""
+        cursor = self.conn.cursor()
+        cursor.row_factory = row_to_record
+        return cursor.execute(f"SELECT {self.COLUMNS} FROM history {where} ORDER BY {order}", params)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM history LIMIT 1").fetchone() is None
+
+    def iter_records(self, descending=False):
+        """按写入顺序（或倒序）逐条读取"""
+        return self.query(order="id DESC" if descending else "id")
+
+    def page(self, offset, limit, descending=False):
+        """按写入顺序分页读取"""
+        order = "id DESC" if descending else "id"
+        return self.query(order=f"{order} LIMIT ? OFFSET ?", params=(limit, offset)).fetchall()
+
+    def find_by_car(self, car_id):
+        """按车牌号查询（走索引）"""
+        return self.query("WHERE car_id = ?", (car_id,)).fetchall()
+
+    def count_where(self, where="", params=()):
+        return self.conn.execute(f"SELECT COUNT(*) FROM history {where}", params).fetchone()[0]
+
+    def page_where(self, where, params, order, offset, limit):
+        """按条件分页读取，每行为 (id, 记录)"""
+        rows = self.conn.execute(
+            f"SELECT id, {self.COLUMNS} FROM history {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            tuple(params) + (limit, offset)).fetchall()
+        return [(row[0], row_to_record(None, row[1:])) for row in rows]
+
+    def between(self, start, end, field="exit_time"):
+        """查询 field 在 [start, end) 内的记录，按该时间升序（走索引）"""
+        if field not in ("enter_time", "exit_time"):
+            raise ValueError(f"不支持的时间字段: {field}")
+        return self.query(f"WHERE {field} >= ? AND {field} < ?", (start, end), order=field).fetchall()
+
+class SqliteHistoryView:
+    """SQLite 历史记录的只读序列视图
+
+    提供与列表相同的 len()/遍历/reversed()/下标访问，数据按需从数据库读取，
+    启动时不加载任何记录。
+    """
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.count()
+
+    def __bool__(self):
+        return not self.store.is_empty()
+
+    def __iter__(self):
+        return iter(self.store.iter_records())
+
+    def __reversed__(self):
+        return iter(self.store.iter_records(descending=True))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return list(self)[i]
+            return self.store.page(start, max(0, stop - start))
+        if i < 0:
+            i += len(self)
+        rows = self.store.page(i, 1) if i >= 0 else []
+        if not rows:
+            raise IndexError("历史记录下标越界")
+        return rows[0]
+
+class HistoryWriter:
+    """历史记录后台写入线程（延迟写入 + 组提交）
+
+    submit() 只把记录放入有界队列即返回，界面线程不做文件 I/O；后台线程
+    取到第一批记录后最多再等待 max_latency 秒，把期间到达的所有记录合并为
+    一次写入和一次 fsync。队列满时 submit() 阻塞，限制未落盘记录的数量。
+    写入失败的记录保留下来，与之后到达的记录一起提交；没有新记录时按退避
+    间隔（RETRY_DELAY 起每次翻倍，最长 MAX_RETRY_DELAY 秒）自动重试。
+    flush() 在写入失败时返回 False；close() 时仍未写入的记录计入
+    stats["dropped"] 并打印警告。
+    """
+    STOP = object()
+    RETRY_DELAY = 0.1
+    MAX_RETRY_DELAY = 5.0
+
+    def __init__(self, store, max_latency=0.05, max_pending=10000, max_batch=5000):
+        self.store = store
+        self.max_latency = max_latency
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.failed = []  # 写入失败、等待重试的 (提交时间, 记录) 列表
+        self.retry_delay = self.RETRY_DELAY  # 下一次自动重试前等待的秒数
+        self.lock = threading.Lock()
+        self.stats = {
+            "submitted": 0,        # 已提交记录数
+            "committed": 0,        # 已落盘记录数
+            "commits": 0,          # 组提交次数
+            "errors": 0,           # 写入失败次数
+            "dropped": 0,          # 关闭时仍未能写入而丢弃的记录数
+            "max_queue_depth": 0,  # 队列最大深度
+            "last_commit_ms": 0.0, # 最近一次写入+fsync 耗时
+            "max_commit_ms": 0.0,
+            "total_commit_ms": 0.0,
+            "max_delay_ms": 0.0    # 记录从提交到落盘的最大延迟
+        }
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="history-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, records):
+        """提交若干条记录，由后台线程写入"""
+        if self.closed:
+            raise RuntimeError("历史记录写入线程已关闭")
+        records = list(records)
+        self.queue.put((time.perf_counter(), records))
+        with self.lock:
+            self.stats["submitted"] += len(records)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queue.qsize())
+
+    def flush(self, timeout=None):
+        """等待此前提交的记录全部写入，返回是否在超时前全部写入成功"""
+        if self.closed:
+            return not self.failed
+        done = threading.Event()
+        done.ok = False  # 由后台线程在本次提交后设置
+        self.queue.put(done)
+        return done.wait(timeout) and done.ok
+
+    def close(self, timeout=None):
+        """写入剩余记录并停止后台线程（可重复调用），返回是否全部写入成功
+
+        最后一次写入仍失败时丢弃剩余记录，打印丢弃的条数并计入 stats["dropped"]。
+        """
+        if self.closed:
+            return not self.stats["dropped"]
+        self.flush(timeout)
+        self.closed = True
+        self.queue.put(self.STOP)
+        self.thread.join(timeout)
+        atexit.unregister(self.close)
+        dropped = sum(len(records) for _, records in self.failed)
+        if dropped:
+            print(f"历史记录写入线程已关闭，{dropped} 条记录未能写入")
+            with self.lock:
+                self.stats["dropped"] += dropped
+        return not dropped
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def get_stats(self):
+        """返回计数器快照，包含当前队列深度与平均提交耗时"""
+        with self.lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self.queue.qsize()
+        stats["pending_retry"] = sum(len(records) for _, records in self.failed)
+        stats["avg_commit_ms"] = stats["total_commit_ms"] / stats["commits"] if stats["commits"] else 0.0
+        return stats
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.retry_delay if self.failed else None)
+            except queue.Empty:
+                # 等待期间没有新记录，重试上次写入失败的记录
+                self.commit(list(self.failed))
+                continue
+            if item is self.STOP:
+                return
+            batch = list(self.failed)
+            count = sum(len(records) for _, records in batch)
+            waiters = []
+            deadline = time.perf_counter() + self.max_latency
+            # 组提交：在截止时间前尽量多取记录，遇到 flush 请求立即提交
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                if item is self.STOP:
+                    self.queue.put(item)
+                    break
+                batch.append(item)
+                count += len(item[1])
+                if count >= self.max_batch:
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self.commit(batch)
+            for waiter in waiters:
+                waiter.ok = not self.failed
+                waiter.set()
+
+    def commit(self, batch):
+        """一次写入并 fsync 一批记录"""
+        records = [record for _, chunk in batch for record in chunk]
+        start = time.perf_counter()
+        try:
+            self.store.append(records, sync=True)
+        except Exception as e:
+            print(f"历史记录写入失败，稍后重试: {str(e)}")
+            self.retry_delay = min(self.retry_delay * 2, self.MAX_RETRY_DELAY) if self.failed else self.RETRY_DELAY
+            self.failed = batch
+            with self.lock:
+                self.stats["errors"] += 1
+            return
+        end = time.perf_counter()
+        self.failed = []
+        elapsed = (end - start) * 1000
+        with self.lock:
+            stats = self.stats
+            stats["committed"] += len(records)
+            stats["commits"] += 1
+            stats["last_commit_ms"] = elapsed
+            stats["max_commit_ms"] = max(stats["max_commit_ms"], elapsed)
+            stats["total_commit_ms"] += elapsed
+            stats["max_delay_ms"] = max(stats["max_delay_ms"], (end - batch[0][0]) * 1000)
+
+class SqliteHistoryResult:
+    """SQLite 历史记录查询结果：条件与排序交给数据库（走索引），按页读取"""
+    def __init__(self, store, where="", params=(), order="id"):
+        self.store = store
+        self.where = where
+        self.params = tuple(params)
+        self.order = order
+        self.count = None
+
+    def __len__(self):
+        if self.count is None:
+            self.count = self.store.count_where(self.where, self.params)
+        return self.count
+
+    def page(self, offset, limit):
+        """返回第 offset 行起最多 limit 行，每行为 (记录序号, 记录)，记录序号从0开始"""
+        return [(row_id - 1, record) for row_id, record in
+                self.store.page_where(self.where, self.params, self.order, offset, limit)]
@@ -0,0 +1,360 @@
+# core/journal.py
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from core.checkpoint import is_checkpoint, read_checkpoint, write_checkpoint
+from core.events import ARRIVE, DEPART, MOVE
+from core.parking import Car
+
+# 默认每记录这么多条操作生成一次快照并清空日志
+SNAPSHOT_EVERY = 50_000
+# 有新操作时至少每隔这么多秒生成一次快照
+CHECKPOINT_INTERVAL = 20.0
+# 日志中的事件类型与数据结构简写
+KIND_CODES = {ARRIVE: "A", DEPART: "D", MOVE: "M"}
+LOT = "lot"
+LANE = "lane"
+
+def journal_path(base, mode="single"):
+    """按系统模式区分日志文件，双门系统使用 xxx_dual.log"""
+    if mode == "single":
+        return base
+    root, ext = os.path.splitext(base)
+    return f"{root}_{mode}{ext}"
+
+class SingleJournalTarget:
+    """单门系统的日志对象：停车场（栈）与便道（队列）
+
+    状态为 {"lot": [[车牌号, 进入时间], ...], "lane": [...]}，按停车场由北向南、
+    便道由队首到队尾的顺序排列。
+    """
+    mode = "single"
+
+    def __init__(self, engine):
+        self.lot = engine.parking_lot
+        self.lane = engine.waiting_lane
+
+    def structures(self):
+        return ((LOT, self.lot), (LANE, self.lane))
+
+    def encode(self, target, event):
+        """事件 → 重放所需的字段；进入时记录进入时间（从便道补位时为补位时间）"""
+        if event.kind == ARRIVE:
+            structure = self.lot if target == LOT else self.lane
+            return [event.car_id, structure.current_state()[event.position][1]]
+        return [event.car_id]
+
+    def replay(self, state, records):
+        """在状态上重放日志记录，返回新的状态
+
+        让路车辆离开后按原次序返回，其余车辆的相对次序不变，因此停车场可以用
+        按插入顺序排列的字典重放：进入追加到末尾、离开直接删除，每条记录 O(1)，
+        不必像真实停车场那样逐辆搬动让路车辆。
+        """
+        lot = dict(state["lot"])
+        lane = deque(state["lane"])
+        for record in records:
+            if record[2] == LOT:
+                if record[1] == "A":
+                    lot[record[3]] = record[4]
+                else:
+                    lot.pop(record[3], None)
+            elif record[1] == "A":
+                lane.append(record[3:5])
+            elif lane:
+                lane.popleft()
+        return {"lot": [[car_id, enter_time] for car_id, enter_time in lot.items()], "lane": list(lane)}
+
+    def snapshot(self):
+        return {
+            "lot": [list(row) for row in self.lot.current_state()],
+            "lane": [list(row) for row in self.lane.current_state()]
+        }
+
+    def restore(self, state):
+        """把车辆依次放回（数据结构应为空），返回容量不足未能放回的车辆数"""
+        lost = 0
+        for car_id, enter_time in state["lot"]:
+            lost += not self.lot.arrive(Car(car_id, enter_time))
+        for car_id, enter_time in state["lane"]:
+            lost += not self.lane.enqueue(Car(car_id, enter_time))
+        return lost
+
+class DualJournalTarget:
+    """双门系统的日志对象：南北两侧停车场与南北便道
+
+    状态中的每辆车为 [车牌号, 位置, 车辆进入时间, 进入停车场/便道的时间]，
+    车位与排队位置按记录原样放回，不重新选择入口。
+    """
+    mode = "dual"
+
+    def __init__(self, adapter):
+        self.lot = adapter.parking_lot
+        self.lane = adapter.waiting_lane
+
+    def structures(self):
+        return ((LOT, self.lot), (LANE, self.lane))
+
+    def encode(self, target, event):
+        if event.kind == ARRIVE:
+            if target == LOT:
+                stack = self.lot.north_stack if event.position.startswith("N") else self.lot.south_stack
+                spot = stack[int(event.position[1:]) - 1]
+                return [event.car_id, event.position, spot["car"].enter_time, spot["entry_time"]]
+            # 便道位置为 NQ1 / SQ1
+            queue = self.lane.north_queue if event.position.startswith("N") else self.lane.south_queue
+            item = queue[int(event.position[2:]) - 1]
+            return [event.car_id, event.position, item["car"].enter_time, item["arrival_time"]]
+        # 离开与换位只需车牌号和（新的）位置
+        return [event.car_id, event.position]
+
+    def replay(self, state, records):
+        """重放日志记录，返回新的状态
+
+        停车场每侧的车位号总是等于车辆在该侧栈中的序号，重放时两侧各用一个
+        按插入顺序排列的字典（离开删除、换位移到另一侧末尾），最后再统一编号。
+        """
+        north, south = {}, {}
+        queues = {"N": deque(), "S": deque()}
+        for car_id, position, car_time, entry_time in state["lot"]:
+            (north if position.startswith("N") else south)[car_id] = (car_time, entry_time)
+        for item in state["lane"]:
+            queues[item[1][0]].append(item)
+        for record in records:
+            code, target, car_id, position = record[1], record[2], record[3], record[4]
+            if target == LOT:
+                if code == "A":
+                    (north if position.startswith("N") else south)[car_id] = tuple(record[5:7])
+                else:
+                    times = north.pop(car_id, None) or south.pop(car_id, None)
+                    if code == "M" and times:
+                        (north if position.startswith("N") else south)[car_id] = times
+            elif code == "A":
+                queues[position[0]].append(record[3:7])
+            elif queues[position[0]]:
+                queues[position[0]].popleft()
+        lot = [[car_id, f"N{i + 1}", car_time, entry_time]
+               for i, (car_id, (car_time, entry_time)) in enumerate(north.items())]
+        lot += [[car_id, f"S{i + 1}", car_time, entry_time]
+                for i, (car_id, (car_time, entry_time)) in enumerate(south.items())]
+        return {"lot": lot, "lane": list(queues["N"]) + list(queues["S"])}
+
+    def snapshot(self):
+        lot, lane = self.lot, self.lane
+        return {
+            "lot": [[spot["car"].car_id, spot["position"], spot["car"].enter_time, spot["entry_time"]]
+                    for spot in lot.north_stack + lot.south_stack],
+            "lane": [[item["car"].car_id, item["position"], item["car"].enter_time, item["arrival_time"]]
+                     for item in lane.north_queue + lane.south_queue]
+        }
+
+    def restore(self, state):
+        """把车辆按原位置放回（数据结构应为空），返回容量不足未能放回的车辆数
+
+        状态中北侧在前、南侧在后，容量不足时舍弃的是南侧栈顶/队尾的车辆，
+        放回的车辆位置编号仍与各自栈、队列中的序号一致。
+        """
+        lot, lane = self.lot, self.lane
+        lost = 0
+        for car_id, position, car_time, entry_time in state["lot"]:
+            if lot.occupied >= lot.capacity:
+                lost += 1
+                continue
+            stack = lot.north_stack if position.startswith("N") else lot.south_stack
+            stack.append({"car": Car(car_id, car_time), "entry_time": entry_time, "position": position})
+            lot.occupied += 1
+            lot.notify(ARRIVE, car_id, position)
+        for car_id, position, car_time, arrival_time in state["lane"]:
+            if len(lane.north_queue) + len(lane.south_queue) >= lane.capacity:
+                lost += 1
+                continue
+            queue = lane.north_queue if position.startswith("N") else lane.south_queue
+            queue.append({"car": Car(car_id, car_time), "arrival_time": arrival_time, "position": position})
+            lane.notify(ARRIVE, car_id, position)
+        return lost
+
+class OperationLog:
+    """停车场状态的操作日志（事件溯源）
+
+    订阅停车场与便道的变化事件，把每次进入、离开、补位（便道出队后进入停车场）
+    与换位按发生顺序追加写入日志文件，每行为 [序号, 类型, 数据结构, 字段...]。
+    日志以行缓冲方式写入，每条记录写完即交给操作系统，程序崩溃不会丢失已完成的操作。
+
+    每记录 snapshot_every 条操作、或距上次快照超过 checkpoint_interval 秒时，
+    在处理事件的线程上复制当前状态，由后台线程写入二进制检查点（core.checkpoint，
+    先写临时文件再替换），闸口不等待编码与写盘。复制状态的同时把日志改名为
+    xxx.log.old 并开始写新日志，检查点写入成功后才删除旧日志；重新启动时
+    recover() 先加载快照，再只重放旧日志与日志中序号更大的记录。
+    """
+    def __init__(self, path, target, snapshot_every=SNAPSHOT_EVERY, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.old_path = path + ".old"
+        self.snapshot_path = path + ".snapshot"
+        self.target = target
+        self.snapshot_every = snapshot_every
+        self.checkpoint_interval = checkpoint_interval
+        self.routes = {id(structure): name for name, structure in target.structures()}
+        self.seq = 0             # 最后一条记录的序号
+        self.since_snapshot = 0  # 上次快照后记录的操作数
+        self.last_snapshot = time.monotonic()
+        self.writer = None       # 正在写入检查点的后台线程
+        self.stats = {"checkpoints": 0, "errors": 0, "last_ms": 0.0, "max_ms": 0.0, "bytes": 0}
+        self.file = None
+        self.bus = None
+
+    def recover(self):
+        """从快照与日志恢复状态（应在订阅事件之前、数据结构为空时调用），返回恢复统计
+
+        统计中 corrupt 为日志末尾未写完的半行数（0 或 1，已截掉），skipped 为
+        日志中间无法解析而跳过的行数（保留在文件中，其后的记录照常重放）。
+        """
+        start = time.perf_counter()
+        stats = {"snapshot_cars": 0, "replayed": 0, "lost": 0, "corrupt": 0, "skipped": 0}
+        state = {"lot": [], "lane": []}
+        if os.path.exists(self.snapshot_path):
+            self.seq, state = self.load_snapshot()
+            stats["snapshot_cars"] = len(state["lot"]) + len(state["lane"])
+
+        # 旧日志只在检查点写入期间存在，其记录都在当前日志之前
+        records, _, _, skipped_old = self.read_log(self.old_path)
+        current, good_bytes, torn, skipped = self.read_log(self.path)
+        records += current
+        stats["corrupt"] = int(torn)
+        stats["skipped"] = skipped_old + skipped
+        # 快照写入后、删除旧日志前崩溃时，开头的记录已包含在快照中
+        first = 0
+        while first < len(records) and records[first][0] <= self.seq:
+            first += 1
+        if first < len(records):
+            state = self.target.replay(state, records[first:] if first else records)
+            self.seq = records[-1][0]
+            stats["replayed"] = len(records) - first
+        stats["lost"] = self.target.restore(state)
+        if torn:
+            # 最后一行未写完（写入时崩溃），只截掉这半行后再继续追加
+            with open(self.path, "r+b") as f:
+                f.truncate(good_bytes)
+        self.since_snapshot = stats["replayed"]
+        stats["elapsed"] = time.perf_counter() - start
+        return stats
+
+    def load_snapshot(self):
+        """读取快照，返回 (序号, 状态)；兼容旧版本的 JSON 快照"""
+        if is_checkpoint(self.snapshot_path):
+            mode, seq, _, state = read_checkpoint(self.snapshot_path)
+            if mode != self.target.mode:
+                raise ValueError(f"快照属于{mode}系统，与当前系统不符")
+            return seq, state
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        return snapshot["seq"], snapshot["state"]
+
+    def read_log(self, path):
+        """读取日志记录，返回 (记录列表, 完整行的字节数, 末尾是否有未写完的行, 跳过的损坏行数)
+
+        只有最后一个换行之后的部分是写入中途崩溃留下的半行；换行之前无法解析的行
+        （磁盘或人为损坏）逐行跳过并计数，其后的记录照常读取。
+        """
+        if not os.path.exists(path):
+            return [], 0, False, 0
+        with open(path, "rb") as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        torn = end < len(data)
+        try:
+            # 整体作为一个 JSON 数组解析，比逐行解析快得多
+            body = data[:end].decode("utf-8")
+            return json.loads("[" + body.replace("\n", ",").rstrip(",") + "]"), end, torn, 0
+        except ValueError:
+            pass
+        records, skipped = [], 0
+        for line in data[:end].split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                skipped += 1
+        return records, end, torn, skipped
+
+    def start(self, bus):
+        """开始订阅事件并追加写入日志"""
+        self.file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self.last_snapshot = time.monotonic()
+        self.bus = bus
+        bus.subscribe(self.record)
+        return self
+
+    def record(self, event):
+        target = self.routes.get(id(event.source))
+        if target is None or self.file is None:
+            return
+        self.seq += 1
+        fields = self.target.encode(target, event)
+        self.file.write(json.dumps([self.seq, KIND_CODES[event.kind], target] + fields,
+                                   ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.since_snapshot += 1
+        if (self.since_snapshot >= self.snapshot_every
+                or time.monotonic() - self.last_snapshot >= self.checkpoint_interval):
+            self.take_snapshot()
+
+    def take_snapshot(self, wait=False):
+        """复制当前状态并交给后台线程写入检查点；wait 为 True 时等待写入完成
+
+        同一时间只有一个检查点在写入，上一个尚未写完时先等待它完成（正常情况下
+        两次快照间隔远大于写入耗时）。上一个检查点写入失败时旧日志仍在，
+        不改名当前日志，两者都保留到下一个检查点写入成功。
+        """
+        self.wait_snapshot()
+        state = self.target.snapshot()
+        if not os.path.exists(self.old_path):
+            self.file.close()
+            os.replace(self.path, self.old_path)
+            self.file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self.since_snapshot = 0
+        self.last_snapshot = time.monotonic()
+        self.writer = threading.Thread(target=self.write_snapshot, args=(self.seq, state),
+                                       name="journal-checkpoint", daemon=True)
+        self.writer.start()
+        if wait:
+            self.wait_snapshot()
+
+    def write_snapshot(self, seq, state):
+        start = time.perf_counter()
+        try:
+            size = write_checkpoint(self.snapshot_path, self.target.mode, seq, state)
+            if os.path.exists(self.old_path):
+                os.remove(self.old_path)
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"写入停车场检查点失败: {e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stats["checkpoints"] += 1
+        self.stats["bytes"] = size
+        self.stats["last_ms"] = elapsed
+        self.stats["max_ms"] = max(self.stats["max_ms"], elapsed)
+
+    def wait_snapshot(self):
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def close(self):
+        """停止记录；有未进入快照的操作时写一次快照，下次启动无需重放，可重复调用"""
+        if self.bus is not None:
+            self.bus.unsubscribe(self.record)
+            self.bus = None
+        if self.file is None:
+            return
+        try:
+            if self.since_snapshot or os.path.exists(self.old_path):
+                self.take_snapshot(wait=True)
+            else:
+                self.wait_snapshot()
+        finally:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,212 @@
+# core/metrics.py
+
+import functools
+import importlib
+import json
+import threading
+import time
+
+# 每个 2 的幂区间再等分为 2**SUB_BUCKET_BITS 个桶，相对误差不超过 1/16
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# 最大记录 2**37 纳秒（约 137 秒），更长的计入最后一个桶
+MAX_BITS = 37
+BUCKET_COUNT = (MAX_BITS - SUB_BUCKET_BITS) * SUB_BUCKETS + SUB_BUCKETS
+# 报告的分位数
+PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+
+# 计时的操作: (模块, 类名, 方法名)；子类中重写的同名方法分别计时
+TARGETS = [
+    ("core.parking", "ParkingLot", "arrive"),
+    ("core.parking", "ParkingLot", "depart"),
+    ("core.parking", "WaitingLane", "enqueue"),
+    ("core.parking", "WaitingLane", "dequeue"),
+    ("core.billing", "Billing", "calculate_fee"),
+    ("core.config", "Config", "add_history"),
+    ("core.config", "Config", "add_history_many"),
+    ("extension.dual_exit.adapter", "DualSystemAdapter", "enter"),
+    ("extension.dual_exit.adapter", "DualSystemAdapter", "leave"),
+    ("extension.dual_exit.optimizer", "ExitOptimizer", "optimize_system"),
+    ("ui.parking_ui", "ParkingUI", "refresh_status"),
+    ("extension.dual_exit.ui_extension", "DualExitParkingUI", "refresh_status"),
+]
+
+def bucket_index(value):
+    """耗时（纳秒）→ 桶序号：小于 2 * SUB_BUCKETS 的值每个值一个桶，之后每个 2 的幂区间 SUB_BUCKETS 个桶"""
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return value if value > 0 else 0
+    index = shift * SUB_BUCKETS + (value >> shift)
+    return index if index < BUCKET_COUNT else BUCKET_COUNT - 1
+
+def bucket_range(index):
+    """桶序号 → 该桶覆盖的耗时范围 [下界, 上界]（纳秒）"""
+    if index < 2 * SUB_BUCKETS:
+        return index, index
+    shift, top = divmod(index, SUB_BUCKETS)
+    shift -= 1
+    top += SUB_BUCKETS
+    return top << shift, ((top + 1) << shift) - 1
+
+class LatencyHistogram:
+    """固定分桶的耗时直方图（HDR 风格的对数-线性分桶）
+
+    桶的数量与边界固定，记录一次只做一次整数运算和一次计数加一，不分配内存；
+    分位数取所在桶的上界，相对误差不超过 1/16。多个线程同时记录时计数可能
+    偶尔丢失一次（不加锁），对统计结果的影响可以忽略。
+    """
+    def __init__(self, name):
+        self.name = name
+        self.counts = [0] * BUCKET_COUNT
+        self.total = 0      # 总耗时（纳秒）
+        self.max = 0
+        self.min = None
+
+    def record(self, value):
+        """记录一次耗时（纳秒）"""
+        self.counts[bucket_index(value)] += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, q):
+        """第 q 分位（0~1）的耗时上界（纳秒），没有记录时返回 0"""
+        total = self.count()
+        if not total:
+            return 0
+        rank = max(1, int(q * total + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket_range(index)[1], self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.total = 0
+        self.max = 0
+        self.min = None
+
+    def summary(self):
+        """统计摘要（微秒）：次数、平均、最小、各分位数、最大"""
+        count = self.count()
+        summary = {
+            "count": count,
+            "mean_us": self.total / count / 1000 if count else 0.0,
+            "min_us": (self.min or 0) / 1000,
+            "max_us": self.max / 1000
+        }
+        for q in PERCENTILES:
+            summary[f"p{q * 100:g}_us"] = self.percentile(q) / 1000
+        return summary
+
+    def buckets(self):
+        """非空的桶: [(下界纳秒, 上界纳秒, 次数)]"""
+        return [bucket_range(index) + (count,) for index, count in enumerate(self.counts) if count]
+
+def timed(func, histogram):
+    """包装函数，每次调用的耗时记入 histogram"""
+    clock = time.perf_counter_ns
+    record = histogram.record
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(clock() - start)
+    return wrapper
+
+def subclasses(cls):
+    result = [cls]
+    for sub in cls.__subclasses__():
+        result.extend(subclasses(sub))
+    return result
+
+class Metrics:
+    """操作耗时统计
+
+    enable() 时把 TARGETS 中的方法（包括子类中重写的方法）替换为计时包装，
+    disable() 时换回原方法，关闭后没有任何额外开销。直方图按“类名.方法名”命名，
+    关闭后保留已记录的数据，可以继续查询或导出。
+    在启用前已取出的绑定方法（如 f = lot.arrive）不会被计时。
+    """
+    def __init__(self, targets=TARGETS):
+        self.targets = targets
+        self.histograms = {}
+        self.patched = []   # [(类, 方法名, 原方法)]
+        self.enabled = False
+        self.enabled_at = None
+        self.lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram(name)
+        return histogram
+
+    def enable(self):
+        """开始计时，返回实际计时的方法名列表；无法导入的模块（如无图形界面时的界面模块）跳过"""
+        with self.lock:
+            if self.enabled:
+                return [f"{cls.__name__}.{name}" for cls, name, _ in self.patched]
+            for module_name, class_name, method in self.targets:
+                try:
+                    base = getattr(importlib.import_module(module_name), class_name)
+                except (ImportError, AttributeError):
+                    continue
+                for cls in subclasses(base):
+                    original = cls.__dict__.get(method)
+                    if original is None:
+                        continue
+                    name = f"{cls.__name__}.{method}"
+                    setattr(cls, method, timed(original, self.histogram(name)))
+                    self.patched.append((cls, method, original))
+            self.enabled = True
+            self.enabled_at = time.time()
+            return [f"{cls.__name__}.{name}" for cls, name, _ in self.patched]
+
+    def disable(self):
+        """停止计时，恢复原方法"""
+        with self.lock:
+            for cls, method, original in reversed(self.patched):
+                setattr(cls, method, original)
+            self.patched = []
+            self.enabled = False
+
+    def reset(self):
+        """清空已记录的数据"""
+        for histogram in list(self.histograms.values()):
+            histogram.reset()
+        self.enabled_at = time.time() if self.enabled else None
+
+    def query(self, prefix=None):
+        """返回 {名称: 统计摘要}，可按名称前缀筛选（如 "ParkingLot"），按名称排序"""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())
+                if prefix is None or name.startswith(prefix)}
+
+    def dump(self, path=None):
+        """导出全部统计（含非空分桶）为字典；给出 path 时同时写入 JSON 文件"""
+        data = {
+            "time": time.time(),
+            "enabled": self.enabled,
+            "enabled_at": self.enabled_at,
+            "operations": {
+                name: dict(histogram.summary(), buckets=histogram.buckets())
+                for name, histogram in sorted(self.histograms.items())
+            }
+        }
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        return data
+
+# 进程内共用的统计对象
+metrics = Metrics()
@@ -1,8 +1,15 @@
+import sys
 import time
+import weakref
+from array import array
 from collections import deque
 
+from core.events import ARRIVE, DEPART, Observable
+
 class Car:
     """汽车实体类"""
+    __slots__ = ("car_id", "enter_time")
+
     def __init__(self, car_id, enter_time=None):
         self.car_id = car_id
         # 如果提供了进入时间则使用，否则使用当前时间
@@ -12,25 +19,45 @@ class Car:
         """更新进入时间"""
         self.enter_time = new_time
 
-class ParkingLot:
-    """停车场类，使用栈结构实现"""
+class ParkingLot(Observable):
+    """停车场类，使用栈结构实现
+
+    进入与离开时增加版本号（version），连接事件总线后同时发布 ARRIVE / DEPART 事件，
+    事件的 position 为车辆进入或离开时的栈下标（0为最北端）。
+    """
     def __init__(self, capacity):
         self.capacity = capacity
         self.stack = []  # 主停车场栈
+        self.index = {}  # 车牌号 -> 栈中下标，用于O(1)查找
 
     def is_full(self):
         """检查停车场是否已满"""
         return len(self.stack) >= self.capacity
 
+    def contains(self, car_id):
+        """检查车辆是否在停车场内（O(1)）"""
+        return car_id in self.index
+
+    def locate(self, car_id):
+        """返回车辆在栈中的下标（0为最北端），不存在时返回None"""
+        return self.index.get(car_id)
+
     def arrive(self, car: Car):
         """车辆进入停车场"""
         if self.is_full():
             return False
+        self.index[car.car_id] = len(self.stack)
         self.stack.append(car)
+        self.notify(ARRIVE, car.car_id, len(self.stack) - 1)
         return True
 
     def depart(self, car_id):
         """车辆离开停车场，实现让路机制"""
+        # 车辆不在停车场内时直接返回，无需弹出整个栈
+        slot = self.index.get(car_id)
+        if slot is None:
+            return None, []
+
         temp_stack = []  # 存储让路车辆的临时栈
         moved_cars = []  # 记录所有被移动的车辆
         found = False
@@ -59,36 +86,470 @@ class ParkingLot:
         while temp_stack:
             self.stack.append(temp_stack.pop())
         
+        # 让路车辆整体下移一位，更新索引
+        del self.index[car_id]
+        for i in range(slot, len(self.stack)):
+            self.index[self.stack[i].car_id] = i
+        
+        self.notify(DEPART, car_id, slot)
         return target, moved_cars  # 返回目标车辆和让路车辆列表
 
     def current_state(self):
-        """获取当前停车场状态"""
-        return [(car.car_id, car.enter_time) for car in self.stack]
+        """获取当前停车场状态，返回 (车牌号, 进入时间) 的只读视图"""
+        return StateView(self.stack)
+
+
+class StateView:
+    """(车牌号, 进入时间) 的只读视图，遍历时直接读取底层结构，不复制"""
+    def __init__(self, cars):
+        self.cars = cars
+
+    def __len__(self):
+        return len(self.cars)
+
+    def __iter__(self):
+        for car in self.cars:
+            yield car.car_id, car.enter_time
+
+    def __getitem__(self, i):
+        car = self.cars[i]
+        return car.car_id, car.enter_time
+
+class YieldingCars:
+    """让路车辆的惰性视图
+
+    离开时不再复制让路车辆列表，仅记录名次区间；只有在遍历时才按
+    栈顶到栈底的顺序逐个取出车辆。新到达的车辆总是排在最南端，不影响
+    区间内的名次；只有当区间内或更北的车辆离开时，视图才会被停车场
+    固化为普通列表，保证内容始终是离开那一刻的让路车辆。
+    """
+    def __init__(self, lot, first_rank, count):
+        self.lot = lot
+        self.first_rank = first_rank  # 离开后让路车辆中最靠北的名次（从1开始）
+        self.count = count
+        self.cars = None  # 固化后的车辆列表
+
+    def freeze(self):
+        """将视图固化为列表，与停车场解除关联"""
+        if self.cars is None:
+            self.cars = list(self._iter_lot())
+            self.lot = None
+
+    def _iter_lot(self):
+        lot = self.lot
+        for rank in range(self.first_rank + self.count - 1, self.first_rank - 1, -1):
+            yield lot.cars[lot.find_kth(rank)]
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        if self.cars is not None:
+            return iter(self.cars)
+        return self._iter_lot()
+
+    def __getitem__(self, i):
+        if self.cars is not None:
+            return self.cars[i]
+        if isinstance(i, slice):
+            return list(self)[i]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("让路车辆下标越界")
+        lot = self.lot
+        return lot.cars[lot.find_kth(self.first_rank + self.count - 1 - i)]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class StackView:
+    """树状数组停车场的只读栈视图，按到达次序（北→南）访问车辆"""
+    def __init__(self, lot):
+        self.lot = lot
+
+    def __len__(self):
+        return self.lot.size
+
+    def __iter__(self):
+        cars = self.lot.cars
+        for seq in range(1, self.lot.next_seq):
+            car = cars.get(seq)
+            if car is not None:
+                yield car
+
+    def __getitem__(self, i):
+        lot = self.lot
+        if isinstance(i, slice):
+            return list(self)[i]
+        if i < 0:
+            i += lot.size
+        if not 0 <= i < lot.size:
+            raise IndexError("停车场下标越界")
+        return lot.cars[lot.find_kth(i + 1)]
+
+
+class FenwickParkingLot(ParkingLot):
+    """停车场类，使用树状数组按到达序号维护车辆次序
+
+    与ParkingLot行为一致：离开车辆之后进入的车辆依次让路并按原次序
+    返回。由于让路前后其余车辆的相对次序不变，这里不再实际搬动车辆，
+    而是在到达序号上的树状数组中删除目标车辆，查找和删除均为O(log n)；
+    让路车辆以YieldingCars惰性视图返回。
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = 0       # 当前车辆数
+        self.next_seq = 1   # 下一辆车的到达序号
+        self.cars = {}      # 到达序号 -> 车辆
+        self.index = {}     # 车牌号 -> 到达序号
+        self.views = weakref.WeakSet()  # 尚未固化的让路视图
+        self.stack = StackView(self)
+        self._init_tree(max(16, capacity * 2))
 
-class WaitingLane:
-    """便道类，使用队列结构实现"""
+    def _init_tree(self, n):
+        self.tree = [0] * (n + 1)
+        self.top_bit = 1 << (n.bit_length() - 1)
+
+    def _add(self, i, delta):
+        tree = self.tree
+        n = len(tree) - 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i):
+        tree = self.tree
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find_kth(self, k):
+        """返回第k辆车（从北往南数，从1开始）的到达序号"""
+        tree = self.tree
+        n = len(tree) - 1
+        pos = 0
+        bit = self.top_bit
+        while bit:
+            nxt = pos + bit
+            if nxt <= n and tree[nxt] < k:
+                pos = nxt
+                k -= tree[nxt]
+            bit >>= 1
+        return pos + 1
+
+    def _compact(self):
+        """到达序号用尽时重新编号，均摊O(1)"""
+        ordered = [self.cars[seq] for seq in sorted(self.cars)]
+        self._init_tree(max(16, self.capacity * 2, len(ordered) * 2))
+        tree = self.tree
+        n = len(tree) - 1
+        self.cars = {}
+        for seq, car in enumerate(ordered, 1):
+            self.cars[seq] = car
+            self.index[car.car_id] = seq
+            tree[seq] = 1
+        # 线性时间建树
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self.next_seq = len(ordered) + 1
+
+    def _freeze_views(self, rank):
+        """固化受名次rank处车辆离开影响的让路视图"""
+        for view in list(self.views):
+            if rank < view.first_rank + view.count:
+                view.freeze()
+                self.views.discard(view)
+
+    def is_full(self):
+        """检查停车场是否已满"""
+        return self.size >= self.capacity
+
+    def locate(self, car_id):
+        """返回车辆在栈中的下标（0为最北端），不存在时返回None"""
+        seq = self.index.get(car_id)
+        if seq is None:
+            return None
+        return self._prefix(seq) - 1
+
+    def arrive(self, car: Car):
+        """车辆进入停车场"""
+        if self.is_full():
+            return False
+        if self.next_seq >= len(self.tree):
+            self._compact()
+        seq = self.next_seq
+        self.next_seq += 1
+        self.cars[seq] = car
+        self.index[car.car_id] = seq
+        self._add(seq, 1)
+        self.size += 1
+        self.notify(ARRIVE, car.car_id, self.size - 1)
+        return True
+
+    def depart(self, car_id):
+        """车辆离开停车场，返回目标车辆和让路车辆视图"""
+        seq = self.index.get(car_id)
+        if seq is None:
+            return None, []
+
+        rank = self._prefix(seq)
+        self._freeze_views(rank)
+        target = self.cars.pop(seq)
+        del self.index[car_id]
+        self._add(seq, -1)
+        self.size -= 1
+        self.notify(DEPART, car_id, rank - 1)
+
+        # 原先名次在目标之后的车辆即为让路车辆，离开后名次整体减1
+        moved_cars = YieldingCars(self, rank, self.size - rank + 1)
+        if moved_cars.count:
+            self.views.add(moved_cars)
+        return target, moved_cars
+
+
+class WaitingLane(Observable):
+    """便道类，使用队列结构实现
+
+    入队与出队时增加版本号，连接事件总线后发布 ARRIVE / DEPART 事件（position 为队列下标）。
+    """
     # 关键修复：添加构造函数接受容量参数
     def __init__(self, capacity):
         self.capacity = capacity
         self.queue = deque()
+        self.index = {}  # 车牌号 -> 入队序号
+        self.head = 0    # 队首车辆的入队序号
 
     def is_full(self):
         """检查便道是否已满"""
         return len(self.queue) >= self.capacity
 
+    def contains(self, car_id):
+        """检查车辆是否在便道中（O(1)）"""
+        return car_id in self.index
+
+    def locate(self, car_id):
+        """返回车辆在便道中的下标（0为队首），不存在时返回None"""
+        seq = self.index.get(car_id)
+        if seq is None:
+            return None
+        return seq - self.head
+
     def enqueue(self, car: Car):
         """车辆进入便道"""
         if self.is_full():
             return False
+        self.index[car.car_id] = self.head + len(self.queue)
         self.queue.append(car)
+        self.notify(ARRIVE, car.car_id, len(self.queue) - 1)
         return True
 
     def dequeue(self):
         """车辆离开便道"""
         if not self.queue:
             return None
-        return self.queue.popleft()
+        car = self.queue.popleft()
+        self.index.pop(car.car_id, None)
+        self.head += 1
+        self.notify(DEPART, car.car_id, 0)
+        return car
   
     def current_state(self):
         """获取当前便道状态 - 返回原始进入时间"""
-        return [(car.car_id, car.enter_time) for car in self.queue]
\ No newline at end of file
+        return StateView(self.queue)
+
+
+class ColumnView:
+    """列存储结构的只读视图
+
+    owner需提供 __len__ 与 row(i)/rows()；factory为Car时按需生成车辆对象，
+    为None时返回 (车牌号, 进入时间) 元组。
+    """
+    def __init__(self, owner, factory=None):
+        self.owner = owner
+        self.factory = factory
+
+    def __len__(self):
+        return len(self.owner)
+
+    def __iter__(self):
+        factory = self.factory
+        if factory is None:
+            return self.owner.rows()
+        return (factory(car_id, enter_time) for car_id, enter_time in self.owner.rows())
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+        n = len(self.owner)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("下标越界")
+        row = self.owner.row(i)
+        if self.factory is None:
+            return row
+        return self.factory(*row)
+
+
+class ColumnSlice:
+    """列数据片段（车牌号列表与进入时间数组的切片）"""
+    def __init__(self, car_ids, enter_times):
+        self.car_ids = car_ids
+        self.enter_times = enter_times
+
+    def __len__(self):
+        return len(self.car_ids)
+
+    def row(self, i):
+        return self.car_ids[i], self.enter_times[i]
+
+    def rows(self):
+        return zip(self.car_ids, self.enter_times)
+
+
+class CompactParkingLot(ParkingLot):
+    """停车场类，紧凑存储模式
+
+    车牌号（驻留字符串）与进入时间（array('d')）按列存储，不再为每辆车
+    保留Car对象；stack 与 current_state() 返回按需生成数据的视图。
+    注意：stack 中取出的Car对象是临时生成的，修改它不会影响停车场。
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.car_ids = []             # 车牌号列
+        self.enter_times = array("d")  # 进入时间列
+        self.index = {}               # 车牌号 -> 栈中下标
+        self.stack = ColumnView(self, Car)
+
+    def __len__(self):
+        return len(self.car_ids)
+
+    def row(self, i):
+        return self.car_ids[i], self.enter_times[i]
+
+    def rows(self):
+        return zip(self.car_ids, self.enter_times)
+
+    def is_full(self):
+        """检查停车场是否已满"""
+        return len(self.car_ids) >= self.capacity
+
+    def arrive(self, car: Car):
+        """车辆进入停车场"""
+        if self.is_full():
+            return False
+        car_id = sys.intern(car.car_id)
+        self.index[car_id] = len(self.car_ids)
+        self.car_ids.append(car_id)
+        self.enter_times.append(car.enter_time)
+        self.notify(ARRIVE, car_id, len(self.car_ids) - 1)
+        return True
+
+    def depart(self, car_id):
+        """车辆离开停车场，实现让路机制"""
+        slot = self.index.get(car_id)
+        if slot is None:
+            return None, []
+
+        target = Car(self.car_ids[slot], self.enter_times[slot])
+        # 让路车辆按出栈顺序（栈顶在前）记录
+        moved_cars = ColumnView(ColumnSlice(self.car_ids[:slot:-1], self.enter_times[:slot:-1]), Car)
+
+        # 目标车辆离开后，让路车辆按原次序回到停车场，即整体下移一位
+        del self.car_ids[slot]
+        del self.enter_times[slot]
+        del self.index[car_id]
+        car_ids = self.car_ids
+        for i in range(slot, len(car_ids)):
+            self.index[car_ids[i]] = i
+
+        self.notify(DEPART, car_id, slot)
+        return target, moved_cars
+
+    def current_state(self):
+        """获取当前停车场状态，返回 (车牌号, 进入时间) 的只读视图"""
+        return ColumnView(self)
+
+
+class CompactWaitingLane(WaitingLane):
+    """便道类，紧凑存储模式
+
+    使用容量固定的环形缓冲区按列存储车牌号与进入时间，queue 与
+    current_state() 返回视图。
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.car_ids = [None] * capacity
+        self.enter_times = array("d", bytes(8 * capacity))
+        self.count = 0
+        self.index = {}  # 车牌号 -> 入队序号
+        self.head = 0    # 队首车辆的入队序号
+        self.queue = ColumnView(self, Car)
+
+    def __len__(self):
+        return self.count
+
+    def row(self, i):
+        slot = (self.head + i) % self.capacity
+        return self.car_ids[slot], self.enter_times[slot]
+
+    def rows(self):
+        for i in range(self.count):
+            yield self.row(i)
+
+    def is_full(self):
+        """检查便道是否已满"""
+        return self.count >= self.capacity
+
+    def enqueue(self, car: Car):
+        """车辆进入便道"""
+        if self.is_full():
+            return False
+        seq = self.head + self.count
+        slot = seq % self.capacity
+        car_id = sys.intern(car.car_id)
+        self.car_ids[slot] = car_id
+        self.enter_times[slot] = car.enter_time
+        self.index[car_id] = seq
+        self.count += 1
+        self.notify(ARRIVE, car_id, self.count - 1)
+        return True
+
+    def dequeue(self):
+        """车辆离开便道"""
+        if not self.count:
+            return None
+        slot = self.head % self.capacity
+        car = Car(self.car_ids[slot], self.enter_times[slot])
+        self.car_ids[slot] = None
+        self.index.pop(car.car_id, None)
+        self.head += 1
+        self.count -= 1
+        self.notify(DEPART, car.car_id, 0)
+        return car
+
+    def current_state(self):
+        """获取当前便道状态 - 返回原始进入时间"""
+        return ColumnView(self)
+
+
+def create_parking_lot(capacity, engine="stack"):
+    """按配置的引擎名称创建停车场"""
+    if engine == "fenwick":
+        return FenwickParkingLot(capacity)
+    if engine == "compact":
+        return CompactParkingLot(capacity)
+    return ParkingLot(capacity)
+
+
+def create_waiting_lane(capacity, engine="stack"):
+    """按配置的引擎名称创建便道"""
+    if engine == "compact":
+        return CompactWaitingLane(capacity)
+    return WaitingLane(capacity)
\ No newline at end of file
@@ -0,0 +1,140 @@
+# core/worker.py
+
+import queue
+import threading
+import traceback
+
+# 命令持续不断时，最多每执行这么多条命令生成一次状态副本
+SNAPSHOT_EVERY = 100
+
+class CommandWorker:
+    """闸口命令处理线程
+
+    独占停车引擎：界面线程只通过 submit() 提交命令，命令在后台线程中按提交
+    顺序逐条执行（严格有序），执行结果放入结果队列，由界面线程用 after()
+    定时调用 poll() 取回并在界面线程中执行回调，后台线程不接触界面。
+
+    snapshot 为在后台线程中读取停车场/便道状态的函数；订阅的事件总线报告
+    变化后，命令队列为空（或已连续执行 SNAPSHOT_EVERY 条命令）时生成一份新的
+    状态副本放入 state（整体替换引用），界面线程只读取副本，不直接访问引擎。
+    """
+    def __init__(self, snapshot=None, events=None, name="gate-worker"):
+        self.commands = queue.Queue()
+        self.results = queue.Queue()
+        self.snapshot = snapshot
+        self.dirty = False
+        self.state = snapshot() if snapshot else None
+        self.state_serial = 0  # 每生成一份新的状态副本加1
+        self.state_seq = 0     # 生成状态副本时已完成的命令序号
+        self.submitted = 0
+        self.completed = 0
+        self.closed = False
+        if events is not None:
+            events.subscribe(self.mark_dirty)
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def mark_dirty(self, event):
+        """事件回调（在后台线程中调用）：状态已变化，需要生成新的副本"""
+        self.dirty = True
+
+    def submit(self, func, *args, callback=None, on_error=None):
+        """提交命令 func(*args)，完成后在 poll() 所在线程调用 callback(结果)
+
+        出错时调用 on_error(异常)，未提供时打印错误。返回命令序号。
+        """
+        if self.closed:
+            raise RuntimeError("命令处理线程已关闭")
+        self.submitted += 1
+        self.commands.put((self.submitted, func, args, callback, on_error))
+        return self.submitted
+
+    def run(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                break
+            seq, func, args, callback, on_error = item
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                result, error = None, e
+                if on_error is None:
+                    traceback.print_exc()
+            self.completed = seq
+            self.results.put((callback, on_error, result, error))
+            # 连续的命令处理完后再生成状态副本，避免每条命令都复制一次
+            if self.dirty and (self.commands.empty() or seq - self.state_seq >= SNAPSHOT_EVERY):
+                self.refresh_state()
+
+    def refresh_state(self):
+        self.dirty = False
+        self.state_seq = self.completed
+        try:
+            self.state = self.snapshot()
+            self.state_serial += 1
+        except Exception as e:
+            print(f"读取停车场状态失败: {e}")
+
+    def poll(self, limit=None):
+        """在界面线程中取回已完成的命令并执行回调，返回处理的命令数"""
+        count = 0
+        while limit is None or count < limit:
+            try:
+                callback, on_error, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            count += 1
+            try:
+                if error is not None:
+                    if on_error is not None:
+                        on_error(error)
+                elif callback is not None:
+                    callback(result)
+            except Exception:
+                traceback.print_exc()
+        return count
+
+    def call(self, func, *args, timeout=None):
+        """在后台线程中按顺序执行 func 并等待返回结果（用于需要立即得到结果的查询）
+
+        前面已提交的命令先执行完，因此结果反映这些命令之后的状态。
+        """
+        if threading.current_thread() is self.thread:
+            return func(*args)
+        done = threading.Event()
+        box = {}
+
+        def run():
+            try:
+                box["result"] = func(*args)
+            except Exception as e:
+                box["error"] = e
+            finally:
+                done.set()
+            return None
+
+        self.submit(run)
+        if not done.wait(timeout):
+            raise TimeoutError("等待命令处理线程超时")
+        if "error" in box:
+            raise box["error"]
+        return box.get("result")
+
+    def drain(self, timeout=None):
+        """等待已提交的命令全部执行完（不执行回调），返回是否在超时前完成"""
+        if self.closed or threading.current_thread() is self.thread:
+            return True
+        try:
+            self.call(lambda: None, timeout=timeout)
+            return True
+        except TimeoutError:
+            return False
+
+    def close(self, timeout=None):
+        """执行完已提交的命令后停止线程，可重复调用"""
+        if self.closed:
+            return
+        self.closed = True
+        self.commands.put(None)
+        self.thread.join(timeout)
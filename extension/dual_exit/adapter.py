@@ -2,16 +2,22 @@ from extension.dual_exit.parking import DualExitParkingLot
 from extension.dual_exit.lane import DualWaitingLane
 from extension.dual_exit.optimizer import ExitOptimizer
 from core.parking import ParkingLot, WaitingLane
-import time
+from core.clock import system_clock
+from core.events import EventBus
 
 class DualSystemAdapter:
-    def __init__(self, config, old_parking=None, old_waiting=None, billing=None, log_callback=None):
+    def __init__(self, config, old_parking=None, old_waiting=None, billing=None, log_callback=None, clock=None):
         self.config = config
         self.billing = billing
         self.log = log_callback or (lambda msg, level: print(f"[{level}] {msg}"))
+        self.clock = clock or system_clock  # 时钟，可注入虚拟时钟用于仿真
         self.parking_lot = DualExitParkingLot(config.parking_capacity)
         self.waiting_lane = DualWaitingLane(config.waiting_capacity * 2)
-        self.optimizer = ExitOptimizer(self.parking_lot, self.waiting_lane)
+        self.optimizer = ExitOptimizer(self.parking_lot, self.waiting_lane, self.clock)
+        # 双门停车场与双便道的变化通知
+        self.events = EventBus()
+        self.parking_lot.attach(self.events)
+        self.waiting_lane.attach(self.events)
         
         if old_parking and old_waiting:
             try:
@@ -45,7 +51,7 @@ class DualSystemAdapter:
     
     def enter(self, car):
         """车辆进入系统"""
-        current_time = time.time()
+        current_time = self.clock()
         try:
             # 检查车牌号是否已存在
             if self.is_car_exists(car.car_id):
@@ -71,7 +77,7 @@ class DualSystemAdapter:
     
     def leave(self, car_id):
         """车辆离开系统"""
-        exit_time = time.time()
+        exit_time = self.clock()
         try:
             success, result = self.parking_lot.leave(car_id, exit_time)
             
@@ -84,7 +90,7 @@ class DualSystemAdapter:
                 car_id, 
                 result["entry_time"], 
                 exit_time, 
-                self.billing.calculate_fee(result["duration"])
+                self.billing.calculate_fee(result["duration"], result["entry_time"])
             )
             
             # 从便道补充车辆
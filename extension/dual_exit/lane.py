@@ -1,4 +1,7 @@
-class DualWaitingLane:
+from core.events import ARRIVE, DEPART, Observable
+
+class DualWaitingLane(Observable):
+    """双便道：入队与出队时增加版本号并发布事件（position 为排队位置编号）"""
     def __init__(self, capacity=20):
         self.north_queue = []  # 北便道队列
         self.south_queue = []  # 南便道队列
@@ -30,6 +33,7 @@ class DualWaitingLane:
                 "arrival_time": arrival_time,
                 "position": f"NQ{position}"
             })
+            self.notify(ARRIVE, car.car_id, f"NQ{position}")
             return True, f"北便道{position}"
         else:
             position = len(self.south_queue) + 1
@@ -38,21 +42,24 @@ class DualWaitingLane:
                 "arrival_time": arrival_time,
                 "position": f"SQ{position}"
             })
+            self.notify(ARRIVE, car.car_id, f"SQ{position}")
             return True, f"南便道{position}"
     
     def dequeue(self, side=None):
         """从便道取出车辆，优先选择指定侧"""
         if side == "north" and self.north_queue:
-            return self.north_queue.pop(0)
+            item = self.north_queue.pop(0)
         elif side == "south" and self.south_queue:
-            return self.south_queue.pop(0)
-        
+            item = self.south_queue.pop(0)
         # 未指定侧时，选择非空队列
-        if self.north_queue:
-            return self.north_queue.pop(0)
+        elif self.north_queue:
+            item = self.north_queue.pop(0)
         elif self.south_queue:
-            return self.south_queue.pop(0)
-        return None
+            item = self.south_queue.pop(0)
+        else:
+            return None
+        self.notify(DEPART, item["car"].car_id, item["position"])
+        return item
     
     def get_status(self):
         """获取便道状态"""
@@ -1,9 +1,11 @@
-import time
+from core.clock import system_clock
+from core.events import MOVE
 
 class ExitOptimizer:
-    def __init__(self, parking_lot, waiting_lane):
+    def __init__(self, parking_lot, waiting_lane, clock=None):
         self.parking_lot = parking_lot
         self.waiting_lane = waiting_lane
+        self.clock = clock or system_clock
         self.history = []
         self.last_optimize_time = 0
     
@@ -44,7 +46,7 @@ class ExitOptimizer:
     def optimize_system(self):
         """系统级优化：平衡两侧负载"""
         # 限制优化频率（至少间隔30秒）
-        current_time = time.time()
+        current_time = self.clock()
         if current_time - self.last_optimize_time < 30:
             return False, "优化太频繁，请稍后再试"
         
@@ -70,6 +72,7 @@ class ExitOptimizer:
                         new_position = len(self.parking_lot.south_stack) + 1
                         car_data["position"] = f"S{new_position}"
                         self.parking_lot.south_stack.append(car_data)
+                        self.parking_lot.notify(MOVE, car_data["car"].car_id, car_data["position"])
                         self.record_move(car_data["car"].car_id, "north", "south")
                         moves += 1
             else:
@@ -81,6 +84,7 @@ class ExitOptimizer:
                         new_position = len(self.parking_lot.north_stack) + 1
                         car_data["position"] = f"N{new_position}"
                         self.parking_lot.north_stack.append(car_data)
+                        self.parking_lot.notify(MOVE, car_data["car"].car_id, car_data["position"])
                         self.record_move(car_data["car"].car_id, "south", "north")
                         moves += 1
             return True, f"系统优化完成，移动了 {moves} 辆车"
@@ -89,7 +93,7 @@ class ExitOptimizer:
     def record_move(self, car_id, from_side, to_side):
         """记录车辆移动历史"""
         self.history.append({
-            "timestamp": time.time(),
+            "timestamp": self.clock(),
             "car_id": car_id,
             "from_side": from_side,
             "to_side": to_side
@@ -1,6 +1,8 @@
 import time
+from core.events import ARRIVE, DEPART, Observable
 
-class DualExitParkingLot:
+class DualExitParkingLot(Observable):
+    """双门停车场：进入、离开与换位时增加版本号并发布事件（position 为车位编号）"""
     def __init__(self, capacity):
         self.capacity = capacity
         self.north_stack = []  # 北端停车场（栈结构）
@@ -43,6 +45,7 @@ class DualExitParkingLot:
             })
         
         self.occupied += 1
+        self.notify(ARRIVE, car.car_id, position)
         return True, position
     
     def find_car(self, car_id):
@@ -81,6 +84,7 @@ class DualExitParkingLot:
                 self.south_stack[i]["position"] = f"S{i+1}"
         
         self.occupied -= 1
+        self.notify(DEPART, car_id, spot["position"])
         duration = exit_time - spot["entry_time"]
         return True, {
             "car": spot["car"],
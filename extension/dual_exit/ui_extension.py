@@ -2,17 +2,27 @@ import tkinter as tk
 import time
 from tkinter import ttk
 from utils.time_utils import timestamp_to_str, format_duration
+from ui.board import TextBoard
 
 class DualExitParkingUI:
-    def __init__(self, master, parking_system, log_text):
+    def __init__(self, master, parking_system, log_text, worker=None):
         self.master = master
         self.parking_system = parking_system
         self.log_text = log_text  # 主界面的日志控件
+        # 命令处理线程（core.worker.CommandWorker）；设置后系统优化在其中执行，
+        # 显示使用它生成的状态副本，不在界面线程中访问双门系统
+        self.worker = worker
         
         # 主框架 - 使用表格布局实现对称
         main_frame = tk.Frame(master)
         main_frame.pack(fill=tk.BOTH, expand=True)
         
+        # 各状态文本控件对应的增量看板
+        self.boards = {}
+        # 上次读取状态时停车场与便道的版本号及状态副本
+        self.status_versions = None
+        self.status = None
+        
         # 配置网格权重确保均匀分布
         main_frame.grid_rowconfigure(0, weight=1)  # 第一行（停车场）可扩展
         main_frame.grid_rowconfigure(1, weight=1)  # 第二行（便道）可扩展
@@ -27,9 +37,10 @@ class DualExitParkingUI:
         north_scroll = tk.Scrollbar(north_frame)
         north_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.north_text = tk.Text(north_frame, height=15, yscrollcommand=north_scroll.set)
+        self.north_text = tk.Text(north_frame, height=15)
         self.north_text.pack(fill=tk.BOTH, expand=True)
         north_scroll.config(command=self.north_text.yview)
+        self.boards[self.north_text] = TextBoard(self.north_text, north_scroll)
         
         # 南停车场状态
         south_frame = tk.LabelFrame(main_frame, text="南停车场", font=("Arial", 10, "bold"))
@@ -39,9 +50,10 @@ class DualExitParkingUI:
         south_scroll = tk.Scrollbar(south_frame)
         south_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.south_text = tk.Text(south_frame, height=15, yscrollcommand=south_scroll.set)
+        self.south_text = tk.Text(south_frame, height=15)
         self.south_text.pack(fill=tk.BOTH, expand=True)
         south_scroll.config(command=self.south_text.yview)
+        self.boards[self.south_text] = TextBoard(self.south_text, south_scroll)
         
         # 北便道状态
         north_waiting_frame = tk.LabelFrame(main_frame, text="北便道", font=("Arial", 10))
@@ -51,9 +63,10 @@ class DualExitParkingUI:
         north_waiting_scroll = tk.Scrollbar(north_waiting_frame)
         north_waiting_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.north_waiting_text = tk.Text(north_waiting_frame, height=5, yscrollcommand=north_waiting_scroll.set)
+        self.north_waiting_text = tk.Text(north_waiting_frame, height=5)
         self.north_waiting_text.pack(fill=tk.BOTH, expand=True)
         north_waiting_scroll.config(command=self.north_waiting_text.yview)
+        self.boards[self.north_waiting_text] = TextBoard(self.north_waiting_text, north_waiting_scroll)
         
         # 南便道状态
         south_waiting_frame = tk.LabelFrame(main_frame, text="南便道", font=("Arial", 10))
@@ -63,9 +76,10 @@ class DualExitParkingUI:
         south_waiting_scroll = tk.Scrollbar(south_waiting_frame)
         south_waiting_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.south_waiting_text = tk.Text(south_waiting_frame, height=5, yscrollcommand=south_waiting_scroll.set)
+        self.south_waiting_text = tk.Text(south_waiting_frame, height=5)
         self.south_waiting_text.pack(fill=tk.BOTH, expand=True)
         south_waiting_scroll.config(command=self.south_waiting_text.yview)
+        self.boards[self.south_waiting_text] = TextBoard(self.south_waiting_text, south_waiting_scroll)
         
         # 添加控制按钮
         control_frame = tk.Frame(main_frame)
@@ -88,7 +102,7 @@ class DualExitParkingUI:
     def refresh_status(self):
         """刷新停车场状态显示"""
         try:
-            status = self.parking_system.get_status()
+            status = self.read_status()
             parking_status = status["parking"]
             waiting_status = status["waiting"]
             current_time = time.time()
@@ -98,18 +112,18 @@ class DualExitParkingUI:
                 self.north_text, 
                 "北停车场状态:\n\n",
                 parking_status["north"],
-                current_time
+                current_time,
+                parking_status["capacity"] // 2
             )
-            self.north_text.insert(tk.END, f"\n占用: {len(parking_status['north'])}/{parking_status['capacity']//2}")
             
             # 更新南端显示
             self.update_parking_display(
                 self.south_text, 
                 "南停车场状态:\n\n",
                 parking_status["south"],
-                current_time
+                current_time,
+                parking_status["capacity"] // 2
             )
-            self.south_text.insert(tk.END, f"\n占用: {len(parking_status['south'])}/{parking_status['capacity']//2}")
             
             # 更新便道显示
             self.update_waiting_display(
@@ -129,54 +143,65 @@ class DualExitParkingUI:
         except Exception as e:
             self.log(f"刷新状态失败: {str(e)}", "error")
     
-    def update_parking_display(self, text_widget, title, parking_data, current_time):
-        """更新停车场显示"""
-        text_widget.config(state=tk.NORMAL)
-        text_widget.delete(1.0, tk.END)
-        text_widget.insert(tk.END, title)
-        
-        if parking_data:
-            for spot in parking_data:
-                duration = current_time - spot["entry_time"]
-                text_widget.insert(tk.END, 
-                    f"{spot['position']}: {spot['car'].car_id} "
-                    f"(已停 {format_duration(duration)})\n")
-        else:
-            text_widget.insert(tk.END, "（空）\n")
-        
-        text_widget.config(state=tk.DISABLED)
+    def read_status(self):
+        """返回用于显示的状态副本"""
+        if self.worker is not None and self.worker.state is not None:
+            return self.worker.state
+        # 版本号未变化时复用上次的状态副本，只重新计算时长
+        versions = (self.parking_system.parking_lot.version, self.parking_system.waiting_lane.version)
+        if versions != self.status_versions:
+            self.status = self.parking_system.get_status()
+            self.status_versions = versions
+        return self.status
+    
+    def board_for(self, text_widget, *titles):
+        """返回文本控件对应的看板，首次使用时按标题建立各区域"""
+        board = self.boards[text_widget]
+        if not board.sections:
+            for title in titles:
+                board.add_section(title)
+        return board
+    
+    def update_parking_display(self, text_widget, title, parking_data, current_time, capacity):
+        """更新停车场显示（行键为车位与车牌号，只增删变化的行，其余行只更新停留时长）"""
+        board = self.board_for(text_widget, title, "\n")
+        board.update(
+            0,
+            [(spot["position"], spot["car"].car_id) for spot in parking_data],
+            [f"(已停 {format_duration(current_time - spot['entry_time'])})" for spot in parking_data],
+            lambda i: f"{parking_data[i]['position']}: {parking_data[i]['car'].car_id} "
+        )
+        board.update(1, ["occupancy"], [f"占用: {len(parking_data)}/{capacity}"], lambda i: "")
     
     def update_waiting_display(self, text_widget, title, waiting_data, current_time):
-        """更新便道显示"""
-        text_widget.config(state=tk.NORMAL)
-        text_widget.delete(1.0, tk.END)
-        text_widget.insert(tk.END, title)
-        
-        if waiting_data:
-            for idx, item in enumerate(waiting_data):
-                wait_time = current_time - item["arrival_time"]
-                text_widget.insert(tk.END, 
-                    f"{idx+1}. {item['car'].car_id} "
-                    f"(等待 {format_duration(wait_time)})\n")
-        else:
-            text_widget.insert(tk.END, "（空）\n")
-        
-        text_widget.config(state=tk.DISABLED)
+        """更新便道显示（行键为排队序号与车牌号，其余行只更新等待时长）"""
+        board = self.board_for(text_widget, title)
+        board.update(
+            0,
+            [(idx, item["car"].car_id) for idx, item in enumerate(waiting_data)],
+            [f"(等待 {format_duration(current_time - item['arrival_time'])})" for item in waiting_data],
+            lambda i: f"{i+1}. {waiting_data[i]['car'].car_id} "
+        )
     
     def optimize_system(self):
-        """执行系统优化并显示结果"""
+        """执行系统优化并显示结果（有命令处理线程时在其中按顺序执行）"""
+        if self.worker is not None:
+            self.worker.submit(self.parking_system.optimize_system,
+                               callback=self.show_optimize_result,
+                               on_error=lambda e: self.log(f"系统优化失败: {str(e)}", "error"))
+            return
         try:
-            success, message = self.parking_system.optimize_system()
-            if success:
-                self.refresh_status()
-                self.log(f"系统优化: {message}", "info")
-                tk.messagebox.showinfo("系统优化", message)
-            else:
-                self.log(f"系统优化: {message}", "info")
-                tk.messagebox.showinfo("系统优化", message)
+            self.show_optimize_result(self.parking_system.optimize_system())
         except Exception as e:
             self.log(f"系统优化失败: {str(e)}", "error")
     
+    def show_optimize_result(self, result):
+        success, message = result
+        if success:
+            self.refresh_status()
+        self.log(f"系统优化: {message}", "info")
+        tk.messagebox.showinfo("系统优化", message)
+    
     def show_waiting_lane(self):
         """显示便道状态窗口"""
         try:
@@ -184,7 +209,7 @@ class DualExitParkingUI:
             lane_win.title("便道状态详情")
             lane_win.geometry("500x400")
             
-            status = self.parking_system.get_status()["waiting"]
+            status = self.read_status()["waiting"]
             current_time = time.time()
             
             # 北便道
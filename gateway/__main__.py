@@ -0,0 +1,65 @@
+# gateway/__main__.py
+"""无界面闸口服务（HTTP/JSON），供闸口控制器与车牌识别相机调用
+
+用法（在项目根目录执行）:
+    python -m gateway --port 8080
+    python -m gateway --mode dual --config config.json
+    python -m gateway --capacity 500 --waiting 50 --history-file gate_history.jsonl
+
+接口:
+    POST /arrive   {"car_id": "京A12345"} 或 {"car_ids": [...]}
+    POST /depart   {"car_id": "京A12345"} 或 {"car_ids": [...]}
+    GET  /locate?car_id=京A12345
+    GET  /status[?cars=1]
+    GET  /history?car_id=...&plate_prefix=...&start=...&end=...&sort=exit_time&offset=0&limit=100
+    GET  /metrics[?prefix=ParkingLot]   各操作耗时统计（需 --metrics 或配置 metrics_enabled）
+"""
+
+import argparse
+import asyncio
+from core.config import Config
+from core.metrics import metrics
+from gateway.gate import create_gate
+from gateway.server import serve
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="停车场闸口 HTTP/JSON 服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8080, help="监听端口")
+    parser.add_argument("--mode", choices=["single", "dual"], default=None, help="单门/双门系统，默认按配置文件")
+    parser.add_argument("--config", default=None, help="配置文件（config.json）")
+    parser.add_argument("--engine", default=None, help="单门停车场引擎: stack / fenwick / compact")
+    parser.add_argument("--capacity", type=int, default=None, help="停车场容量")
+    parser.add_argument("--waiting", type=int, default=None, help="便道容量")
+    parser.add_argument("--history-file", default=None, help="历史记录文件，默认使用配置中的文件")
+    parser.add_argument("--backend", choices=["jsonl", "sqlite", "json"], default=None, help="历史记录格式")
+    parser.add_argument("--metrics", action="store_true", help="记录各操作耗时（GET /metrics 查询）")
+    args = parser.parse_args(argv)
+
+    config = Config()
+    if args.config:
+        config.load_from_file(args.config)
+    if args.backend:
+        config.set_history_backend(args.backend)
+    if args.history_file:
+        config.history_file = args.history_file
+        config.history = config.load_history()
+    if args.capacity is not None:
+        config.parking_capacity = args.capacity
+    if args.waiting is not None:
+        config.waiting_capacity = args.waiting
+    if args.engine:
+        config.parking_engine = args.engine
+    mode = args.mode or ("dual" if config.enable_dual_exit else "single")
+    if args.metrics or config.metrics_enabled:
+        metrics.enable()
+
+    try:
+        asyncio.run(serve(create_gate(config, mode), args.host, args.port))
+    except KeyboardInterrupt:
+        print("闸口服务已停止")
+    finally:
+        config.close_history()
+
+if __name__ == "__main__":
+    main()
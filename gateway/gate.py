@@ -0,0 +1,236 @@
+# gateway/gate.py
+
+from core.billing import Billing
+from core.engine import ParkingEngine
+from core.parking import Car
+from extension.dual_exit.adapter import DualSystemAdapter
+
+# 单次历史记录查询最多返回的条数
+MAX_HISTORY_LIMIT = 1000
+
+def history_page(config, car_id=None, plate_prefix=None, start=None, end=None,
+                 sort="ordinal", descending=True, offset=0, limit=100):
+    """历史记录分页查询：car_id 精确匹配、车牌号前缀与离开时间范围同时生效
+
+    先按 sort / descending 排序再分页（默认最新的记录在前），ordinal 为记录
+    在历史记录中的下标，与筛选条件无关。
+    """
+    limit = max(0, min(limit, MAX_HISTORY_LIMIT))
+    if sort not in ("ordinal", "car_id", "exit_time"):
+        raise ValueError(f"不支持的排序字段: {sort}")
+    result = config.query_history(plate_prefix, start, end, sort, descending, car_id=car_id)
+    return {
+        "total": len(result),
+        "offset": offset,
+        "records": [dict(record, ordinal=ordinal) for ordinal, record in result.page(offset, limit)]
+    }
+
+class SingleGate:
+    """单门系统闸口：通过 ParkingEngine 处理进出与查询，返回可直接序列化为 JSON 的字典"""
+    def __init__(self, config, engine=None):
+        self.config = config
+        self.engine = engine or ParkingEngine(config)
+
+    def arrive(self, car_ids):
+        results = self.engine.arrive_many([self.engine.new_car(car_id) for car_id in car_ids])
+        return [{
+            "car_id": r["car_id"],
+            "status": r["status"],
+            "position": r["position"],
+            "enter_time": r["car"].enter_time
+        } for r in results]
+
+    def depart(self, car_ids):
+        """多辆车同时离开时使用 depart_many，整批离开后再补位"""
+        if len(car_ids) == 1:
+            result = self.engine.depart(car_ids[0])
+            results, entered = [result], result.get("entered", [])
+        else:
+            results, entered = self.engine.depart_many(car_ids)
+        departed = []
+        for r in results:
+            item = {"car_id": r["car_id"], "status": r["status"]}
+            if r["status"] == "SUCCESS":
+                item.update({
+                    "enter_time": r["enter_time"],
+                    "exit_time": r["exit_time"],
+                    "duration": r["duration"],
+                    "fee": r["fee"],
+                    "moved": len(r["moved_cars"])
+                })
+            departed.append(item)
+        return {
+            "results": departed,
+            "entered": [{"car_id": car.car_id, "position": position} for car, position in entered]
+        }
+
+    def locate(self, car_id):
+        parking_lot, waiting_lane = self.engine.parking_lot, self.engine.waiting_lane
+        slot = parking_lot.locate(car_id)
+        if slot is not None:
+            area, state = "PARKING", parking_lot.current_state()
+        else:
+            slot = waiting_lane.locate(car_id)
+            if slot is None:
+                return {"car_id": car_id, "status": "NOT_FOUND"}
+            area, state = "IN_SIDE_ROAD", waiting_lane.current_state()
+        enter_time = state[slot][1]
+        duration = self.engine.clock() - enter_time
+        return {
+            "car_id": car_id,
+            "status": area,
+            "position": slot + 1,
+            "enter_time": enter_time,
+            "duration": duration,
+            "fee": self.engine.billing.calculate_fee(duration, enter_time) if area == "PARKING" else 0.0
+        }
+
+    def status(self, cars=False):
+        parking_lot, waiting_lane = self.engine.parking_lot, self.engine.waiting_lane
+        parking = parking_lot.current_state()
+        waiting = waiting_lane.current_state()
+        status = {
+            "mode": "single",
+            "parking": {"count": len(parking), "capacity": parking_lot.capacity, "version": parking_lot.version},
+            "waiting": {"count": len(waiting), "capacity": waiting_lane.capacity, "version": waiting_lane.version}
+        }
+        if cars:
+            now = self.engine.clock()
+            enter_times = [enter_time for _, enter_time in parking]
+            fees, _ = self.engine.billing.calculate_fees([now - t for t in enter_times], enter_times)
+            status["parking"]["cars"] = [
+                {"car_id": car_id, "enter_time": enter_time, "fee": fee}
+                for (car_id, enter_time), fee in zip(parking, fees)
+            ]
+            status["waiting"]["cars"] = [
+                {"car_id": car_id, "arrival_time": enter_time} for car_id, enter_time in waiting
+            ]
+        return status
+
+    def history(self, **query):
+        return history_page(self.config, **query)
+
+class DualGate:
+    """双门系统闸口：通过 DualSystemAdapter 处理进出与查询"""
+    def __init__(self, config, adapter=None):
+        self.config = config
+        self.adapter = adapter or DualSystemAdapter(
+            config,
+            billing=Billing(config),
+            log_callback=lambda msg, level: None
+        )
+
+    def arrive(self, car_ids):
+        results = []
+        for car_id in car_ids:
+            status, position, enter_time = self.adapter.enter(Car(car_id, self.adapter.clock()))
+            results.append({
+                "car_id": car_id,
+                "status": status,
+                "position": position if status in ("PARKED", "IN_SIDE_ROAD") else None,
+                "enter_time": enter_time
+            })
+        return results
+
+    def depart(self, car_ids):
+        departed, entered = [], []
+        for car_id in car_ids:
+            if self.adapter.waiting_lane.is_car_exists(car_id):
+                departed.append({"car_id": car_id, "status": "IN_SIDE_ROAD"})
+                continue
+            status, data = self.adapter.leave(car_id)
+            if status != "SUCCESS":
+                departed.append({"car_id": car_id, "status": "NOT_FOUND" if status == "FAILURE" else status})
+                continue
+            result = data["departed"]
+            departed.append({
+                "car_id": car_id,
+                "status": status,
+                "enter_time": result["entry_time"],
+                "exit_time": result["exit_time"],
+                "duration": result["duration"],
+                "fee": self.adapter.billing.calculate_fee(result["duration"], result["entry_time"]),
+                "moved": result["move_cost"],
+                "exit": result["position"]
+            })
+            if "entered" in data:
+                car = data["entered"]["car"]
+                side, index, spot = self.adapter.parking_lot.find_car(car.car_id)
+                entered.append({"car_id": car.car_id, "position": spot["position"] if spot else None})
+        return {"results": departed, "entered": entered}
+
+    def locate(self, car_id):
+        side, index, spot = self.adapter.parking_lot.find_car(car_id)
+        now = self.adapter.clock()
+        if spot:
+            duration = now - spot["entry_time"]
+            exit_side, cost = self.adapter.optimizer.find_optimal_path(car_id)
+            return {
+                "car_id": car_id,
+                "status": "PARKING",
+                "position": spot["position"],
+                "enter_time": spot["entry_time"],
+                "duration": duration,
+                "fee": self.adapter.billing.calculate_fee(duration, spot["entry_time"]),
+                "exit": exit_side,
+                "exit_cost": cost
+            }
+        lane = self.adapter.waiting_lane
+        for queue in (lane.north_queue, lane.south_queue):
+            for item in queue:
+                if item["car"].car_id == car_id:
+                    return {
+                        "car_id": car_id,
+                        "status": "IN_SIDE_ROAD",
+                        "position": item["position"],
+                        "enter_time": item["arrival_time"],
+                        "duration": now - item["arrival_time"],
+                        "fee": 0.0
+                    }
+        return {"car_id": car_id, "status": "NOT_FOUND"}
+
+    def status(self, cars=False):
+        parking_lot, waiting_lane = self.adapter.parking_lot, self.adapter.waiting_lane
+        status = {
+            "mode": "dual",
+            "parking": {
+                "count": parking_lot.occupied,
+                "capacity": parking_lot.total_spots,
+                "north": len(parking_lot.north_stack),
+                "south": len(parking_lot.south_stack),
+                "version": parking_lot.version
+            },
+            "waiting": {
+                "count": waiting_lane.get_waiting_count(),
+                "capacity": waiting_lane.capacity,
+                "north": waiting_lane.get_waiting_count("north"),
+                "south": waiting_lane.get_waiting_count("south"),
+                "version": waiting_lane.version
+            }
+        }
+        if cars:
+            now = self.adapter.clock()
+            billing = self.adapter.billing
+            status["parking"]["cars"] = [
+                {
+                    "car_id": spot["car"].car_id,
+                    "position": spot["position"],
+                    "enter_time": spot["entry_time"],
+                    "fee": billing.calculate_fee(now - spot["entry_time"], spot["entry_time"])
+                }
+                for spot in parking_lot.north_stack + parking_lot.south_stack
+            ]
+            status["waiting"]["cars"] = [
+                {"car_id": item["car"].car_id, "position": item["position"], "arrival_time": item["arrival_time"]}
+                for item in waiting_lane.north_queue + waiting_lane.south_queue
+            ]
+        return status
+
+    def history(self, **query):
+        return history_page(self.config, **query)
+
+def create_gate(config, mode="single"):
+    """按模式创建闸口对象"""
+    if mode == "dual":
+        return DualGate(config)
+    return SingleGate(config)
@@ -0,0 +1,253 @@
+# gateway/lots.py
+
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from core.config import Config
+from gateway.gate import MAX_HISTORY_LIMIT, create_gate
+
+# 汇总状态/历史时等待单个停车场的默认超时（秒），超时的停车场标记为不可用，不拖慢其他停车场
+AGGREGATE_TIMEOUT = 5.0
+# 工作进程接受的停车场操作
+OPERATIONS = frozenset(["arrive", "depart", "locate", "status", "history"])
+
+def lot_config(spec):
+    """按停车场配置创建 Config（在工作进程中调用）"""
+    config = Config(history_file=spec.get("history_file"), history_backend=spec.get("history_backend", "jsonl"))
+    config.parking_capacity = spec.get("capacity", config.parking_capacity)
+    config.waiting_capacity = spec.get("waiting", config.waiting_capacity)
+    config.parking_engine = spec.get("engine", config.parking_engine)
+    return config
+
+def serve_lots(conn, specs):
+    """工作进程：托管若干个独立的停车场，按顺序执行收到的命令
+
+    每条消息为命令列表 [(序号, 停车场编号, 操作, 位置参数, 关键字参数)]，
+    执行后按相同顺序回复 [(序号, 是否成功, 结果或错误信息)]。
+    """
+    gates = {spec["lot_id"]: create_gate(lot_config(spec), spec.get("mode", "single")) for spec in specs}
+    try:
+        while True:
+            try:
+                batch = conn.recv()
+            except EOFError:
+                break
+            if batch is None:
+                break
+            replies = []
+            for seq, lot_id, op, args, kwargs in batch:
+                try:
+                    if op not in OPERATIONS:
+                        raise ValueError(f"不支持的操作: {op}")
+                    replies.append((seq, True, getattr(gates[lot_id], op)(*args, **kwargs)))
+                except Exception as e:
+                    replies.append((seq, False, f"{type(e).__name__}: {e}"))
+            conn.send(replies)
+    finally:
+        for gate in gates.values():
+            gate.config.close_history()
+
+class LotError(Exception):
+    """停车场工作进程中执行命令失败"""
+
+class Shard:
+    """一个工作进程及其连接：发送加锁，由后台线程接收回复并完成对应的 Future"""
+    def __init__(self, context, specs, name):
+        self.lot_ids = [spec["lot_id"] for spec in specs]
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=serve_lots, args=(child, specs), name=name, daemon=True)
+        self.process.start()
+        child.close()
+        self.pending = {}  # 序号 -> Future
+        self.send_lock = threading.Lock()
+        self.receiver = threading.Thread(target=self.receive, name=f"{name}-receiver", daemon=True)
+        self.receiver.start()
+
+    def send(self, commands):
+        """发送 [(序号, 停车场编号, 操作, 位置参数, 关键字参数)]，返回对应的 Future 列表"""
+        futures = []
+        with self.send_lock:
+            for command in commands:
+                future = Future()
+                self.pending[command[0]] = future
+                futures.append(future)
+            try:
+                self.conn.send(commands)
+            except (OSError, ValueError) as e:
+                for command in commands:
+                    self.pending.pop(command[0]).set_exception(LotError(f"工作进程不可用: {e}"))
+        return futures
+
+    def receive(self):
+        while True:
+            try:
+                replies = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            for seq, ok, result in replies:
+                future = self.pending.pop(seq, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(LotError(result))
+        # 工作进程退出后，未完成的命令全部失败
+        for seq in list(self.pending):
+            future = self.pending.pop(seq, None)
+            if future is not None and not future.done():
+                future.set_exception(LotError("工作进程已退出"))
+
+    def close(self, timeout=None):
+        with self.send_lock:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.receiver.join(timeout)
+
+class LotCoordinator:
+    """多停车场协调器
+
+    每个停车场是一个独立的引擎（单门 SingleGate 或双门 DualGate），按轮转分配到
+    若干个工作进程中，命令按停车场编号路由到所在进程并在其中按顺序执行。
+    不同进程中的停车场并行运行，吞吐随 CPU 核数增加；某个停车场处理缓慢时
+    只影响同一进程中的停车场（processes 等于停车场数时完全隔离）。
+    汇总状态与历史时并发查询各停车场，超时的停车场单独标记，不等待它。
+
+    lots 为停车场配置列表，每项为停车场编号或字典：
+    {"lot_id", "capacity", "waiting", "engine", "mode", "history_file", "history_backend"}。
+    """
+    def __init__(self, lots, processes=None):
+        specs = [lot if isinstance(lot, dict) else {"lot_id": lot} for lot in lots]
+        if len({spec["lot_id"] for spec in specs}) != len(specs):
+            raise ValueError("停车场编号重复")
+        processes = max(1, min(processes or os.cpu_count() or 1, len(specs)))
+        # 使用 spawn 启动工作进程，避免复制界面进程中的 Tk 与线程状态
+        context = multiprocessing.get_context("spawn")
+        self.lot_ids = [spec["lot_id"] for spec in specs]
+        self.shards = [Shard(context, specs[i::processes], f"lot-worker-{i}") for i in range(processes)]
+        self.routes = {lot_id: shard for shard in self.shards for lot_id in shard.lot_ids}
+        self.counter = itertools.count(1)
+        self.closed = False
+
+    def shard_for(self, lot_id):
+        try:
+            return self.routes[lot_id]
+        except KeyError:
+            raise KeyError(f"未知停车场: {lot_id}")
+
+    def submit(self, lot_id, op, *args, **kwargs):
+        """异步执行停车场 lot_id 的操作 op（arrive / depart / locate / status / history），返回 Future"""
+        if self.closed:
+            raise RuntimeError("协调器已关闭")
+        return self.shard_for(lot_id).send([(next(self.counter), lot_id, op, args, kwargs)])[0]
+
+    def submit_many(self, commands):
+        """批量提交 [(停车场编号, 操作, 位置参数)]，同一进程的命令合并为一条消息，返回 Future 列表"""
+        if self.closed:
+            raise RuntimeError("协调器已关闭")
+        grouped = {}
+        order = []
+        for lot_id, op, args in commands:
+            shard = self.shard_for(lot_id)
+            command = (next(self.counter), lot_id, op, tuple(args), {})
+            grouped.setdefault(shard, []).append(command)
+            order.append((shard, len(grouped[shard]) - 1))
+        sent = {shard: shard.send(batch) for shard, batch in grouped.items()}
+        return [sent[shard][i] for shard, i in order]
+
+    def call(self, lot_id, op, *args, timeout=None, **kwargs):
+        """同步执行并返回结果，失败时抛出 LotError"""
+        return self.submit(lot_id, op, *args, **kwargs).result(timeout)
+
+    def arrive(self, lot_id, car_ids, timeout=None):
+        return self.call(lot_id, "arrive", list(car_ids), timeout=timeout)
+
+    def depart(self, lot_id, car_ids, timeout=None):
+        return self.call(lot_id, "depart", list(car_ids), timeout=timeout)
+
+    def locate(self, lot_id, car_id, timeout=None):
+        return self.call(lot_id, "locate", car_id, timeout=timeout)
+
+    def gather(self, op, *args, timeout=AGGREGATE_TIMEOUT, **kwargs):
+        """向全部停车场提交同一操作，返回 {停车场编号: 结果}，失败或超时的为 {"error": 原因}"""
+        futures = {lot_id: self.submit(lot_id, op, *args, **kwargs) for lot_id in self.lot_ids}
+        deadline = time.monotonic() + timeout
+        results = {}
+        for lot_id, future in futures.items():
+            try:
+                results[lot_id] = future.result(max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                results[lot_id] = {"error": "超时"}
+            except LotError as e:
+                results[lot_id] = {"error": str(e)}
+        return results
+
+    def find(self, car_id, timeout=AGGREGATE_TIMEOUT):
+        """在全部停车场中查找车辆，返回 (停车场编号, 定位结果)，未找到时返回 (None, None)"""
+        for lot_id, result in self.gather("locate", car_id, timeout=timeout).items():
+            if result.get("status") in ("PARKING", "IN_SIDE_ROAD"):
+                return lot_id, result
+        return None, None
+
+    def status(self, cars=False, timeout=AGGREGATE_TIMEOUT):
+        """汇总各停车场状态：{"lots": {编号: 状态}, "parking": 合计, "waiting": 合计, "unavailable": [编号]}"""
+        lots = self.gather("status", cars, timeout=timeout)
+        total = {"lots": lots, "unavailable": [], "parking": {"count": 0, "capacity": 0},
+                 "waiting": {"count": 0, "capacity": 0}}
+        for lot_id, status in lots.items():
+            if "error" in status:
+                total["unavailable"].append(lot_id)
+                continue
+            for area in ("parking", "waiting"):
+                total[area]["count"] += status[area]["count"]
+                total[area]["capacity"] += status[area]["capacity"]
+        return total
+
+    def history(self, car_id=None, plate_prefix=None, start=None, end=None, sort="exit_time",
+                descending=True, offset=0, limit=100, timeout=AGGREGATE_TIMEOUT):
+        """跨停车场查询历史记录
+
+        各停车场分别取出前 offset + limit 条（按 sort 排序），再按同一键归并后分页，
+        记录带 lot_id 字段。各停车场的写入序号互不相关，sort 为 ordinal 时按离开时间归并。
+        """
+        if offset + limit > MAX_HISTORY_LIMIT:
+            raise ValueError(f"跨停车场查询的 offset + limit 不能超过 {MAX_HISTORY_LIMIT}，请缩小时间范围")
+        if sort == "ordinal":
+            sort = "exit_time"
+        query = {"car_id": car_id, "plate_prefix": plate_prefix, "start": start, "end": end,
+                 "sort": sort, "descending": descending, "offset": 0, "limit": offset + limit}
+        pages = self.gather("history", timeout=timeout, **query)
+        streams, total, unavailable = [], 0, []
+        for lot_id, page in pages.items():
+            if "error" in page:
+                unavailable.append(lot_id)
+                continue
+            total += page["total"]
+            # 各停车场已按 sort / descending 排序后再截取（包括精确车牌查询），可直接归并
+            streams.append([dict(record, lot_id=lot_id) for record in page["records"]])
+        merged = heapq.merge(*streams, key=lambda record: record[sort], reverse=descending)
+        return {
+            "total": total,
+            "offset": offset,
+            "records": list(itertools.islice(merged, offset, offset + limit)),
+            "unavailable": unavailable
+        }
+
+    def close(self, timeout=5.0):
+        """通知各工作进程写完历史记录后退出，可重复调用"""
+        if self.closed:
+            return
+        self.closed = True
+        for shard in self.shards:
+            shard.close(timeout)
@@ -0,0 +1,107 @@
+# gateway/protocol.py
+
+import asyncio
+import json
+from urllib.parse import parse_qsl, urlsplit
+
+# 请求头与请求体的大小上限（字节）
+MAX_HEADER_SIZE = 16 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable"
+}
+
+class ProtocolError(Exception):
+    """请求格式错误，status 为应返回的状态码"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Request:
+    """一个已解析的 HTTP 请求"""
+    __slots__ = ("method", "path", "query", "headers", "body", "keep_alive")
+
+    def __init__(self, method, path, query, headers, body, keep_alive):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.keep_alive = keep_alive
+
+    def json(self):
+        """请求体解析为 JSON 对象，没有请求体时返回空字典"""
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError as e:
+            raise ProtocolError(400, f"请求体不是有效的 JSON: {e}")
+        if not isinstance(data, dict):
+            raise ProtocolError(400, "请求体应为 JSON 对象")
+        return data
+
+async def read_request(reader):
+    """从连接读取一个请求，连接在请求之间关闭时返回 None
+
+    同一连接上的请求按顺序逐个读取，客户端可以不等响应连续发送多个请求（流水线），
+    未读取的请求留在连接的缓冲区中。
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise ProtocolError(400, "请求不完整")
+        return None
+    except asyncio.LimitOverrunError:
+        raise ProtocolError(413, "请求头过大")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise ProtocolError(400, f"无效的请求行: {lines[0][:100]}")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    if "content-length" in headers:
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise ProtocolError(400, "无效的 Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise ProtocolError(413, "请求体过大")
+        try:
+            body = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise ProtocolError(400, "请求体不完整")
+    elif "chunked" in headers.get("transfer-encoding", ""):
+        raise ProtocolError(400, "不支持分块传输，请提供 Content-Length")
+
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.1":
+        keep_alive = connection != "close"
+    else:
+        keep_alive = connection == "keep-alive"
+    url = urlsplit(target)
+    return Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers, body, keep_alive)
+
+def encode_response(status, data, keep_alive=True):
+    """把 JSON 数据编码为完整的 HTTP 响应"""
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
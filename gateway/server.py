@@ -0,0 +1,302 @@
+# gateway/server.py
+
+import asyncio
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from core.history import SqliteHistoryStore
+from core.metrics import metrics
+from gateway.gate import history_page
+from gateway.protocol import ProtocolError, encode_response, read_request
+from utils.time_utils import str_to_timestamp
+
+# 引擎任务每批最多执行的命令数，执行完一批后让出事件循环处理网络读写
+BATCH_LIMIT = 256
+# 每个连接最多未响应的流水线请求数，超过后暂停读取该连接
+MAX_PIPELINE = 128
+# 一次请求最多处理的车辆数
+MAX_CARS = 1000
+
+def car_ids_param(params):
+    """读取 car_id（单辆）或 car_ids（多辆）参数"""
+    if "car_ids" in params:
+        car_ids = params["car_ids"]
+        if isinstance(car_ids, str):
+            car_ids = [c for c in car_ids.split(",") if c]
+    elif "car_id" in params:
+        car_ids = [params["car_id"]]
+    else:
+        raise ProtocolError(400, "缺少 car_id 或 car_ids")
+    if not isinstance(car_ids, list) or not car_ids:
+        raise ProtocolError(400, "car_ids 应为非空列表")
+    if len(car_ids) > MAX_CARS:
+        raise ProtocolError(400, f"一次最多处理 {MAX_CARS} 辆车")
+    for car_id in car_ids:
+        if not isinstance(car_id, str) or not car_id.strip():
+            raise ProtocolError(400, "车牌号应为非空字符串")
+    return [car_id.strip() for car_id in car_ids]
+
+def int_param(params, name, default):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ProtocolError(400, f"{name} 应为整数")
+    if value < 0:
+        raise ProtocolError(400, f"{name} 不能为负数")
+    return value
+
+def bool_param(params, name, default=False):
+    value = params.get(name, default)
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+def time_param(params, name):
+    """时间参数：时间戳或 "YYYY-MM-DD[ HH:MM[:SS]]" 字符串"""
+    value = params.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return str_to_timestamp(str(value))
+    except ValueError as e:
+        raise ProtocolError(400, str(e))
+
+class GateServer:
+    """闸口 HTTP/JSON 服务（asyncio，单线程）
+
+    每个连接由一个读取协程解析请求，解析出的命令放入全局命令队列，
+    并把对应的 future 按请求顺序放入该连接的待响应队列；写回协程按顺序
+    等待这些 future 并写回响应，因此客户端可以不等响应连续发送请求（流水线），
+    响应顺序与请求顺序一致。
+
+    只有引擎任务执行命令（单写者）：命令按进入队列的顺序逐条执行，
+    并发连接的请求不会交错修改停车场状态，每个查询看到的都是此前
+    全部命令执行完后的状态。引擎任务一次取出队列中已有的命令成批执行，
+    每批之间让出事件循环。
+
+    历史记录查询只读文件，不进入引擎任务：等此前的命令执行完后，在单独的
+    读取线程中查询历史记录的只读副本（Config.history_reader），大范围的
+    查询不会阻塞事件循环与进出命令。仅内存的历史记录没有只读副本，仍由
+    引擎任务查询。
+    """
+    ROUTES = {
+        ("POST", "/arrive"): "arrive",
+        ("POST", "/depart"): "depart",
+        ("GET", "/locate"): "locate",
+        ("GET", "/status"): "status",
+        ("GET", "/history"): "history",
+        ("GET", "/metrics"): "metrics"
+    }
+
+    def __init__(self, gate, host="127.0.0.1", port=8080):
+        self.gate = gate
+        self.host = host
+        self.port = port
+        self.server = None
+        self.commands = None
+        self.engine_task = None
+        self.history_reader = None    # 历史记录只读副本，只在读取线程中使用
+        self.history_executor = None  # 历史记录读取线程
+        self.connections = set()
+        self.executed = 0  # 已执行的命令数
+        self.batches = 0   # 引擎任务执行的批次数
+
+    async def start(self):
+        """开始监听（port 为 0 时由系统分配端口，启动后写回 self.port）"""
+        self.commands = asyncio.Queue()
+        self.engine_task = asyncio.create_task(self.run_engine())
+        self.history_reader = self.gate.config.history_reader()
+        if self.history_reader is not None:
+            self.history_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gate-history")
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """停止监听，执行完已接收的命令后结束引擎任务"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in list(self.connections):
+            task.cancel()
+        if self.engine_task is not None:
+            self.commands.put_nowait(None)
+            await self.engine_task
+            self.engine_task = None
+        if self.history_executor is not None:
+            self.history_executor.shutdown()
+            self.history_executor = None
+            if isinstance(self.history_reader.store, SqliteHistoryStore):
+                self.history_reader.store.close()
+            self.history_reader = None
+
+    async def run_engine(self):
+        """单写者引擎任务：按顺序执行命令并设置对应 future 的结果"""
+        while True:
+            batch = [await self.commands.get()]
+            while len(batch) < BATCH_LIMIT and not self.commands.empty():
+                batch.append(self.commands.get_nowait())
+            self.batches += 1
+            for item in batch:
+                if item is None:
+                    return
+                func, args, future = item
+                try:
+                    result = func(*args)
+                except Exception as e:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                else:
+                    if not future.cancelled():
+                        future.set_result(result)
+                self.executed += 1
+            await asyncio.sleep(0)
+
+    def submit(self, func, *args):
+        """把命令放入引擎队列，返回结果的 future"""
+        future = asyncio.get_running_loop().create_future()
+        self.commands.put_nowait((func, args, future))
+        return future
+
+    def dispatch(self, request):
+        """按路由解析参数并提交命令"""
+        route = self.ROUTES.get((request.method, request.path))
+        if route is None:
+            if any(path == request.path for _, path in self.ROUTES):
+                raise ProtocolError(405, f"不支持的请求方法: {request.method}")
+            raise ProtocolError(404, f"未知路径: {request.path}")
+        params = dict(request.query)
+        if request.method == "POST":
+            params.update(request.json())
+
+        gate = self.gate
+        if route == "arrive":
+            car_ids = car_ids_param(params)
+            return self.submit(lambda: self.one_or_many(params, gate.arrive(car_ids)))
+        if route == "depart":
+            return self.submit(gate.depart, car_ids_param(params))
+        if route == "locate":
+            car_id = params.get("car_id", "").strip()
+            if not car_id:
+                raise ProtocolError(400, "缺少 car_id")
+            return self.submit(gate.locate, car_id)
+        if route == "status":
+            return self.submit(gate.status, bool_param(params, "cars"))
+        if route == "metrics":
+            return self.submit(metrics.query, params.get("prefix") or None)
+        query = {
+            "car_id": params.get("car_id") or None,
+            "plate_prefix": params.get("plate_prefix") or None,
+            "start": time_param(params, "start"),
+            "end": time_param(params, "end"),
+            "sort": params.get("sort", "ordinal"),
+            "descending": bool_param(params, "descending", True),
+            "offset": int_param(params, "offset", 0),
+            "limit": int_param(params, "limit", 100)
+        }
+        if self.history_reader is None:
+            return self.submit(lambda: gate.history(**query))
+        return asyncio.ensure_future(self.read_history(query))
+
+    async def read_history(self, query):
+        """等此前提交的命令执行完（其离开记录已交给写入线程）后，在读取线程中查询"""
+        await self.submit(lambda: None)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.history_executor, self.query_history, query)
+
+    def query_history(self, query):
+        """（读取线程）等待后台写入完成，再从只读副本分页查询"""
+        self.gate.config.flush_history()
+        return history_page(self.history_reader, **query)
+
+    @staticmethod
+    def one_or_many(params, results):
+        """按 car_id 提交时直接返回单个结果，按 car_ids 提交时返回结果列表"""
+        if "car_ids" in params:
+            return {"results": results}
+        return results[0]
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        pending = asyncio.Queue(MAX_PIPELINE)
+        responder = asyncio.create_task(self.respond(pending, writer))
+        try:
+            while not responder.done():
+                try:
+                    request = await read_request(reader)
+                except ProtocolError as e:
+                    # 请求格式错误后无法确定下一个请求的边界，回复错误后关闭连接
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_exception(e)
+                    await pending.put((future, False))
+                    break
+                if request is None:
+                    break
+                try:
+                    future = self.dispatch(request)
+                except ProtocolError as e:
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_exception(e)
+                await pending.put((future, request.keep_alive))
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if not responder.done():
+                await pending.put(None)
+                try:
+                    await responder
+                except asyncio.CancelledError:
+                    pass
+            writer.close()
+            self.connections.discard(task)
+
+    async def respond(self, pending, writer):
+        """按请求顺序写回响应；待响应队列暂时为空时才等待发送缓冲区排空"""
+        broken = False
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            future, keep_alive = item
+            try:
+                status, data = 200, await future
+            except ProtocolError as e:
+                status, data = e.status, {"error": str(e)}
+            except ValueError as e:
+                status, data = 400, {"error": str(e)}
+            except Exception as e:
+                traceback.print_exc()
+                status, data = 500, {"error": f"服务器内部错误: {e}"}
+            if broken:
+                # 连接已断开，只取出剩余的待响应项，避免读取协程在队列满时阻塞
+                continue
+            try:
+                writer.write(encode_response(status, data, keep_alive))
+                if pending.empty() or not keep_alive:
+                    await writer.drain()
+            except ConnectionError:
+                broken = True
+            if not keep_alive:
+                break
+
+async def serve(gate, host="127.0.0.1", port=8080):
+    """启动服务并一直运行"""
+    server = GateServer(gate, host, port)
+    await server.start()
+    print(f"闸口服务已启动: http://{server.host}:{server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
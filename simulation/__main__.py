@@ -0,0 +1,57 @@
+# simulation/__main__.py
+"""无界面停车场仿真
+
+用法（在项目根目录执行）:
+    python -m simulation --cars 100000 --capacity 500 --waiting 50
+    python -m simulation --mode dual --optimize-interval 60
+    python -m simulation --log gate_log.csv --engine fenwick
+"""
+
+import argparse
+from core.config import Config
+from simulation.simulator import Simulator, generate_traffic, load_gate_log
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="停车场离散事件仿真")
+    parser.add_argument("--mode", choices=["single", "dual"], default="single", help="单门/双门系统")
+    parser.add_argument("--engine", default="stack", help="单门停车场引擎: stack / fenwick / compact")
+    parser.add_argument("--capacity", type=int, default=500, help="停车场容量")
+    parser.add_argument("--waiting", type=int, default=50, help="便道容量")
+    parser.add_argument("--cars", type=int, default=100000, help="随机生成的车辆数")
+    parser.add_argument("--interval", type=float, default=6.0, help="平均到达间隔（秒）")
+    parser.add_argument("--stay", type=float, default=3600.0, help="平均停留时长（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--log", help="回放闸口日志CSV（时间戳,动作,车牌号），指定后不再随机生成")
+    parser.add_argument("--optimize-interval", type=float, default=0, help="双门系统优化间隔（虚拟秒），0为不优化")
+    args = parser.parse_args(argv)
+
+    config = Config(history_file=None)
+    config.parking_capacity = args.capacity
+    config.waiting_capacity = args.waiting
+    config.parking_engine = args.engine
+
+    sim = Simulator(config, mode=args.mode)
+    if args.log:
+        count = load_gate_log(sim, args.log)
+        print(f"已读取闸口事件 {count} 条")
+        start = sim.queue[0][0] if sim.queue else 0.0
+        end = max(event[0] for event in sim.queue) if sim.queue else 0.0
+    else:
+        start = 0.0
+        end = generate_traffic(sim, args.cars, start, args.interval, args.stay, args.seed)
+    if args.mode == "dual" and args.optimize_interval > 0:
+        sim.schedule_optimizer(start, end, args.optimize_interval)
+
+    stats = sim.run()
+    print(f"事件数: {stats['events']}")
+    print(f"耗时: {stats['elapsed']:.3f} 秒")
+    print(f"吞吐量: {stats['events_per_second']:.0f} 事件/秒")
+    if stats["elapsed"] > 0:
+        speedup = stats["virtual_seconds"] / stats["elapsed"]
+        print(f"虚拟时长: {stats['virtual_seconds'] / 86400:.2f} 天（加速比 {speedup:.0f}x）")
+    print(f"历史记录: {len(config.history)} 条")
+    for (kind, outcome), count in sorted(stats["outcomes"].items(), key=lambda item: str(item[0])):
+        print(f"  {kind:<9}{str(outcome):<14}{count}")
+
+if __name__ == "__main__":
+    main()
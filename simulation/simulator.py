@@ -0,0 +1,153 @@
+# simulation/simulator.py
+
+import csv
+import heapq
+import random
+import time
+from core.billing import Billing
+from core.clock import VirtualClock
+from core.config import Config
+from core.engine import ParkingEngine
+from core.parking import Car
+from extension.dual_exit.adapter import DualSystemAdapter
+
+ARRIVE = "arrive"
+DEPART = "depart"
+OPTIMIZE = "optimize"
+
+class SingleExitTarget:
+    """单门系统仿真对象：通过 ParkingEngine 驱动 ParkingLot 与 WaitingLane"""
+    def __init__(self, config, clock):
+        self.engine = ParkingEngine(config, clock=clock)
+
+    def arrive(self, car_id, now):
+        return self.engine.arrive(Car(car_id, now))["status"]
+
+    def depart(self, car_id, now):
+        return self.engine.depart(car_id, now)["status"]
+
+    def optimize(self):
+        return False
+
+class DualExitTarget:
+    """双门系统仿真对象：通过 DualSystemAdapter 驱动 DualExitParkingLot 与 DualWaitingLane"""
+    def __init__(self, config, clock):
+        self.adapter = DualSystemAdapter(
+            config,
+            billing=Billing(config, clock),
+            log_callback=lambda msg, level: None,
+            clock=clock
+        )
+
+    def arrive(self, car_id, now):
+        return self.adapter.enter(Car(car_id, now))[0]
+
+    def depart(self, car_id, now):
+        if self.adapter.waiting_lane.is_car_exists(car_id):
+            return "IN_SIDE_ROAD"
+        return self.adapter.leave(car_id)[0]
+
+    def optimize(self):
+        return self.adapter.optimizer.optimize_system()[0]
+
+class Simulator:
+    """离散事件仿真器
+
+    事件按 (时间, 序号) 存放在堆中，依次弹出并把虚拟时钟拨到事件时间，
+    再交给单门或双门系统处理；全过程不涉及 Tk 界面和真实时间。
+    """
+    def __init__(self, config=None, mode="single", clock=None, retry_delay=300.0):
+        self.config = config or Config(history_file=None)
+        self.clock = clock or VirtualClock()
+        if mode == "dual":
+            self.target = DualExitTarget(self.config, self.clock)
+        else:
+            self.target = SingleExitTarget(self.config, self.clock)
+        self.retry_delay = retry_delay  # 便道中车辆的离开事件顺延秒数
+        self.queue = []
+        self.seq = 0
+        self.outcomes = {}  # (事件类型, 处理结果) -> 次数
+        self.processed = 0
+        self.start_time = None  # 第一个事件的虚拟时间
+
+    def schedule(self, timestamp, kind, car_id=None):
+        """加入一个事件"""
+        heapq.heappush(self.queue, (timestamp, self.seq, kind, car_id))
+        self.seq += 1
+
+    def schedule_optimizer(self, start, end, interval):
+        """在 [start, end) 内每隔 interval 秒安排一次双门系统优化"""
+        t = start
+        while t < end:
+            self.schedule(t, OPTIMIZE)
+            t += interval
+
+    def step(self):
+        """处理一个事件，队列为空时返回False"""
+        if not self.queue:
+            return False
+        timestamp, _, kind, car_id = heapq.heappop(self.queue)
+        if self.start_time is None:
+            self.start_time = timestamp
+        self.clock.set(timestamp)
+        now = self.clock()
+        if kind == ARRIVE:
+            outcome = self.target.arrive(car_id, now)
+        elif kind == DEPART:
+            outcome = self.target.depart(car_id, now)
+            if outcome == "IN_SIDE_ROAD":
+                # 仍在便道等待的车辆稍后再离开
+                self.schedule(now + self.retry_delay, DEPART, car_id)
+        else:
+            outcome = self.target.optimize()
+        key = (kind, outcome)
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+        self.processed += 1
+        return True
+
+    def run(self, until=None):
+        """运行仿真直到队列为空或虚拟时间超过 until，返回统计信息"""
+        start = time.perf_counter()
+        processed = self.processed
+        while self.queue:
+            if until is not None and self.queue[0][0] > until:
+                break
+            self.step()
+        elapsed = time.perf_counter() - start
+        events = self.processed - processed
+        return {
+            "events": events,
+            "elapsed": elapsed,
+            "events_per_second": events / elapsed if elapsed > 0 else float("inf"),
+            "virtual_seconds": self.clock() - self.start_time if self.start_time is not None else 0.0,
+            "outcomes": dict(self.outcomes)
+        }
+
+def generate_traffic(simulator, cars, start=0.0, mean_interval=30.0, mean_stay=3600.0, seed=None):
+    """生成泊松到达、指数分布停留时长的随机车流"""
+    rng = random.Random(seed)
+    t = start
+    for i in range(cars):
+        t += rng.expovariate(1.0 / mean_interval)
+        car_id = f"SIM{i:07d}"
+        simulator.schedule(t, ARRIVE, car_id)
+        simulator.schedule(t + rng.expovariate(1.0 / mean_stay), DEPART, car_id)
+    return t
+
+def load_gate_log(simulator, path):
+    """读取闸口日志CSV（时间戳,动作,车牌号；动作为 arrive/depart）并加入事件队列"""
+    count = 0
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            try:
+                timestamp = float(row[0])
+            except ValueError:
+                continue  # 跳过表头
+            kind = row[1].strip().lower()
+            if kind not in (ARRIVE, DEPART):
+                continue
+            simulator.schedule(timestamp, kind, row[2].strip())
+            count += 1
+    return count
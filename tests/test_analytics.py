@@ -0,0 +1,61 @@
+# tests/test_analytics.py
+"""统计分桶的本地小时/日起点在夏令时切换前后的换算
+
+运行（在项目根目录执行）:
+    python -m unittest discover tests
+"""
+
+import os
+import time
+import unittest
+
+from core.analytics import HistoryAnalytics, day_start, hour_start, local_day, local_hour
+
+
+@unittest.skipUnless(hasattr(time, "tzset"), "需要 time.tzset 切换时区")
+class BucketStartTest(unittest.TestCase):
+    """America/New_York：2024-03-10 02:00 拨快一小时，2024-11-03 02:00 拨回一小时"""
+
+    def setUp(self):
+        self.saved_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/New_York"
+        time.tzset()
+
+    def tearDown(self):
+        if self.saved_tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self.saved_tz
+        time.tzset()
+
+    def test_bucket_starts_around_transitions(self):
+        for day in ((2024, 3, 9), (2024, 11, 2)):
+            base = time.mktime(day + (0, 0, 0, 0, 0, -1))
+            for t in range(int(base), int(base) + 3 * 86400, 900):
+                start = hour_start(local_hour(t))
+                self.assertLessEqual(start, t)
+                self.assertEqual(local_hour(start), local_hour(t))
+                start = day_start(local_day(t))
+                self.assertLessEqual(start, t)
+                self.assertEqual(time.localtime(start)[:6], time.localtime(t)[:3] + (0, 0, 0))
+
+    def test_repeated_hour_starts_at_first_occurrence(self):
+        first = time.mktime((2024, 11, 3, 1, 0, 0, 0, 0, 1))
+        self.assertEqual(hour_start(local_hour(first + 3600 + 60)), first)
+
+
+class DailyDwellRetentionTest(unittest.TestCase):
+    def test_keeps_recent_days_only(self):
+        analytics = HistoryAnalytics(dwell_days=3)
+        base = 1.7e9
+        for day in range(10):
+            analytics.add({"enter_time": base + day * 86400, "exit_time": base + day * 86400 + 600, "fee": 1.0})
+        # 保留天数之前的记录只计入总体统计
+        analytics.add({"enter_time": base, "exit_time": base + 600, "fee": 1.0})
+        self.assertEqual(len(analytics.daily_dwell), 3)
+        self.assertEqual(analytics.dwell.count, 11)
+        self.assertEqual(len(analytics.days), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
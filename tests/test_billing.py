@@ -0,0 +1,83 @@
+# tests/test_billing.py
+"""分时段计费在夏令时切换前后按实际停留时间计费
+
+运行（在项目根目录执行）:
+    python -m unittest discover tests
+"""
+
+import os
+import random
+import time
+import unittest
+
+from core.billing import NUMPY_SUPPORTED, Tariff
+
+if NUMPY_SUPPORTED:
+    import numpy as np
+
+DEFINITION = {"free_minutes": 0, "periods": [["07:00", 6.0], ["22:00", 2.0]], "daily_cap": 0}
+
+
+def rate_at(timestamp):
+    """timestamp 所在本地时刻的每小时费率"""
+    local = time.localtime(timestamp)
+    return 6.0 if 7 <= local.tm_hour < 22 else 2.0
+
+
+def expected_fee(enter_time, exit_time, daily_cap):
+    """逐分钟累计实际停留时间的费用，每24小时封顶"""
+    total = 0.0
+    window_start = enter_time
+    while window_start < exit_time:
+        window_end = min(exit_time, window_start + 86400)
+        raw = sum(rate_at(minute) / 60 for minute in range(window_start, window_end, 60))
+        total += min(daily_cap, raw) if daily_cap else raw
+        window_start = window_end
+    return total
+
+
+@unittest.skipUnless(hasattr(time, "tzset"), "需要 time.tzset 切换时区")
+class DaylightSavingTest(unittest.TestCase):
+    """America/New_York：2024-03-10 02:00 拨快一小时，2024-11-03 02:00 拨回一小时"""
+
+    def setUp(self):
+        self.saved_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/New_York"
+        time.tzset()
+        rng = random.Random(1)
+        self.stays = []
+        for day in ((2024, 3, 10), (2024, 11, 3)):
+            transition = int(time.mktime(day + (3, 0, 0, 0, 0, -1)))
+            for _ in range(40):
+                enter_time = transition - rng.randrange(1, 2 * 1440) * 60
+                self.stays.append((enter_time, transition + rng.randrange(1, 2 * 1440) * 60))
+
+    def tearDown(self):
+        if self.saved_tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self.saved_tz
+        time.tzset()
+
+    def check(self, daily_cap):
+        tariff = Tariff(dict(DEFINITION, daily_cap=daily_cap))
+        expected = [expected_fee(enter_time, exit_time, daily_cap) for enter_time, exit_time in self.stays]
+        for (enter_time, exit_time), fee in zip(self.stays, expected):
+            self.assertAlmostEqual(tariff.fee(enter_time, exit_time), fee, places=6)
+            windows = tariff.breakdown(enter_time, exit_time)[1]
+            self.assertAlmostEqual(sum(charged for _, charged in windows), fee, places=6)
+        if NUMPY_SUPPORTED:
+            enter_times = np.array([enter_time for enter_time, _ in self.stays], dtype=np.float64)
+            exit_times = np.array([exit_time for _, exit_time in self.stays], dtype=np.float64)
+            for fee, batch_fee in zip(expected, tariff.fees(enter_times, exit_times).tolist()):
+                self.assertAlmostEqual(batch_fee, fee, places=6)
+
+    def test_uncapped(self):
+        self.check(0)
+
+    def test_daily_cap(self):
+        self.check(60.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
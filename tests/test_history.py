@@ -0,0 +1,145 @@
+# tests/test_history.py
+"""JSON Lines 历史记录在写入中断（留下半行）后的下标访问与分页查询
+
+运行（在项目根目录执行）:
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from core.billing import Billing
+from core.config import Config
+from core.export import export_csv
+from core.history import HistoryWriter, JsonlHistoryStore
+
+
+def make_record(car_id, i):
+    return {"car_id": car_id, "enter_time": 1.7e9 + i * 60, "exit_time": 1.7e9 + i * 60 + 30, "fee": float(i)}
+
+
+class TornLineTest(unittest.TestCase):
+    """前 5 条记录之后有一行断电留下的半行，重新启动后又追加了 5 条记录"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_history_")
+        self.path = os.path.join(self.directory, "history.jsonl")
+        self.before = [make_record(f"A{i}", i) for i in range(5)]
+        self.after = [make_record(f"B{i}", 6 + i) for i in range(5)]
+        JsonlHistoryStore(self.path).append(self.before)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"car_id": "TORN", "enter_ti')
+        self.config = Config(history_file=self.path)
+        self.config.history_flush_ms = 0
+        self.config.add_history_many([(r["car_id"], r["enter_time"], r["exit_time"], r["fee"]) for r in self.after])
+        # 下标 0-4 为前 5 条，5 为损坏的行，6-10 为之后追加的记录
+        self.expected = list(enumerate(self.before)) + list(enumerate(self.after, 6))
+
+    def tearDown(self):
+        self.config.close_history()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_view_indexes_stay_aligned(self):
+        history = self.config.history
+        self.assertEqual(len(history), 11)
+        self.assertEqual(history[4:7], [self.before[4], None, self.after[0]])
+        self.assertIsNone(history[5])
+        self.assertEqual(history[6], self.after[0])
+        self.assertEqual(history[-1], self.after[-1])
+        self.assertEqual(list(history), self.before + self.after)
+        self.assertEqual(list(reversed(history)), (self.before + self.after)[::-1])
+
+    def test_paging_skips_torn_line(self):
+        for descending in (False, True):
+            result = self.config.query_history(descending=descending)
+            rows = []
+            for offset in range(0, len(result), 3):
+                rows.extend(result.page(offset, 3))
+            expected = self.expected[::-1] if descending else self.expected
+            self.assertEqual(rows, expected)
+            self.assertEqual(result.page(0, 30), expected)
+
+    def test_indexed_queries_skip_torn_line(self):
+        self.assertEqual(self.config.find_history("B0"), [self.after[0]])
+        self.assertEqual(self.config.query_history(sort="exit_time", descending=False).page(0, 30), self.expected)
+        self.assertEqual(self.config.query_history(plate_prefix="B").page(0, 30), self.expected[:4:-1])
+
+    def test_plate_query_keeps_ordinals_and_filters(self):
+        self.assertEqual(self.config.query_history(car_id="B1").page(0, 30), [(7, self.after[1])])
+        exit_time = self.after[1]["exit_time"]
+        self.assertEqual(len(self.config.query_history(car_id="B1", start=exit_time + 1)), 0)
+        self.assertEqual(len(self.config.query_history(car_id="B1", end=exit_time + 1)), 1)
+        self.assertEqual(len(self.config.query_history(car_id="B1", plate_prefix="A")), 0)
+
+    def test_export_skips_torn_line(self):
+        progress, skipped = [], []
+        rows = export_csv(os.path.join(self.directory, "export.csv"), [], [], self.config.history_snapshot(),
+                          Billing(self.config), progress=lambda rows, total: progress.append((rows, total)),
+                          on_skip=skipped.append)
+        self.assertEqual(rows, 10)
+        self.assertEqual(progress[-1], (10, 10))
+        self.assertEqual(sum(skipped), 1)
+
+    def test_reader_follows_appends_and_clear(self):
+        reader = self.config.history_reader()
+        self.assertEqual(reader.query_history(plate_prefix="B").page(0, 30), self.expected[:4:-1])
+        # 只读副本的索引只加入新追加的记录，文件被清空（替换）后重建
+        record = make_record("B9", 100)
+        self.config.add_history(*record.values())
+        self.assertEqual(reader.find_history("B9"), [record])
+        self.assertEqual(reader.query_history(plate_prefix="B").page(0, 1), [(11, record)])
+        self.config.clear_history()
+        self.config.add_history(*make_record("C0", 0).values())
+        self.assertEqual([ordinal for ordinal, _ in reader.query_history(sort="exit_time").page(0, 30)], [0])
+
+
+class FlakyStore:
+    """前 failures 次写入失败的存储"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.records = []
+
+    def append(self, records, sync=False):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("磁盘已满")
+        self.records.extend(records)
+
+
+class WriterFailureTest(unittest.TestCase):
+    def test_flush_reports_failed_commit(self):
+        # 提交时与 flush 时各失败一次，下一次 flush 重试成功
+        store = FlakyStore(2)
+        writer = HistoryWriter(store, max_latency=0)
+        writer.RETRY_DELAY = 60  # 不让自动重试抢在 flush 之前
+        writer.submit([make_record("A0", 0)])
+        self.assertFalse(writer.flush())
+        self.assertTrue(writer.flush())
+        self.assertEqual(store.records, [make_record("A0", 0)])
+        self.assertTrue(writer.close())
+
+    def test_close_counts_dropped_records(self):
+        writer = HistoryWriter(FlakyStore(100), max_latency=0)
+        writer.submit([make_record("A0", 0), make_record("A1", 1)])
+        with mock.patch("builtins.print"):
+            self.assertFalse(writer.close())
+        self.assertEqual(writer.get_stats()["dropped"], 2)
+
+    def test_failed_jsonl_append_is_rolled_back(self):
+        directory = tempfile.mkdtemp(prefix="test_history_")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        store = JsonlHistoryStore(os.path.join(directory, "history.jsonl"))
+        store.append([make_record("A0", 0)])
+        with mock.patch("core.history.os.fsync", side_effect=OSError("I/O 错误")):
+            with self.assertRaises(OSError):
+                store.append([make_record("A1", 1)], sync=True)
+        store.append([make_record("A1", 1)], sync=True)
+        self.assertEqual(store.load(), [make_record("A0", 0), make_record("A1", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
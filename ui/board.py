@@ -0,0 +1,159 @@
+# ui/board.py
+
+import tkinter as tk
+from difflib import SequenceMatcher
+
+# 区域为空时占位行的键
+EMPTY = object()
+
+class BoardSection:
+    """看板中的一个区域：固定标题加若干行
+
+    每行由键、固定前缀和可变单元格组成，keys / prefix_lengths / cells / written
+    按行对齐；cells 为最新的单元格文本，written 为已写入控件的文本。
+    """
+    def __init__(self, title):
+        self.title = title
+        self.title_lines = title.count("\n")
+        self.keys = []
+        self.prefix_lengths = []
+        self.cells = []
+        self.written = []
+
+class TextBoard:
+    """在 tk.Text 上增量绘制的状态看板
+
+    每次刷新不再清空重绘，而是按行键比较新旧行序列：只在结构变化时插入
+    或删除对应的行，其余行只更新末尾的可变单元格（时长、费用）。单元格
+    只写入当前可见的行，滚动或改变窗口大小时再补写新露出的行，因此
+    结构不变时每次刷新的控件操作数与可见行数成正比，与车辆总数无关。
+    """
+    def __init__(self, text, scrollbar=None, empty_text="（空）"):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.empty_text = empty_text
+        self.sections = []
+        self.syncing = False
+        text.config(yscrollcommand=self.on_yscroll)
+        text.bind("<Configure>", lambda event: self.sync_visible(), add="+")
+
+    def add_section(self, title=""):
+        """在末尾添加一个区域，title 为固定标题（以换行结尾），返回区域序号"""
+        section = BoardSection(title)
+        self.sections.append(section)
+        if title:
+            self.edit(lambda: self.text.insert(tk.END, title))
+        return len(self.sections) - 1
+
+    def start_line(self, index):
+        """区域第一行数据所在的行号（Text 行号从1开始）"""
+        line = 1
+        for section in self.sections[:index]:
+            line += section.title_lines + len(section.keys)
+        return line + self.sections[index].title_lines
+
+    def edit(self, func):
+        """在可编辑状态下执行 func，完成后恢复控件原来的状态"""
+        state = self.text.cget("state")
+        if state == tk.DISABLED:
+            self.text.config(state=tk.NORMAL)
+        try:
+            func()
+        finally:
+            if state == tk.DISABLED:
+                self.text.config(state=tk.DISABLED)
+
+    def update(self, index, keys, cells, prefix):
+        """更新区域的行
+
+        keys 为各行的键（可哈希，顺序即显示顺序），cells 为对应的可变单元格文本，
+        prefix(i) 返回第 i 行的固定前缀，只对新出现的行调用。键相同的行视为同一行，
+        只更新单元格；键序列变化时按差异插入/删除行。
+        """
+        if not keys:
+            keys, cells, prefix = [EMPTY], [""], lambda i: self.empty_text
+        else:
+            keys = list(keys)
+            cells = list(cells)
+        self.syncing = True
+        try:
+            self.edit(lambda: self.apply(index, keys, cells, prefix))
+        finally:
+            self.syncing = False
+        self.sync_visible()
+
+    def update_cells(self, index, cells):
+        """行不变时只更新区域的单元格（调用方已通过版本号确认结构未变化）"""
+        section = self.sections[index]
+        if section.keys == [EMPTY]:
+            return
+        section.cells = list(cells)
+        self.sync_visible()
+
+    def apply(self, index, keys, cells, prefix):
+        section = self.sections[index]
+        old_keys = section.keys
+        if keys == old_keys:
+            section.cells = cells
+            return
+
+        start = self.start_line(index)
+        prefix_lengths = [0] * len(keys)
+        written = [None] * len(keys)
+        matcher = SequenceMatcher(None, old_keys, keys, autojunk=False)
+        # 从后往前修改，前面各行的行号不受影响
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == "equal":
+                prefix_lengths[j1:j2] = section.prefix_lengths[i1:i2]
+                written[j1:j2] = section.written[i1:i2]
+                continue
+            if i2 > i1:
+                self.text.delete(f"{start + i1}.0", f"{start + i2}.0")
+            if j2 > j1:
+                lines = []
+                for j in range(j1, j2):
+                    text = prefix(j)
+                    prefix_lengths[j] = len(text)
+                    written[j] = cells[j]
+                    lines.append(text + cells[j] + "\n")
+                self.text.insert(f"{start + i1}.0", "".join(lines))
+        section.keys = keys
+        section.prefix_lengths = prefix_lengths
+        section.cells = cells
+        section.written = written
+
+    def visible_lines(self):
+        """当前可见的首末行号"""
+        first = int(self.text.index("@0,0").split(".")[0])
+        last = int(self.text.index(f"@0,{self.text.winfo_height()}").split(".")[0])
+        return first, last
+
+    def sync_visible(self):
+        """把可见行中过期的单元格写入控件"""
+        if self.syncing or not self.sections:
+            return
+        self.syncing = True
+        try:
+            first, last = self.visible_lines()
+            self.edit(lambda: self.write_cells(first, last))
+        finally:
+            self.syncing = False
+
+    def write_cells(self, first, last):
+        text = self.text
+        line = 1
+        for section in self.sections:
+            start = line + section.title_lines
+            line = start + len(section.keys)
+            lo = max(first, start) - start
+            hi = min(last + 1, line) - start
+            cells, written, prefix_lengths = section.cells, section.written, section.prefix_lengths
+            for i in range(lo, hi):
+                if written[i] != cells[i]:
+                    text.replace(f"{start + i}.{prefix_lengths[i]}", f"{start + i}.end", cells[i])
+                    written[i] = cells[i]
+
+    def on_yscroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        self.sync_visible()
@@ -0,0 +1,225 @@
+# ui/history_view.py
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from utils.time_utils import TimestampFormatter, str_to_timestamp
+from utils.window_utils import center_window
+
+# Treeview 默认行高（像素），用于按窗口高度计算可见行数
+ROW_HEIGHT = 20
+
+class HistoryView:
+    """虚拟化的历史记录窗口
+
+    Treeview 中只保留可见的一页行，滚动条、鼠标滚轮和翻页键只改变当前偏移，
+    再从查询结果中读取这一页的记录填入已有的行，打开窗口和滚动的耗时与
+    历史记录总数无关。筛选（车牌号前缀、离开时间范围）与排序（序号、车牌号、
+    离开时间）通过 Config.query_history 使用索引完成，不加载全部记录。
+
+    submit 为提交查询的函数（如 CommandWorker.submit），查询与分页在持有
+    停车引擎的命令处理线程中执行，与写入历史记录的离开命令按顺序进行，
+    结果经 callback 回到界面线程后再显示，界面线程不等待；未提供时在当前
+    线程直接执行。同一时间只有一次读取在进行，期间的滚动只保留最后一次。
+    """
+    COLUMNS = ("序号", "车牌号", "进入时间", "离开时间", "停留时长", "费用(¥)")
+    WIDTHS = (70, 100, 160, 160, 110, 80)
+    SORT_KEYS = {"序号": "ordinal", "车牌号": "car_id", "离开时间": "exit_time"}
+
+    def __init__(self, master, config, billing, on_clear=None, submit=None):
+        self.master = master
+        self.config = config
+        self.billing = billing
+        self.submit = submit or (lambda func, *args, callback=None, on_error=None: callback(func(*args)))
+        self.format_time = TimestampFormatter()
+        self.master.title("停车历史记录")
+        self.master.geometry("800x540")
+        center_window(self.master, 800, 540)
+
+        self.sort = "ordinal"
+        self.descending = True  # 默认最新的记录在前
+        self.filters = (None, None, None)
+        self.offset = 0
+        self.total = 0  # 最近一次读取时查询结果的总行数
+        self.result = None     # 查询结果，查询完成前为 None
+        self.loading = False   # 是否有一次读取正在进行
+        self.pending = False   # 读取期间是否又需要重新读取
+        self.rows = []  # 当前可见行的 Treeview 项
+
+        # 筛选区域
+        filter_frame = tk.Frame(master)
+        filter_frame.pack(fill="x", padx=10, pady=(10, 0))
+        tk.Label(filter_frame, text="车牌号:").pack(side="left")
+        self.plate_entry = tk.Entry(filter_frame, width=12)
+        self.plate_entry.pack(side="left", padx=(0, 10))
+        tk.Label(filter_frame, text="离开时间:").pack(side="left")
+        self.start_entry = tk.Entry(filter_frame, width=16)
+        self.start_entry.pack(side="left")
+        tk.Label(filter_frame, text="至").pack(side="left", padx=2)
+        self.end_entry = tk.Entry(filter_frame, width=16)
+        self.end_entry.pack(side="left", padx=(0, 10))
+        tk.Button(filter_frame, text="筛选", command=self.apply_filters).pack(side="left")
+        tk.Button(filter_frame, text="重置", command=self.reset_filters).pack(side="left", padx=5)
+        for entry in (self.plate_entry, self.start_entry, self.end_entry):
+            entry.bind("<Return>", lambda event: self.apply_filters())
+
+        # 表格与滚动条（滚动条控制偏移，不滚动 Treeview 本身）
+        table_frame = tk.Frame(master)
+        table_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tree = ttk.Treeview(table_frame, columns=self.COLUMNS, show="headings", selectmode="browse")
+        for col, width in zip(self.COLUMNS, self.WIDTHS):
+            self.tree.column(col, width=width, anchor="center")
+            if col in self.SORT_KEYS:
+                self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            else:
+                self.tree.heading(col, text=col)
+        self.scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll_by(-1 if event.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-1, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(1, "units"))
+        self.tree.bind("<Prior>", lambda event: self.scroll_by(-1, "pages"))
+        self.tree.bind("<Next>", lambda event: self.scroll_by(1, "pages"))
+        self.tree.bind("<Home>", lambda event: self.scroll_to(0))
+        self.tree.bind("<End>", lambda event: self.scroll_to(self.total))
+
+        # 底部状态与按钮
+        btn_frame = tk.Frame(master)
+        btn_frame.pack(fill="x", pady=(0, 10))
+        self.count_label = tk.Label(btn_frame, fg="gray")
+        self.count_label.pack(side="left", padx=10)
+        stats = config.history_stats()
+        if stats:
+            tk.Label(btn_frame, text=f"写入队列: {stats['queue_depth']}  平均提交: {stats['avg_commit_ms']:.1f}ms",
+                     fg="gray").pack(side="left", padx=10)
+        if on_clear:
+            tk.Button(btn_frame, text="清空历史", command=on_clear).pack(side="left", padx=10)
+        tk.Button(btn_frame, text="关闭", command=master.destroy).pack(side="right", padx=10)
+
+        self.set_visible_rows(int(self.tree.cget("height")))
+        self.requery()
+
+    def set_visible_rows(self, count):
+        """调整 Treeview 中保留的行数"""
+        count = max(1, count)
+        while len(self.rows) < count:
+            self.rows.append(self.tree.insert("", "end", values=()))
+        while len(self.rows) > count:
+            self.tree.delete(self.rows.pop())
+
+    def on_resize(self, event):
+        count = max(1, (event.height - ROW_HEIGHT) // ROW_HEIGHT)
+        if count != len(self.rows):
+            self.set_visible_rows(count)
+            self.render()
+
+    def read_page(self, result, offset, page_size):
+        """（查询线程）返回 (总行数, 调整后的偏移, 该页记录)"""
+        total = len(result)
+        offset = max(0, min(offset, total - page_size))
+        return total, offset, result.page(offset, page_size)
+
+    def render(self):
+        """提交读取当前偏移处的一页记录，读取完成后由 show_page 填入可见行"""
+        if self.result is None:
+            return
+        if self.loading:
+            self.pending = True
+            return
+        self.loading = True
+        self.submit(self.read_page, self.result, self.offset, len(self.rows),
+                    callback=self.show_page, on_error=self.show_error)
+
+    def show_error(self, error):
+        """（界面线程）查询或读取失败"""
+        self.loading = self.pending = False
+        if self.master.winfo_exists():
+            self.count_label.config(text=f"读取历史记录失败: {error}")
+
+    def show_page(self, data):
+        """（界面线程）显示读取到的一页；读取期间偏移或查询有变化时再读取一次"""
+        self.loading = False
+        if not self.master.winfo_exists():
+            return
+        if self.pending:
+            self.pending = False
+            self.render()
+            return
+        total, self.offset, page = data
+        self.total = total
+        page_size = len(self.rows)
+        durations = self.billing.format_durations([r["exit_time"] - r["enter_time"] for _, r in page])
+        for row, (ordinal, record), formatted in zip(self.rows, page, durations):
+            self.tree.item(row, values=(
+                ordinal + 1,
+                record["car_id"],
+                self.format_time(record["enter_time"]),
+                self.format_time(record["exit_time"]),
+                formatted,
+                f"{record['fee']:.2f}"
+            ))
+        for row in self.rows[len(page):]:
+            self.tree.item(row, values=())
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + page_size) / total))
+            self.count_label.config(text=f"第 {self.offset + 1}-{self.offset + len(page)} 条，共 {total} 条")
+        else:
+            self.scrollbar.set(0.0, 1.0)
+            self.count_label.config(text="没有记录")
+
+    def scroll_to(self, offset):
+        self.offset = int(offset)
+        self.render()
+        return "break"
+
+    def scroll_by(self, amount, what):
+        step = len(self.rows) if what == "pages" else 3
+        return self.scroll_to(self.offset + amount * step)
+
+    def on_scroll(self, action, amount, what=None):
+        """滚动条回调：moveto 跳到比例位置，scroll 按行/页移动"""
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.total)
+        else:
+            self.scroll_by(int(amount), what)
+
+    def sort_by(self, column):
+        """点击列标题排序，再次点击切换升序/降序"""
+        key = self.SORT_KEYS[column]
+        self.descending = not self.descending if key == self.sort else False
+        self.sort = key
+        for col in self.SORT_KEYS:
+            arrow = (" ▼" if self.descending else " ▲") if self.SORT_KEYS[col] == key else ""
+            self.tree.heading(col, text=col + arrow)
+        self.requery()
+
+    def apply_filters(self):
+        try:
+            start = str_to_timestamp(self.start_entry.get()) if self.start_entry.get().strip() else None
+            end = str_to_timestamp(self.end_entry.get()) if self.end_entry.get().strip() else None
+        except ValueError:
+            messagebox.showerror("错误", "时间格式应为 YYYY-MM-DD 或 YYYY-MM-DD HH:MM", parent=self.master)
+            return
+        self.filters = (self.plate_entry.get().strip() or None, start, end)
+        self.requery()
+
+    def reset_filters(self):
+        for entry in (self.plate_entry, self.start_entry, self.end_entry):
+            entry.delete(0, tk.END)
+        self.filters = (None, None, None)
+        self.requery()
+
+    def requery(self):
+        plate_prefix, start, end = self.filters
+        self.submit(self.config.query_history, plate_prefix, start, end, self.sort, self.descending,
+                    callback=self.set_result, on_error=self.show_error)
+
+    def set_result(self, result):
+        """（界面线程）查询完成，从第一行开始显示"""
+        if not self.master.winfo_exists():
+            return
+        self.result = result
+        self.offset = 0
+        self.render()
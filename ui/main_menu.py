@@ -88,7 +88,7 @@ class MainMenu:
         tk.Button(
             other_frame, 
             text="退出系统", 
-            command=self.master.quit,
+            command=self.exit_system,
             width=15
         ).pack(side=tk.RIGHT, padx=5)
         
@@ -98,6 +98,13 @@ class MainMenu:
         
         # 居中窗口
         self.center_window()
+        self.master.protocol("WM_DELETE_WINDOW", self.exit_system)
+    
+    def exit_system(self):
+        """退出系统：先写完后台队列中的历史记录"""
+        if not self.config.close_history():
+            messagebox.showwarning("警告", "部分历史记录未能写入磁盘，详见控制台输出", parent=self.master)
+        self.master.quit()
     
     def center_window(self):
         """居中窗口"""
@@ -128,6 +135,8 @@ class MainMenu:
     
     def on_parking_close(self, window):
         """停车管理系统关闭时的回调"""
+        if not self.config.flush_history():
+            messagebox.showwarning("警告", "部分历史记录暂未写入磁盘，后台将继续重试", parent=window)
         window.destroy()
         self.master.deiconify()  # 重新显示主菜单
     
@@ -0,0 +1,89 @@
+# ui/metrics_view.py
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from core.metrics import metrics
+from utils.window_utils import center_window
+
+# 自动刷新间隔（毫秒）
+REFRESH_MS = 1000
+
+class MetricsView:
+    """操作耗时统计窗口（管理员）
+
+    按“类名.方法名”列出各操作的调用次数、平均耗时与分位数（微秒），每秒刷新一次。
+    可以开启/关闭计时（关闭后没有额外开销，已记录的数据保留）、清空数据、导出 JSON。
+    """
+    COLUMNS = ("操作", "次数", "平均", "p50", "p90", "p99", "p99.9", "最大")
+    WIDTHS = (230, 80, 70, 70, 70, 70, 70, 80)
+    KEYS = ("mean_us", "p50_us", "p90_us", "p99_us", "p99.9_us", "max_us")
+
+    def __init__(self, master, config=None):
+        self.master = master
+        self.config = config
+        self.master.title("性能监控（耗时单位: 微秒）")
+        self.master.geometry("800x420")
+        center_window(self.master, 800, 420)
+
+        table_frame = tk.Frame(master)
+        table_frame.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+        self.tree = ttk.Treeview(table_frame, columns=self.COLUMNS, show="headings")
+        for col, width in zip(self.COLUMNS, self.WIDTHS):
+            self.tree.column(col, width=width, anchor="w" if col == "操作" else "e")
+            self.tree.heading(col, text=col)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        self.rows = {}  # 操作名 -> Treeview 项
+
+        btn_frame = tk.Frame(master)
+        btn_frame.pack(fill="x", padx=10, pady=(0, 10))
+        self.toggle_button = tk.Button(btn_frame, width=10, command=self.toggle)
+        self.toggle_button.pack(side="left")
+        tk.Button(btn_frame, text="清空数据", width=10, command=self.reset).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="导出JSON", width=10, command=self.export).pack(side="left")
+        self.status_label = tk.Label(btn_frame, anchor="e")
+        self.status_label.pack(side="right", fill="x", expand=True)
+
+        self.refresh()
+
+    def toggle(self):
+        if metrics.enabled:
+            metrics.disable()
+        else:
+            metrics.enable()
+        if self.config is not None:
+            self.config.metrics_enabled = metrics.enabled
+        self.refresh(schedule=False)
+
+    def reset(self):
+        metrics.reset()
+        self.refresh(schedule=False)
+
+    def export(self):
+        path = filedialog.asksaveasfilename(parent=self.master, defaultextension=".json",
+                                            filetypes=[("JSON文件", "*.json"), ("所有文件", "*.*")],
+                                            title="导出耗时统计")
+        if not path:
+            return
+        try:
+            metrics.dump(path)
+        except OSError as e:
+            messagebox.showerror("导出失败", str(e), parent=self.master)
+
+    def refresh(self, schedule=True):
+        """更新表格：已有的行只改数值，新出现的操作追加一行"""
+        if not self.master.winfo_exists():
+            return
+        for name, summary in metrics.query().items():
+            values = (name, summary["count"]) + tuple(f"{summary[key]:.1f}" for key in self.KEYS)
+            item = self.rows.get(name)
+            if item is None:
+                self.rows[name] = self.tree.insert("", "end", values=values)
+            else:
+                self.tree.item(item, values=values)
+        self.toggle_button.config(text="关闭计时" if metrics.enabled else "开启计时")
+        self.status_label.config(text="计时中" if metrics.enabled else "未开启（无额外开销）")
+        if schedule:
+            self.master.after(REFRESH_MS, self.refresh)
@@ -1,11 +1,21 @@
+import queue
+import re
 import time
-import csv
+from itertools import islice
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
-from core.parking import Car, ParkingLot, WaitingLane
+from core.parking import create_parking_lot, create_waiting_lane
 from core.billing import Billing
+from core.engine import ParkingEngine
+from core.export import ExportJob
+from core.journal import DualJournalTarget, OperationLog, SingleJournalTarget, journal_path
+from core.metrics import metrics
+from core.worker import CommandWorker
 from utils.time_utils import timestamp_to_str
 from utils.window_utils import center_window
+from ui.board import TextBoard
+from ui.history_view import HistoryView
+from ui.metrics_view import MetricsView
 
 # 检查是否支持双向出口系统
 try:
@@ -15,6 +25,20 @@ try:
 except ImportError:
     DUAL_EXIT_SUPPORTED = False
 
+# 日志中最多列出的让路车辆数
+MAX_LOGGED_MOVES = 20
+# 导出进度刷新间隔（毫秒）
+EXPORT_POLL_MS = 100
+# 时长与费用的定时刷新间隔（毫秒）
+CLOCK_REFRESH_MS = 5000
+# 取回命令结果与状态副本的间隔（毫秒）
+RESULT_POLL_MS = 50
+# 状态看板的固定列宽：车牌号、时间、时长、费用
+ID_WIDTH = 17
+TIME_WIDTH = 28
+DURATION_WIDTH = 18
+FEE_WIDTH = 12
+
 class ParkingUI:
     """停车管理界面"""
     def __init__(self, master, config, user):
@@ -29,9 +53,10 @@ class ParkingUI:
         center_window(self.master, 1000, 700)  # 确保居中显示
 
         # 初始化停车场和便道
-        self.parking_lot = ParkingLot(config.parking_capacity)
-        self.waiting_lane = WaitingLane(config.waiting_capacity)
+        self.parking_lot = create_parking_lot(config.parking_capacity, config.parking_engine)
+        self.waiting_lane = create_waiting_lane(config.waiting_capacity, config.parking_engine)
         self.billing = Billing(config)
+        self.engine = ParkingEngine(config, self.parking_lot, self.waiting_lane, self.billing)
         
         # 主框架
         main_frame = tk.Frame(master)
@@ -79,9 +104,11 @@ class ParkingUI:
         tk.Button(input_frame, text="搜索车辆", command=self.search_car).grid(row=0, column=5, padx=5)
         tk.Button(input_frame, text="历史记录", command=self.show_history).grid(row=0, column=6, padx=5)
         
-        # 如果是管理员，添加导出按钮
+        # 如果是管理员，添加导出与统计按钮
         if user.role == "admin":
             tk.Button(input_frame, text="导出数据", command=self.export_data).grid(row=0, column=7, padx=5)
+            tk.Button(input_frame, text="统计分析", command=self.show_analytics).grid(row=0, column=8, padx=5)
+            tk.Button(input_frame, text="性能监控", command=self.show_metrics).grid(row=0, column=9, padx=5)
         
         # 状态区域 - 使用PanedWindow实现可调整的分割
         self.status_paned = tk.PanedWindow(main_frame, orient=tk.HORIZONTAL, sashrelief=tk.RAISED, sashwidth=5)
@@ -108,6 +135,9 @@ class ParkingUI:
         self.log_text.tag_config("movement", foreground="#8A2BE2")  # 紫罗兰色
         self.log_text.tag_config("movement-bold", foreground="#8A2BE2", font=("Arial", 10, "bold"))
         
+        # 命令处理线程中产生的日志，由界面线程取出显示
+        self.log_queue = queue.Queue()
+        
         # 根据系统模式显示不同的UI
         self.dual_system = None
         self.dual_ui = None
@@ -120,7 +150,7 @@ class ParkingUI:
                     self.parking_lot, 
                     self.waiting_lane,
                     self.billing,
-                    log_callback=self.log
+                    log_callback=self.post_log
                 )
                 # 创建双向系统UI
                 self.dual_ui = DualExitParkingUI(self.status_left_container, self.dual_system, self.log_text)
@@ -147,11 +177,51 @@ class ParkingUI:
             # 初始化单门系统UI
             self.init_single_system_ui()
         
-        # 刷新状态和启动定时刷新
+        # 命令处理线程独占停车引擎，进出、补位、写历史与系统优化都按提交顺序在其中执行；
+        # 停车场与便道变化后由它生成状态副本，界面线程定时取回结果并只读取副本
+        events = self.dual_system.events if self.dual_system else self.engine.events
+        if self.config.metrics_enabled:
+            metrics.enable()
+        self.journal = self.open_journal(events)
+        self.worker = CommandWorker(self.read_state, events)
+        self.shown_state = None
+        if self.dual_ui:
+            self.dual_ui.worker = self.worker
+        self.master.bind("<Destroy>", self.on_destroy, add="+")
+        
+        # 刷新状态，启动结果轮询和时长/费用的定时刷新
         self.refresh_status()
         self.log(f"停车管理系统已启动 ({system_type})", "info")
-        self.auto_refresh()
+        self.master.after(RESULT_POLL_MS, self.poll_worker)
+        self.master.after(CLOCK_REFRESH_MS, self.auto_refresh)
     
+    def open_journal(self, events):
+        """恢复上次关闭（或异常退出）前的在场车辆，并开始记录之后的每次变化"""
+        if not self.config.journal_file:
+            return None
+        if self.dual_system:
+            target, mode = DualJournalTarget(self.dual_system), "dual"
+        else:
+            target, mode = SingleJournalTarget(self.engine), "single"
+        journal = OperationLog(journal_path(self.config.journal_file, mode), target,
+                               self.config.journal_snapshot_every, self.config.journal_checkpoint_interval)
+        try:
+            stats = journal.recover()
+        except Exception as e:
+            # 不在损坏的日志后继续追加，保留原文件以便排查
+            self.log(f"恢复停车场状态失败，本次不记录操作日志: {str(e)}", "error")
+            return None
+        if stats["snapshot_cars"] or stats["replayed"]:
+            self.log(f"已恢复停车场状态: 快照车辆 {stats['snapshot_cars']} 辆，重放操作 {stats['replayed']} 条，"
+                     f"用时 {stats['elapsed'] * 1000:.0f}ms", "info")
+        if stats["lost"]:
+            self.log(f"警告: 容量不足，{stats['lost']} 辆车未能恢复", "warning")
+        if stats["corrupt"]:
+            self.log("警告: 操作日志末尾有未写完的记录，已忽略", "warning")
+        if stats["skipped"]:
+            self.log(f"警告: 操作日志中有 {stats['skipped']} 行已损坏，已跳过，恢复的车辆可能不完整", "warning")
+        return journal.start(events)
+
     def init_single_system_ui(self):
         """初始化单门系统UI组件"""
         # 停车场状态
@@ -162,9 +232,18 @@ class ParkingUI:
         status_scroll = tk.Scrollbar(self.status_left)
         status_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.status_text = tk.Text(self.status_left, height=15, yscrollcommand=status_scroll.set)
+        self.status_text = tk.Text(self.status_left, height=15)
         self.status_text.pack(fill=tk.BOTH, expand=True)
         status_scroll.config(command=self.status_text.yview)
+        
+        # 增量绘制的状态看板：容量信息、停车场、便道三个区域
+        header = f'{"车牌号":<{ID_WIDTH}} {"时间":<{TIME_WIDTH}} {"时长":<{DURATION_WIDTH}} {"费用":<{FEE_WIDTH}}\n'
+        rule = "-" * (len(header) - 1) + "\n"  # 减1是因为换行符
+        self.status_board = TextBoard(self.status_text, status_scroll)
+        self.summary_section = self.status_board.add_section()
+        self.parking_section = self.status_board.add_section("\n停车场状态:\n" + header + rule)
+        self.waiting_section = self.status_board.add_section("\n便道等待区:\n" + header + rule)
+        self.status_text.config(state=tk.DISABLED)
 
     def log(self, message, level="info"):
         """在日志区域添加消息"""
@@ -173,52 +252,63 @@ class ParkingUI:
         self.log_text.see(tk.END)  # 滚动到底部
         self.log_text.config(state=tk.DISABLED)
 
+    def post_log(self, message, level="info"):
+        """可在任意线程调用的日志：放入队列，由界面线程轮询时显示"""
+        self.log_queue.put((message, level))
+
  
+    def read_car_ids(self):
+        """读取输入框中的车牌号，支持用逗号或空格分隔多个车牌号"""
+        return [car_id for car_id in re.split(r"[,，\s]+", self.car_id_entry.get().strip()) if car_id]
+
     def car_arrive(self):
-        """处理车辆进入"""
-        car_id = self.car_id_entry.get().strip()
-        if not car_id:
+        """处理车辆进入（在命令处理线程中执行，结果回到界面线程后记录日志）"""
+        car_ids = self.read_car_ids()
+        if not car_ids:
             self.log("错误：请输入车牌号\n", "error")
             return
         
-        try:
-            car = Car(car_id)
-            
-            if self.dual_system:
-                # 使用双门系统
-                status, position, _ = self.dual_system.enter(car)
-                if status == "PARKED":
-                    self.log(f"成功：车辆 {car_id} 停入{position}\n", "success")
-                elif status == "IN_SIDE_ROAD":
-                    self.log(f"提示：停车场已满，车辆 {car_id} 在{position}等待\n", "info")
-                elif status == "EXISTS":
-                    self.log(f"错误：车牌号 {car_id} 已存在\n", "error")
-                else:
-                    self.log(f"失败：{position}\n", "warning")
+        self.car_id_entry.delete(0, tk.END)
+        self.worker.submit(self.arrive_cars, car_ids,
+                           callback=self.show_arrive_results,
+                           on_error=lambda e: self.log(f"车辆进入操作出错: {str(e)}\n", "error"))
+
+    def arrive_cars(self, car_ids):
+        """（命令处理线程）车辆进入，返回每辆车的结果"""
+        if self.dual_system:
+            # 使用双门系统
+            return [(car_id,) + self.dual_system.enter(self.engine.new_car(car_id))[:2] for car_id in car_ids]
+        # 原有单出口逻辑，多个车牌号时批量进入
+        return self.engine.arrive_many([self.engine.new_car(car_id) for car_id in car_ids])
+
+    def show_arrive_results(self, results):
+        """记录车辆进入结果"""
+        if not self.dual_system:
+            for result in results:
+                self.log_arrive_result(result)
+            return
+        for car_id, status, position in results:
+            if status == "PARKED":
+                self.log(f"成功：车辆 {car_id} 停入{position}\n", "success")
+            elif status == "IN_SIDE_ROAD":
+                self.log(f"提示：停车场已满，车辆 {car_id} 在{position}等待\n", "info")
+            elif status == "EXISTS":
+                self.log(f"错误：车牌号 {car_id} 已存在\n", "error")
             else:
-                # 原有单出口逻辑
-                if self.is_car_exists(car_id):
-                    self.log(f"错误：车牌号 {car_id} 已存在\n", "error")
-                    self.car_id_entry.delete(0, tk.END)
-                    return
-                
-                if self.parking_lot.arrive(car):
-                    position = len(self.parking_lot.stack)
-                    self.log(f"成功：车辆 {car_id} 停入停车场（车位 {position}）\n", "success")
-                elif self.waiting_lane.enqueue(car):
-                    position = len(self.waiting_lane.queue)
-                    self.log(f"提示：停车场已满，车辆 {car_id} 在便道等待（位置 {position}）\n", "info")
-                else:
-                    self.log(f"失败：停车场和便道均满，车辆 {car_id} 无法进入\n", "warning")
-            
-        except Exception as e:
-            self.log(f"车辆进入操作出错: {str(e)}\n", "error")
-            import traceback
-            traceback.print_exc()
-            
-        finally:
-            self.car_id_entry.delete(0, tk.END)
-            self.refresh_status()
+                self.log(f"失败：{position}\n", "warning")
+
+    def log_arrive_result(self, result):
+        """记录单门系统车辆进入结果"""
+        car_id = result["car_id"]
+        position = result["position"]
+        if result["status"] == "PARKED":
+            self.log(f"成功：车辆 {car_id} 停入停车场（车位 {position}）\n", "success")
+        elif result["status"] == "IN_SIDE_ROAD":
+            self.log(f"提示：停车场已满，车辆 {car_id} 在便道等待（位置 {position}）\n", "info")
+        elif result["status"] == "EXISTS":
+            self.log(f"错误：车牌号 {car_id} 已存在\n", "error")
+        else:
+            self.log(f"失败：停车场和便道均满，车辆 {car_id} 无法进入\n", "warning")
 
     def search_car(self):
         """搜索车辆"""
@@ -227,6 +317,13 @@ class ParkingUI:
             self.log("错误：请输入车牌号进行搜索\n", "error")
             return
         
+        # 在命令处理线程中查找（排在已提交的进出命令之后），结果回到界面线程后显示
+        self.worker.submit(self.find_car, car_id,
+                           callback=lambda found: self.show_search_result(car_id, found),
+                           on_error=lambda e: self.log(f"搜索车辆失败: {str(e)}", "error"))
+    
+    def show_search_result(self, car_id, found):
+        """显示车辆搜索结果"""
         # 创建搜索弹窗
         search_win = tk.Toplevel(self.master)
         search_win.title(f"车辆搜索 - {car_id}")
@@ -255,30 +352,20 @@ class ParkingUI:
         tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
-        # 搜索停车场
-        for i, car in enumerate(self.parking_lot.stack):
-            if car.car_id == car_id:
-                duration = time.time() - car.enter_time
-                tree.insert("", "end", values=(
-                    f"停车场 {i+1}",
-                    car.car_id,
-                    timestamp_to_str(car.enter_time),
-                    self.billing.format_duration(duration)
-                ))
-        
-        # 搜索便道
-        for i, car in enumerate(self.waiting_lane.queue):
-            if car.car_id == car_id:
-                duration = time.time() - car.enter_time
+        # 停车场与便道
+        now = time.time()
+        for name, key in (("停车场", "parking"), ("便道", "waiting")):
+            if found[key] is not None:
+                slot, enter_time = found[key]
                 tree.insert("", "end", values=(
-                    f"便道 {i+1}",
-                    car.car_id,
-                    timestamp_to_str(car.enter_time),
-                    self.billing.format_duration(duration)
+                    f"{name} {slot+1}",
+                    car_id,
+                    timestamp_to_str(enter_time),
+                    self.billing.format_duration(now - enter_time)
                 ))
         
-        # 搜索历史记录
-        for record in self.config.history:
+        # 历史记录
+        for record in found["history"]:
             if record["car_id"] == car_id:
                 enter_time = record["enter_time"]
                 exit_time = record["exit_time"]
@@ -291,18 +378,14 @@ class ParkingUI:
                 ))
         
         # 如果启用了双向系统，添加最优路径显示
-        if self.dual_system:
-            try:
-                exit_side, cost = self.dual_system.get_optimal_path(car_id)
-                if exit_side:
-                    tree.insert("", "end", values=(
-                        "推荐出口",
-                        car_id,
-                        f"{exit_side.upper()}出口",
-                        f"成本: {cost:.1f}"
-                    ))
-            except Exception as e:
-                self.log(f"搜索最优路径失败: {str(e)}", "error")
+        if found["path"]:
+            exit_side, cost = found["path"]
+            tree.insert("", "end", values=(
+                "推荐出口",
+                car_id,
+                f"{exit_side.upper()}出口",
+                f"成本: {cost:.1f}"
+            ))
         
         if not tree.get_children():
             tree.insert("", "end", values=("未找到", car_id, "", ""))
@@ -310,327 +393,375 @@ class ParkingUI:
         # 添加关闭按钮
         tk.Button(search_win, text="关闭", command=search_win.destroy).pack(pady=10)
     
+    def find_car(self, car_id):
+        """（命令处理线程）查找车辆所在位置、历史记录与双门系统的推荐出口"""
+        found = {"parking": None, "waiting": None, "path": None}
+        slot = self.parking_lot.locate(car_id)
+        if slot is not None:
+            found["parking"] = (slot, self.parking_lot.stack[slot].enter_time)
+        slot = self.waiting_lane.locate(car_id)
+        if slot is not None:
+            found["waiting"] = (slot, self.waiting_lane.queue[slot].enter_time)
+        found["history"] = self.config.find_history(car_id)
+        if self.dual_system:
+            try:
+                exit_side, cost = self.dual_system.get_optimal_path(car_id)
+                if exit_side:
+                    found["path"] = (exit_side, cost)
+            except Exception as e:
+                self.post_log(f"搜索最优路径失败: {str(e)}", "error")
+        return found
+    
     def show_history(self):
-        """显示历史记录"""
+        """显示历史记录（虚拟化表格，按需分页读取，支持筛选与排序）
+
+        查询与分页提交到命令处理线程执行，与写入历史记录的离开命令按顺序进行，
+        结果在 poll_worker 中回到界面线程，界面线程不等待也不直接读取历史记录索引。
+        """
         history_win = tk.Toplevel(self.master)
-        history_win.title("停车历史记录")
-        history_win.geometry("800x500")
-        center_window(history_win, 800, 500)
-        
-        # 创建表格
-        columns = ("序号", "车牌号", "进入时间", "离开时间", "停留时长", "费用(¥)")
-        tree = ttk.Treeview(history_win, columns=columns, show="headings")
-        
-        # 设置列宽
-        col_widths = [50, 100, 180, 180, 120, 80]
-        for col, width in zip(columns, col_widths):
-            tree.column(col, width=width, anchor="center")
-            tree.heading(col, text=col)
-        
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(history_win, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
-        
-        # 布局
-        tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        # 添加数据（按时间倒序）
-        for i, record in enumerate(reversed(self.config.history)):
-            enter_time = record["enter_time"]
-            exit_time = record["exit_time"]
-            duration = exit_time - enter_time
-            
-            tree.insert("", "end", values=(
-                i + 1,
-                record["car_id"],
-                timestamp_to_str(enter_time),
-                timestamp_to_str(exit_time),
-                self.billing.format_duration(duration),
-                f"{record['fee']:.2f}"
-            ))
-        
-        # 添加底部按钮
-        btn_frame = tk.Frame(history_win)
-        btn_frame.pack(fill="x", pady=10)
-        
+        on_clear = None
         if self.user.role == "admin":
-            tk.Button(btn_frame, text="清空历史", 
-                     command=lambda: self.clear_history(history_win)).pack(side="left", padx=10)
-        
-        tk.Button(btn_frame, text="关闭", command=history_win.destroy).pack(side="right", padx=10)
+            on_clear = lambda: self.clear_history(history_win)
+        HistoryView(history_win, self.config, self.billing, on_clear, submit=self.worker.submit)
+    
+    def show_metrics(self):
+        """显示各操作的耗时统计（可开启/关闭计时）"""
+        MetricsView(tk.Toplevel(self.master), self.config)
+
+    def analytics_report(self, now):
+        """（命令处理线程）读取统计分析窗口所需的数值：累计/今日收入、停留时长分位数、最近24小时各时段"""
+        analytics = self.config.get_analytics()
+        today = time.mktime(time.localtime(now)[:3] + (0, 0, 0, 0, 0, -1))
+        start = now - 23 * 3600
+        return {
+            "count": analytics.count,
+            "revenue": analytics.revenue,
+            "today_revenue": sum(revenue for _, revenue, _ in analytics.revenue_per_hour(today, now + 1)),
+            "dwell": analytics.dwell_percentiles(),
+            "today_dwell": analytics.dwell_percentiles(start=today, end=now + 1),
+            "hours": [(hour, revenue, arrivals, departures, present)
+                      for (hour, present, arrivals, departures), (_, revenue, _) in zip(
+                          analytics.occupancy_curve(start, now + 1), analytics.revenue_per_hour(start, now + 1))]
+        }
+
+    def show_analytics(self):
+        """显示统计分析：收入、停留时长分位数与最近24小时的在场车辆曲线（在命令处理线程中统计）"""
+        self.worker.submit(self.analytics_report, time.time(),
+                           callback=self.show_analytics_report,
+                           on_error=lambda e: self.log(f"统计分析失败: {str(e)}", "error"))
+
+    def show_analytics_report(self, report):
+        """显示 analytics_report 的结果"""
+        win = tk.Toplevel(self.master)
+        win.title("统计分析")
+        win.geometry("640x560")
+        center_window(win, 640, 560)
+        text = scrolledtext.ScrolledText(win, font=("Consolas", 10))
+        text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        def percentile_line(title, percentiles):
+            values = [self.billing.format_duration(v) if v is not None else "-" for v in percentiles.values()]
+            return f"{title}  p50: {values[0]}  p95: {values[1]}  p99: {values[2]}\n"
+        
+        text.insert(tk.END, f"累计离开车辆: {report['count']}  累计收入: ¥{report['revenue']:.2f}\n")
+        text.insert(tk.END, f"今日收入: ¥{report['today_revenue']:.2f}\n\n")
+        text.insert(tk.END, percentile_line("全部停留时长", report["dwell"]))
+        text.insert(tk.END, percentile_line("今日停留时长", report["today_dwell"]))
+        
+        text.insert(tk.END, f"\n最近24小时\n{'时段':<18}{'收入(¥)':>10}{'到达':>8}{'离开':>8}{'在场':>8}\n")
+        for hour, revenue, arrivals, departures, present in report["hours"]:
+            text.insert(tk.END, f"{time.strftime('%m-%d %H:00', time.localtime(hour)):<18}"
+                                f"{revenue:>10.2f}{arrivals:>8}{departures:>8}{present:>8}\n")
+        text.config(state=tk.DISABLED)
+        
+        tk.Button(win, text="关闭", command=win.destroy).pack(pady=(0, 10))
     
     def clear_history(self, window):
         """清空历史记录"""
         if tk.messagebox.askyesno("确认", "确定要清空所有历史记录吗？此操作不可恢复！"):
-            self.config.clear_history()
+            self.worker.submit(self.config.clear_history,
+                               callback=lambda _: self.on_history_cleared(window),
+                               on_error=lambda e: self.log(f"清空历史记录失败: {str(e)}", "error"))
+    
+    def on_history_cleared(self, window):
+        if window.winfo_exists():
             window.destroy()
-            self.log("历史记录已清空", "info")
+        self.log("历史记录已清空", "info")
     
     def export_data(self):
-        """导出数据到CSV文件"""
-        try:
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")],
-                title="导出停车数据"
-            )
-            
-            if not file_path:
-                return
-            
-            try:
-                with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    
-                    # 写入表头
-                    writer.writerow(["类型", "车牌号", "进入时间", "停留时长", "状态"])
-                    
-                    # 导出停车场数据
-                    for i, car in enumerate(self.parking_lot.stack):
-                        duration = time.time() - car.enter_time
-                        writer.writerow([
-                            "停车场",
-                            car.car_id,
-                            timestamp_to_str(car.enter_time),
-                            self.billing.format_duration(duration),
-                            "停放中"
-                        ])
-                    
-                    # 导出便道数据
-                    for i, car in enumerate(self.waiting_lane.queue):
-                        duration = time.time() - car.enter_time
-                        writer.writerow([
-                            "便道",
-                            car.car_id,
-                            timestamp_to_str(car.enter_time),
-                            self.billing.format_duration(duration),
-                            "等待中"
-                        ])
-                    
-                    # 导出历史数据
-                    for record in self.config.history:
-                        duration = record["exit_time"] - record["enter_time"]
-                        writer.writerow([
-                            "历史记录",
-                            record["car_id"],
-                            timestamp_to_str(record["enter_time"]),
-                            self.billing.format_duration(duration),
-                            "已完成"
-                        ])
-                    
-                    self.log(f"数据已成功导出到: {file_path}", "success")
-                    return True
-            
-            except PermissionError:
-                self.log("导出失败: 没有写入权限或文件被占用", "error")
-            except Exception as e:
-                self.log(f"导出失败: {str(e)}", "error")
+        """导出数据到CSV文件（后台线程分块写入，可取消，扩展名为 .gz 时压缩）"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV文件", "*.csv"), ("压缩CSV文件", "*.csv.gz"), ("所有文件", "*.*")],
+            title="导出停车数据"
+        )
         
+        if not file_path:
+            return False
+        
+        # 在命令处理线程中取停车场和便道的快照，历史记录使用可在后台线程读取的视图
+        self.worker.submit(lambda: (
+            list(self.parking_lot.current_state()),
+            list(self.waiting_lane.current_state()),
+            self.config.history_snapshot()
+        ), callback=lambda snapshot: self.start_export(file_path, *snapshot),
+           on_error=lambda e: self.log(f"导出失败: {str(e)}", "error"))
+        return True
+    
+    def start_export(self, file_path, parking_state, waiting_state, history):
+        """（界面线程）取得快照后启动导出线程并显示进度"""
+        try:
+            job = ExportJob(file_path, parking_state, waiting_state, history, self.billing).start()
         except Exception as e:
             self.log(f"导出失败: {str(e)}", "error")
             return False
+        
+        # 进度窗口
+        progress_win = tk.Toplevel(self.master)
+        progress_win.title("导出数据")
+        progress_win.geometry("360x120")
+        center_window(progress_win, 360, 120)
+        progress_label = tk.Label(progress_win, text="正在导出...")
+        progress_label.pack(pady=(15, 5))
+        progress_bar = ttk.Progressbar(progress_win, length=300, mode="determinate")
+        progress_bar.pack()
+        tk.Button(progress_win, text="取消", command=job.cancel).pack(pady=10)
+        progress_win.protocol("WM_DELETE_WINDOW", job.cancel)
+        
+        def poll():
+            if job.status == "RUNNING":
+                if job.total:
+                    progress_bar["value"] = job.rows * 100 / job.total
+                    progress_label.config(text=f"正在导出 {job.rows}/{job.total} 行")
+                self.master.after(EXPORT_POLL_MS, poll)
+                return
+            progress_win.destroy()
+            if job.status == "DONE":
+                self.log(f"数据已成功导出到: {file_path}（{job.rows} 行，{job.elapsed:.1f} 秒）", "success")
+                if job.skipped:
+                    self.log(f"历史记录中有 {job.skipped} 行已损坏，未导出", "warning")
+            elif job.status == "CANCELLED":
+                self.log("导出已取消", "warning")
+            elif isinstance(job.error, PermissionError):
+                self.log("导出失败: 没有写入权限或文件被占用", "error")
+            else:
+                self.log(f"导出失败: {str(job.error)}", "error")
+        
+        poll()
+        return True
     
     def car_depart(self):
-        """处理车辆离开"""
-        car_id = self.car_id_entry.get().strip()
-        if not car_id:
+        """处理车辆离开（在命令处理线程中执行，结果回到界面线程后记录日志）"""
+        car_ids = self.read_car_ids()
+        if not car_ids:
             self.log("错误：请输入车牌号\n", "error")
             return
         
         self.car_id_entry.delete(0, tk.END)
-        
-        try:
-            if self.dual_system:
-                # 使用双向系统离开
+        self.worker.submit(self.depart_cars, car_ids,
+                           callback=self.show_depart_results,
+                           on_error=lambda e: self.log(f"车辆离开操作出错: {str(e)}\n", "error"))
+
+    def depart_cars(self, car_ids):
+        """（命令处理线程）车辆离开
+
+        双门系统返回 [(车牌号, 状态, 结果, 费用)]；单门系统返回 (每辆车的结果, 补位车辆)，
+        让路车辆在这里取出车牌号，界面线程不再访问停车场。
+        """
+        if self.dual_system:
+            # 使用双向系统离开
+            results = []
+            for car_id in car_ids:
                 status, result = self.dual_system.leave(car_id)
-                
+                fee = None
+                if status == "SUCCESS":
+                    departed = result["departed"]
+                    fee = self.billing.calculate_fee(departed["duration"], departed["entry_time"])
+                results.append((car_id, status, result, fee))
+            return results
+        
+        if len(car_ids) == 1:
+            # 原有单出口逻辑（实现让路机制，离开后从便道补位）
+            result = self.engine.depart(car_ids[0])
+            results, entered = [result], result.get("entered")
+        else:
+            # 多辆车同时离开时批量处理，只补位一次
+            results, entered = self.engine.depart_many(car_ids)
+        for result in results:
+            moved_cars = result.pop("moved_cars", None)
+            if moved_cars is not None:
+                # 让路车辆较多时只列出前若干辆，避免遍历整个让路视图
+                result["moved_ids"] = [car.car_id for car in islice(moved_cars, MAX_LOGGED_MOVES)]
+                result["moved_count"] = len(moved_cars)
+        return results, entered
+
+    def show_depart_results(self, results):
+        """记录车辆离开结果"""
+        if self.dual_system:
+            for car_id, status, result, fee in results:
                 if status == "SUCCESS":
                     # 显示离开信息
-                    duration = result["departed"]["duration"]
-                    fee = self.billing.calculate_fee(duration)
                     self.log(f"车辆 {car_id} 已离开，费用: ¥{fee:.2f}\n", "success")
-                    
                     # 显示补充车辆信息
                     if "entered" in result:
                         new_car = result["entered"]
                         self.log(f"车辆 {new_car['car'].car_id} 已从便道进入停车场\n", "info")
                 else:
                     self.log(f"失败: {result}\n", "error")
-            else:
-                # 原有单出口逻辑
-                # 检查车辆是否在便道中
-                if self.is_car_in_waiting_lane(car_id):
-                    self.log(f"错误：车辆 {car_id} 在便道中，无法从停车场离开\n", "error")
-                    return
-                
-                # 从停车场离开（实现让路机制）
-                car, moved_cars = self.parking_lot.depart(car_id)
-                if not car:
-                    self.log(f"失败：未找到车牌号为 {car_id} 的车辆\n", "error")
-                    return
-                
-                # 记录让路车辆信息
-                if moved_cars:
-                    moved_ids = [car.car_id for car in moved_cars]
-                    self.log(f"提示：车辆 {car_id} 离开，\n让路车辆: {', '.join(moved_ids)}（共 {len(moved_cars)} 辆）", "movement-bold")
-                else:
-                    self.log(f"提示：车辆 {car_id} 离开，无让路车辆", "info")
-                
-                # 计算费用
-                current_time = time.time()
-                duration = current_time - car.enter_time
-                fee = self.billing.calculate_fee(duration)
-                formatted = self.billing.format_duration(duration)
-                
-                # 添加详细计费信息
-                detailed_calc = self.billing.detailed_calculation(duration)
-                self.log(f"计费详情:\n{detailed_calc}", "fee")
-                
-                # 添加历史记录
-                self.config.add_history(car_id, car.enter_time, current_time, fee)
-
-                self.log(f"成功：车辆 {car_id} 停留 {formatted}", "success")
-                self.log(f"车辆:{car_id}应缴费用: ¥{fee:.2f}\n", "fee")
-                
-                # 从便道移入一辆车到停车场
-                next_car = self.waiting_lane.dequeue()
-                if next_car:
-                    # 更新车辆的进入时间为当前时间
-                    next_car.update_enter_time(time.time())
-                    
-                    if self.parking_lot.arrive(next_car):
-                        position = len(self.parking_lot.stack)
-                        self.log(f"成功：车辆 {next_car.car_id} 已从便道移入停车场（车位 {position}）\n", "success")
-                    else:
-                        # 如果停车场已满（理论上不应该发生），将车放回便道
-                        self.waiting_lane.enqueue(next_car)
-                        self.log(f"错误：无法将车辆 {next_car.car_id} 移入停车场（已满），已放回便道\n", "error")
-                else:
-                    self.log("提示：便道中无等待车辆\n", "info")
-            
-            self.refresh_status()
+            return
         
-        except Exception as e:
-            self.log(f"车辆离开操作出错: {str(e)}\n", "error")
-            import traceback
-            traceback.print_exc()
+        results, entered = results
+        for result in results:
+            self.log_depart_result(result)
+        if any(result["status"] == "SUCCESS" for result in results):
+            self.log_refill(entered)
+
+    def log_depart_result(self, result):
+        """记录单门系统车辆离开结果"""
+        car_id = result["car_id"]
+        if result["status"] == "IN_SIDE_ROAD":
+            self.log(f"错误：车辆 {car_id} 在便道中，无法从停车场离开\n", "error")
+            return
+        if result["status"] != "SUCCESS":
+            self.log(f"失败：未找到车牌号为 {car_id} 的车辆\n", "error")
+            return
         
-        except Exception as e:
-            self.log(f"车辆离开操作出错: {str(e)}\n", "error")
-            import traceback
-            traceback.print_exc()
+        # 记录让路车辆信息
+        moved_count = result["moved_count"]
+        if moved_count:
+            moved_ids = result["moved_ids"]
+            if moved_count > MAX_LOGGED_MOVES:
+                moved_ids = moved_ids + ["..."]
+            self.log(f"提示：车辆 {car_id} 离开，\n让路车辆: {', '.join(moved_ids)}（共 {moved_count} 辆）", "movement-bold")
+        else:
+            self.log(f"提示：车辆 {car_id} 离开，无让路车辆", "info")
+        
+        # 添加详细计费信息
+        duration = result["duration"]
+        fee = result["fee"]
+        self.log(f"计费详情:\n{self.billing.detailed_calculation(duration, result['enter_time'])}", "fee")
+        self.log(f"成功：车辆 {car_id} 停留 {self.billing.format_duration(duration)}", "success")
+        self.log(f"车辆:{car_id}应缴费用: ¥{fee:.2f}\n", "fee")
+
+    def log_refill(self, entered):
+        """记录从便道补位的车辆"""
+        if not entered:
+            self.log("提示：便道中无等待车辆\n", "info")
+            return
+        for car, position in entered:
+            self.log(f"成功：车辆 {car.car_id} 已从便道移入停车场（车位 {position}）\n", "success")
 
     def refresh_status(self):
-        """刷新状态显示 - 使用固定宽度格式对齐"""
+        """刷新状态显示 - 使用固定宽度格式对齐，只增删变化的行并更新时长与费用"""
         if self.dual_system and self.dual_ui:
             # 刷新双向系统UI
+            self.shown_state = self.worker.state
             self.dual_ui.refresh_status()
             return
         
-        self.status_text.config(state=tk.NORMAL)
-        self.status_text.delete(1.0, tk.END)
-        
-        # 添加容量信息
-        parking_count = len(self.parking_lot.stack)
-        parking_capacity = self.parking_lot.capacity
-        waiting_count = len(self.waiting_lane.queue)
-        waiting_capacity = self.waiting_lane.capacity
-        
-        self.status_text.insert(tk.END, 
-            f"停车场: {parking_count}/{parking_capacity} 便道: {waiting_count}/{waiting_capacity}\n\n")
-        
         # 获取当前时间
         current_time = time.time()
         
-        # 定义固定列宽
-        id_width = 17     # 车牌号列宽
-        time_width = 28   # 时间列宽
-        duration_width = 18  # 时长列宽
-        fee_width = 12    # 费用列宽
-        
-        # 停车场状态 - 增加时长和费用显示
-        self.status_text.insert(tk.END, "停车场状态:\n")
-        # 修复的f-string语法 - 使用单引号包裹整个字符串
-        header = f'{"车牌号":<{id_width}} {"时间":<{time_width}} {"时长":<{duration_width}} {"费用":<{fee_width}}\n'
-        self.status_text.insert(tk.END, header)
-        self.status_text.insert(tk.END, "-" * (len(header)-1) + "\n")  # 减1是因为换行符
-        
-        parking_state = self.parking_lot.current_state()
-        if parking_state:
-            for car_id, enter_time in parking_state:
-                # 计算停留时长
-                duration = current_time - enter_time
-                formatted_duration = self.billing.format_duration(duration)
-                # 计算实时费用（浮点数）
-                fee = self.billing.calculate_fee(duration)
-                # 格式化为两位小数
-                fee_str = f"{fee:.2f}"
-                
-                # 使用固定宽度格式化每行
-                formatted_line = f"{car_id:<{id_width}} {timestamp_to_str(enter_time):<{time_width}} " \
-                                f"{formatted_duration:<{duration_width}} " \
-                                f"¥{fee_str:<{fee_width}}"
-                self.status_text.insert(tk.END, formatted_line + "\n")
+        # 命令处理线程生成新的状态副本时才增删行，否则只更新时长与费用
+        state = self.worker.state
+        changed = state is not self.shown_state
+        if changed:
+            self.shown_state = state
+            self.parking_rows = state["parking"]
+            self.waiting_rows = state["waiting"]
+            # 容量信息
+            self.status_board.update(
+                self.summary_section, ["summary"],
+                [f"停车场: {len(self.parking_rows)}/{self.parking_lot.capacity} "
+                 f"便道: {len(self.waiting_rows)}/{self.waiting_lane.capacity}"],
+                lambda i: "")
+        
+        # 停车场状态 - 行键为 (车牌号, 进入时间)，批量计算停留时长与实时费用
+        parking_state = self.parking_rows
+        enter_times = [enter_time for _, enter_time in parking_state]
+        fees, durations = self.billing.calculate_fees(
+            [current_time - enter_time for enter_time in enter_times], enter_times)
+        cells = [f"{formatted_duration:<{DURATION_WIDTH}} ¥{f'{fee:.2f}':<{FEE_WIDTH}}"
+                 for formatted_duration, fee in zip(durations, fees)]
+        if changed:
+            self.status_board.update(self.parking_section, parking_state, cells,
+                                     lambda i: self.status_prefix(parking_state[i]))
         else:
-            self.status_text.insert(tk.END, "（空）\n")
+            self.status_board.update_cells(self.parking_section, cells)
         
         # 便道状态 - 只显示时长
-        self.status_text.insert(tk.END, "\n便道等待区:\n")
-        # 修复的f-string语法 - 使用单引号包裹整个字符串
-        header2 = f'{"车牌号":<{id_width}} {"时间":<{time_width}} {"时长":<{duration_width}} {"费用":<{fee_width}}\n'
-        self.status_text.insert(tk.END, header2)
-        self.status_text.insert(tk.END, "-" * (len(header2)-1) + "\n")
-        
-        waiting_state = self.waiting_lane.current_state()
-        if waiting_state:
-            for car_id, enter_time in waiting_state:
-                # 计算等待时长
-                duration = current_time - enter_time
-                formatted_duration = self.billing.format_duration(duration)
-                
-                # 使用固定宽度格式化每行
-                formatted_line = f"{car_id:<{id_width}} {timestamp_to_str(enter_time):<{time_width}} " \
-                                 f"{formatted_duration:<{duration_width}} " \
-                                 f"¥0.00{'':<{fee_width-5}}"  # 固定显示¥0.00
-                self.status_text.insert(tk.END, formatted_line + "\n")
+        waiting_state = self.waiting_rows
+        durations = self.billing.format_durations(
+            [current_time - enter_time for _, enter_time in waiting_state])
+        cells = [f"{formatted_duration:<{DURATION_WIDTH}} ¥0.00{'':<{FEE_WIDTH - 5}}"  # 固定显示¥0.00
+                 for formatted_duration in durations]
+        if changed:
+            self.status_board.update(self.waiting_section, waiting_state, cells,
+                                     lambda i: self.status_prefix(waiting_state[i]))
         else:
-            self.status_text.insert(tk.END, "（空）\n")
-        
-        self.status_text.config(state=tk.DISABLED)
+            self.status_board.update_cells(self.waiting_section, cells)
+
+    def status_prefix(self, state):
+        """状态行的固定部分：车牌号与进入时间"""
+        car_id, enter_time = state
+        return f"{car_id:<{ID_WIDTH}} {timestamp_to_str(enter_time):<{TIME_WIDTH}} "
 
     def return_main(self):
         """返回主菜单"""
+        self.worker.close()
+        if self.journal:
+            self.journal.close()
+        if not self.config.flush_history():
+            messagebox.showwarning("警告", "部分历史记录暂未写入磁盘，后台将继续重试", parent=self.master)
         self.master.destroy()
         from ui.main_menu import MainMenu
         root = tk.Tk()
         MainMenu(root, self.user, self.config)
         root.mainloop()
 
-    def is_car_exists(self, car_id):
-        """检查车牌号是否已存在"""
-        # 检查停车场
-        for car_info in self.parking_lot.current_state():
-            if car_info[0] == car_id:
-                return True
-        
-        # 检查便道
-        for car_info in self.waiting_lane.current_state():
-            if car_info[0] == car_id:
-                return True
-        
-        return False
+    def is_car_exists(self, car_id, callback):
+        """检查车牌号是否已存在（在命令处理线程中按顺序查询，结果回到界面线程后调用 callback(是否存在)）"""
+        self.worker.submit(self.engine.is_car_exists, car_id, callback=callback)
 
-    def is_car_in_waiting_lane(self, car_id):
-        """检查车辆是否在便道中"""
-        for car_info in self.waiting_lane.current_state():
-            if car_info[0] == car_id:
-                return True
-        return False
+    def is_car_in_waiting_lane(self, car_id, callback):
+        """检查车辆是否在便道中，结果回到界面线程后调用 callback(是否在便道)"""
+        self.worker.submit(self.waiting_lane.contains, car_id, callback=callback)
+    
+    def read_state(self):
+        """（命令处理线程）读取停车场与便道状态的副本"""
+        if self.dual_system:
+            return self.dual_system.get_status()
+        return {
+            "parking": list(self.parking_lot.current_state()),
+            "waiting": list(self.waiting_lane.current_state())
+        }
+    
+    def poll_worker(self):
+        """取回命令结果与日志，状态副本更新后刷新显示"""
+        if self.worker.closed:
+            return
+        while True:
+            try:
+                message, level = self.log_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.log(message, level)
+        self.worker.poll()
+        if self.worker.state is not self.shown_state:
+            self.refresh_status()
+        self.master.after(RESULT_POLL_MS, self.poll_worker)
+    
+    def on_destroy(self, event):
+        """窗口关闭时执行完已提交的命令并停止命令处理线程"""
+        if event.widget is self.master:
+            self.worker.close()
+            if self.journal:
+                self.journal.close()
     
     def auto_refresh(self):
-        """定时刷新状态"""
+        """定时刷新随时间变化的时长与费用（车辆进出由状态副本的更新触发刷新）"""
+        if self.worker.closed:
+            return
         self.refresh_status()
-        # 每5秒刷新一次
-        self.master.after(5000, self.auto_refresh)
+        self.master.after(CLOCK_REFRESH_MS, self.auto_refresh)
 
@@ -8,7 +8,7 @@ class SettingsUI:
         self.config = config
         self.user = user
         self.master.title("系统设置")
-        self.master.geometry("500x500")
+        self.master.geometry("500x700")
         
         # 主框架
         main_frame = tk.Frame(master, padx=20, pady=20)
@@ -28,13 +28,26 @@ class SettingsUI:
         self.waiting_entry.grid(row=1, column=1, padx=5, pady=5)
         self.waiting_entry.insert(0, str(config.waiting_capacity))
         
+        tk.Label(capacity_frame, text="停车场引擎:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.engine_var = tk.StringVar(value=config.parking_engine)
+        tk.OptionMenu(capacity_frame, self.engine_var, "stack", "fenwick", "compact").grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        
+        tk.Label(capacity_frame, text="历史记录存储:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.history_var = tk.StringVar(value=config.history_backend)
+        tk.OptionMenu(capacity_frame, self.history_var, "jsonl", "sqlite", "json").grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+        
+        tk.Label(capacity_frame, text="历史写入延迟(毫秒，0为同步):").grid(row=4, column=0, padx=5, pady=5, sticky="w")
+        self.flush_entry = tk.Entry(capacity_frame)
+        self.flush_entry.grid(row=4, column=1, padx=5, pady=5)
+        self.flush_entry.insert(0, str(config.history_flush_ms))
+        
         # 计费设置
         billing_frame = tk.LabelFrame(main_frame, text="计费设置")
         billing_frame.pack(fill=tk.X, pady=10)
         
         tk.Label(billing_frame, text="计费模式:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
         self.billing_var = tk.StringVar(value=config.billing_mode)
-        billing_options = ["per_minute", "per_hour", "fixed"]
+        billing_options = ["per_minute", "per_hour", "fixed", "tariff"]
         billing_menu = tk.OptionMenu(billing_frame, self.billing_var, *billing_options)
         billing_menu.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         
@@ -50,6 +63,22 @@ class SettingsUI:
         else:
             self.rate_entry.insert(0, str(config.fixed_fee))
         
+        # 分时段计费设置（计费模式为 tariff 时生效）
+        tk.Label(billing_frame, text="免费时长(分钟):").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.free_entry = tk.Entry(billing_frame)
+        self.free_entry.grid(row=2, column=1, padx=5, pady=5)
+        self.free_entry.insert(0, str(config.tariff["free_minutes"]))
+        
+        tk.Label(billing_frame, text="时段费率(起点=元/小时):").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.periods_entry = tk.Entry(billing_frame)
+        self.periods_entry.grid(row=3, column=1, padx=5, pady=5)
+        self.periods_entry.insert(0, ", ".join(f"{start}={rate}" for start, rate in config.tariff["periods"]))
+        
+        tk.Label(billing_frame, text="每日封顶(0为不封顶):").grid(row=4, column=0, padx=5, pady=5, sticky="w")
+        self.cap_entry = tk.Entry(billing_frame)
+        self.cap_entry.grid(row=4, column=1, padx=5, pady=5)
+        self.cap_entry.insert(0, str(config.tariff["daily_cap"]))
+        
         # 双门系统设置（仅管理员可见）
         if user.role == "admin":
             dual_frame = tk.LabelFrame(main_frame, text="双门系统设置")
@@ -90,18 +119,33 @@ class SettingsUI:
             # 保存容量设置
             self.config.parking_capacity = int(self.parking_entry.get())
             self.config.waiting_capacity = int(self.waiting_entry.get())
+            self.config.parking_engine = self.engine_var.get()
+            self.config.set_history_backend(self.history_var.get())
+            self.config.set_history_flush_ms(max(0, int(self.flush_entry.get())))
             
             # 保存计费设置
             billing_mode = self.billing_var.get()
             self.config.billing_mode = billing_mode
             
-            rate = float(self.rate_entry.get())
-            if billing_mode == "per_minute":
-                self.config.fee_per_minute = rate
-            elif billing_mode == "per_hour":
-                self.config.fee_per_hour = rate
+            if billing_mode == "tariff":
+                periods = []
+                for item in self.periods_entry.get().replace("，", ",").split(","):
+                    if not item.strip():
+                        continue
+                    start, rate = item.split("=")
+                    hours, minutes = start.strip().split(":")
+                    if not (0 <= int(hours) < 24 and 0 <= int(minutes) < 60):
+                        raise ValueError(start)
+                    periods.append((f"{int(hours):02d}:{int(minutes):02d}", float(rate)))
+                self.config.set_tariff(float(self.free_entry.get()), periods, float(self.cap_entry.get()))
             else:
-                self.config.fixed_fee = rate
+                rate = float(self.rate_entry.get())
+                if billing_mode == "per_minute":
+                    self.config.fee_per_minute = rate
+                elif billing_mode == "per_hour":
+                    self.config.fee_per_hour = rate
+                else:
+                    self.config.fixed_fee = rate
             
             # 保存双门系统设置（如果可见）
             if hasattr(self, 'dual_var'):
@@ -6,8 +6,91 @@ from datetime import datetime
 def timestamp_to_str(ts):
     return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
 
+def str_to_timestamp(text):
+    """把 "YYYY-MM-DD"、"YYYY-MM-DD HH:MM" 或 "YYYY-MM-DD HH:MM:SS" 解析为本地时间戳"""
+    text = text.strip()
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的时间: {text}")
+
+# 一小时内秒数 → ":MM:SS"
+_MINUTE_SECOND_TEXT = [f":{s // 60:02d}:{s % 60:02d}" for s in range(3600)]
+
+class TimestampFormatter:
+    """批量把时间戳格式化为 "YYYY-MM-DD HH:MM:SS"，结果与 timestamp_to_str 一致
+
+    时区偏移都是15分钟的整数倍，按15分钟窗口缓存 "YYYY-MM-DD HH" 与窗口起点在
+    本地小时内的秒数，分秒查表拼接；窗口内的时间戳无需再调用
+    datetime.fromtimestamp/strftime，时间戳无序时同样有效。
+    """
+    WINDOW = 900
+    MAX_CACHED = 65536
+
+    def __init__(self):
+        self.cache = {}  # 窗口序号 → ("YYYY-MM-DD HH", 本地小时内秒数 - 窗口起点)
+
+    def __call__(self, ts):
+        seconds = int(ts // 1)
+        if ts - seconds >= 0.9999995:
+            # 与 datetime.fromtimestamp 一样先舍入到微秒，可能进位到下一秒
+            seconds = int(round(ts, 6) // 1)
+        window = seconds // self.WINDOW
+        entry = self.cache.get(window)
+        if entry is None:
+            if len(self.cache) >= self.MAX_CACHED:
+                self.cache.clear()
+            start = window * self.WINDOW
+            local = datetime.fromtimestamp(start)
+            entry = self.cache[window] = (local.strftime("%Y-%m-%d %H"), local.minute * 60 + local.second - start)
+        prefix, base = entry
+        return prefix + _MINUTE_SECOND_TEXT[base + seconds]
+
 def format_duration(seconds):
     """格式化时间间隔"""
     hours, remainder = divmod(seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
     return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+
+def local_offset(timestamp):
+    """返回时间戳所在时刻本地时区相对UTC的秒数"""
+    return time.localtime(timestamp).tm_gmtoff
+
+def local_to_timestamp(local):
+    """本地时间秒数（本地日期时间按 UTC 换算的秒数）对应的时间戳
+
+    取该时刻前后一天的两个偏移，选出换算后偏移一致的时间戳：夏令时结束时
+    重复的时刻取第一次出现，夏令时开始时跳过的时刻取切换之后的对应时刻。
+    """
+    before, after = local_offset(local - 86400), local_offset(local + 86400)
+    matched = [local - offset for offset in (before, after) if local_offset(local - offset) == offset]
+    return min(matched) if matched else local - before
+
+# 时区偏移的切换（夏令时开始/结束）总发生在 UTC 15分钟的整数倍处
+OFFSET_STEP = 900
+
+def offset_transitions(start, end):
+    """返回 [start, end] 内本地时区偏移的变化：(各切换时刻, 各段偏移)
+
+    偏移列表比切换时刻多一项，第 i 段为第 i 个切换时刻之前（第一段从 start 开始）。
+    按天取样查找偏移变化，再二分到15分钟；同一天内不会切换两次。
+    """
+    bounds, offsets = [], [local_offset(start)]
+    t = start
+    while t < end:
+        day_end = min(end, t + 86400)
+        offset = local_offset(day_end)
+        if offset != offsets[-1]:
+            lo, hi = int(t // OFFSET_STEP), int(day_end // OFFSET_STEP)
+            while hi - lo > 1:
+                middle = (lo + hi) // 2
+                if local_offset(middle * OFFSET_STEP) == offsets[-1]:
+                    lo = middle
+                else:
+                    hi = middle
+            bounds.append(hi * OFFSET_STEP)
+            offsets.append(offset)
+        t = day_end
+    return bounds, offsets